@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from .results import summarize
+
+
+class ASGIDriver:
+    """Issues GET requests straight into an ASGI application, no sockets:
+    what is measured is the handler's own concurrency (event loop, thread
+    hops, DB), not a web server's."""
+
+    def __init__(self, app, headers: Sequence = ()):
+        self.app = app
+        self.headers = [(b"host", b"testserver")] + [
+            (name.lower().encode(), value.encode()) for name, value in headers
+        ]
+
+    async def get(self, path: str) -> int:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": self.headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        body_sent = False
+        status = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # the client never disconnects; the handler cancels this wait when done
+            await asyncio.Future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await self.app(scope, receive, send)
+        return status[0]
+
+    async def run(self, path: str, requests: int, concurrency: int) -> Dict:
+        """Closed loop: ``concurrency`` clients issue ``requests`` in total,
+        each waiting for its response before sending the next."""
+        samples: List[float] = []
+        statuses: Dict[str, int] = {}
+        remaining = iter(range(requests))
+        peak_threads = threading.active_count()
+        done = asyncio.Event()
+
+        async def client():
+            for _ in remaining:
+                started = time.perf_counter()
+                code = await self.get(path)
+                samples.append((time.perf_counter() - started) * 1000)
+                statuses[str(code)] = statuses.get(str(code), 0) + 1
+
+        async def watch_threads():
+            nonlocal peak_threads
+            while not done.is_set():
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch_threads())
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await watcher
+        return {
+            "requests": requests,
+            "concurrency": concurrency,
+            "statuses": statuses,
+            "peak_threads": peak_threads,
+            "seconds": elapsed,
+            **summarize(samples, elapsed),
+        }
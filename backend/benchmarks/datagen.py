@@ -0,0 +1,152 @@
+import math
+import random
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from typing import Dict, List, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+
+from accounts.models import User
+from catalog.models import Item
+from logistics.cache import get_plan_cache
+from logistics.models import CourierLocation
+from orders.models import Order, OrderItem
+
+CENTER = (33.5731, -7.5898)  # Casablanca
+# generated rows carry these markers so purge() can find them again
+USERNAME_PREFIX = "bench-courier-"
+PHONE_PREFIX = "+21299"
+DEFAULT_PASSWORD = "bench-pass"
+ORDERS_PER_RESTAURANT = 20
+MAX_BASKET_LINES = 6
+
+
+def courier_username(index: int) -> str:
+    return f"{USERNAME_PREFIX}{index}@example.com"
+
+
+def random_point(rng: random.Random, center: Tuple[float, float], radius_km: float) -> Tuple[float, float]:
+    # uniform over the disc: sqrt keeps the density flat towards the edge
+    r = radius_km * math.sqrt(rng.random())
+    theta = rng.uniform(0, 2 * math.pi)
+    dlat = r * math.cos(theta) / 111.0
+    dlng = r * math.sin(theta) / (111.0 * math.cos(math.radians(center[0])))
+    return center[0] + dlat, center[1] + dlng
+
+
+def basket(rng: random.Random, items: List[Item]) -> List[Tuple[Item, int]]:
+    # mostly small baskets with a tail: 1 line half the time, rarely MAX_BASKET_LINES
+    lines = 1
+    while lines < min(MAX_BASKET_LINES, len(items)) and rng.random() < 0.5:
+        lines += 1
+    return [(item, rng.choice((1, 1, 1, 2, 3))) for item in rng.sample(items, lines)]
+
+
+def generate(
+    couriers: int,
+    orders: int,
+    radius_km: float = 8.0,
+    seed: int = 42,
+    center: Tuple[float, float] = CENTER,
+    password: str = DEFAULT_PASSWORD,
+) -> Dict:
+    """Bulk-insert ``couriers`` couriers (with a live position) and ``orders``
+    pending orders spread over a city disc of ``radius_km``.
+
+    Orders come from a pool of restaurants, one per ORDERS_PER_RESTAURANT
+    orders, and deliver within a few km of them. Couriers all share
+    ``password`` so the load driver can log them in.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    if not Item.objects.exists():
+        call_command("seed_catalog", stdout=StringIO())
+    items = list(Item.objects.all())
+
+    existing = set(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list("username", flat=True))
+    # one hash for everyone: hashing per user would dominate the run
+    hashed = make_password(password)
+    new_couriers = [
+        User(
+            username=courier_username(i),
+            password=hashed,
+            role=User.Roles.COURIER,
+            capacity_kg=rng.randint(5, 10),
+        )
+        for i in range(couriers)
+        if courier_username(i) not in existing
+    ]
+
+    restaurants = []
+    for i in range(orders // ORDERS_PER_RESTAURANT + 1):
+        lat, lng = random_point(rng, center, radius_km)
+        restaurants.append((f"Restaurant {i}", lat, lng))
+
+    rows, lines = [], []
+    for i in range(orders):
+        name, r_lat, r_lng = rng.choice(restaurants)
+        lat, lng = random_point(rng, (r_lat, r_lng), min(radius_km, 4.0))
+        chosen = basket(rng, items)
+        order = Order(
+            customer_phone=f"{PHONE_PREFIX}{i:08d}",
+            location_lat=lat,
+            location_lng=lng,
+            delivery_price_offer=Decimal(rng.randint(10, 40)),
+            restaurant_name=name,
+            restaurant_lat=r_lat,
+            restaurant_lng=r_lng,
+            total_weight_kg=sum(q * (item.weight_per_unit_kg or 0.0) for item, q in chosen),
+        )
+        # bulk_create skips Order.save
+        order.refresh_cells()
+        rows.append(order)
+        lines.append(chosen)
+
+    with transaction.atomic():
+        User.objects.bulk_create(new_couriers, batch_size=1000)
+        ids = User.objects.filter(username__in=[courier_username(i) for i in range(couriers)]).values_list(
+            "id", flat=True
+        )
+        now = datetime.now(dt_timezone.utc)
+        positions = []
+        for courier_id in ids:
+            lat, lng = random_point(rng, center, radius_km)
+            positions.append(CourierLocation(courier_id=courier_id, lat=lat, lng=lng, recorded_at=now))
+        CourierLocation.objects.bulk_create(
+            positions,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["courier"],
+            update_fields=["lat", "lng", "recorded_at"],
+        )
+        Order.objects.bulk_create(rows, batch_size=1000)
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, item=item, quantity=quantity)
+                for order, chosen in zip(rows, lines)
+                for item, quantity in chosen
+            ],
+            batch_size=2000,
+        )
+    # bulk inserts bypass the order signals that bump the pending-set version
+    get_plan_cache().bump()
+    return {
+        "couriers": couriers,
+        "couriers_created": len(new_couriers),
+        "orders": orders,
+        "order_lines": sum(len(chosen) for chosen in lines),
+        "restaurants": len(restaurants),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def purge() -> Dict:
+    """Delete everything generate() created."""
+    _, orders = Order.objects.filter(customer_phone__startswith=PHONE_PREFIX).delete()
+    _, users = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    get_plan_cache().bump()
+    return {"orders": orders.get("orders.Order", 0), "couriers": users.get("accounts.User", 0)}
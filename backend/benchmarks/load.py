@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from .datagen import CENTER, PHONE_PREFIX, random_point
+from .results import summarize
+
+SCENARIOS = ("create", "pending", "accept", "optimize")
+
+
+class LoadDriver:
+    """Closed-loop HTTP load against a running server: ``concurrency``
+    workers, each logged in as its own courier, issue requests back to back
+    until the scenario's request count is used up."""
+
+    def __init__(
+        self,
+        base_url: str,
+        couriers: Sequence[Tuple[str, str]],
+        concurrency: int = 8,
+        timeout_s: float = 30.0,
+        radius_km: float = 8.0,
+        seed: int = 42,
+    ):
+        if not couriers:
+            raise ValueError("the load driver needs at least one courier login")
+        self.base_url = base_url.rstrip("/")
+        self.couriers = list(couriers)
+        self.concurrency = concurrency
+        self.timeout_s = timeout_s
+        self.radius_km = radius_km
+        self.seed = seed
+        self.sessions: List[requests.Session] = []
+        self.item_ids: List[int] = []
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def setup(self) -> None:
+        # one logged-in session per worker; logins hash passwords, so run them in parallel
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            self.sessions = list(pool.map(self._login, range(self.concurrency)))
+        response = self.sessions[0].get(self.url("/api/catalog/items/"), timeout=self.timeout_s)
+        response.raise_for_status()
+        self.item_ids = [item["id"] for item in response.json()]
+        if not self.item_ids:
+            raise RuntimeError("the catalog is empty; run bench_seed first")
+
+    def _login(self, worker: int) -> requests.Session:
+        username, password = self.couriers[worker % len(self.couriers)]
+        session = requests.Session()
+        response = session.post(
+            self.url("/api/accounts/token/"), json={"username": username, "password": password}, timeout=self.timeout_s
+        )
+        response.raise_for_status()
+        session.headers["Authorization"] = f"Bearer {response.json()['access']}"
+        return session
+
+    def pending_ids(self, limit: int) -> List[int]:
+        # walk the cursor pages of the pending feed
+        ids: List[int] = []
+        url: Optional[str] = self.url("/api/orders/pending/?page_size=200&fields=id")
+        while url and len(ids) < limit:
+            response = self.sessions[0].get(url, timeout=self.timeout_s)
+            response.raise_for_status()
+            page = response.json()
+            ids += [row["id"] for row in page["results"]]
+            url = page["next"]
+        return ids[:limit]
+
+    def run(self, scenario: str, count: int) -> Dict:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"unknown scenario '{scenario}'")
+        if not self.sessions:
+            self.setup()
+        if scenario == "accept":
+            targets = self.pending_ids(count)
+            count = len(targets)
+        else:
+            targets = []
+        samples: List[float] = []
+        statuses: Counter = Counter()
+        lock = threading.Lock()
+        issued = iter(range(count))
+
+        def worker(index: int) -> None:
+            session = self.sessions[index]
+            rng = random.Random(self.seed * 1000 + index)
+            request = self._request(scenario, session, rng)
+            while True:
+                with lock:
+                    n = next(issued, None)
+                if n is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    code = request(targets[n] if targets else n)
+                except requests.RequestException as exc:
+                    code = type(exc).__name__
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if scenario == "accept" and code == 200:
+                    # hand the order back, untimed, so the courier's capacity never fills up
+                    session.post(self.url(f"/api/orders/{targets[n]}/cancel/"), timeout=self.timeout_s)
+                with lock:
+                    samples.append(elapsed_ms)
+                    statuses[str(code)] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(worker, range(self.concurrency)))
+        elapsed_s = time.perf_counter() - started
+        ok = sum(n for code, n in statuses.items() if code.startswith("2"))
+        return {
+            "scenario": scenario,
+            "requests": count,
+            "concurrency": self.concurrency,
+            "ok": ok,
+            "statuses": dict(statuses),
+            "seconds": elapsed_s,
+            **summarize(samples, elapsed_s),
+        }
+
+    def _request(self, scenario: str, session: requests.Session, rng: random.Random) -> Callable[[int], object]:
+        timeout = self.timeout_s
+
+        def create(n):
+            lat, lng = random_point(rng, CENTER, self.radius_km)
+            lines = rng.sample(self.item_ids, min(len(self.item_ids), rng.randint(1, 3)))
+            payload = {
+                "customer_phone": f"{PHONE_PREFIX}9{n:07d}",
+                "location_lat": lat,
+                "location_lng": lng,
+                "delivery_price_offer": "20.00",
+                "items": [{"item_id": item_id, "quantity": 1} for item_id in lines],
+            }
+            return session.post(self.url("/api/orders/"), json=payload, timeout=timeout).status_code
+
+        def pending(n):
+            return session.get(self.url("/api/orders/pending/"), timeout=timeout).status_code
+
+        def accept(order_id):
+            return session.post(self.url(f"/api/orders/{order_id}/accept/"), timeout=timeout).status_code
+
+        def optimize(n):
+            lat, lng = random_point(rng, CENTER, self.radius_km)
+            payload = {"courier": {"lat": lat, "lng": lng}, "capacity_km": 5.0}
+            return session.post(self.url("/api/orders/courier/optimize/"), json=payload, timeout=timeout).status_code
+
+        return {"create": create, "pending": pending, "accept": accept, "optimize": optimize}[scenario]
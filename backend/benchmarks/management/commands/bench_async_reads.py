@@ -0,0 +1,89 @@
+import asyncio
+from types import ModuleType
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from benchmarks import datagen
+from benchmarks.asgi import ASGIDriver
+from benchmarks.results import write_results
+from orders.async_views import AsyncCourierActiveOrdersView, AsyncOrderDetailView, AsyncPendingOrdersListView
+from orders.models import Order
+from orders.views import CourierActiveOrdersView, OrderDetailView, PendingOrdersListView
+
+VIEWS = {
+    "sync": {"pending": PendingOrdersListView, "active": CourierActiveOrdersView, "detail": OrderDetailView},
+    "async": {"pending": AsyncPendingOrdersListView, "active": AsyncCourierActiveOrdersView, "detail": AsyncOrderDetailView},
+}
+
+
+def urlconf(mode):
+    # both variants mounted at the real paths, whatever ORDERS_ASYNC_READS says
+    views = VIEWS[mode]
+    module = ModuleType(f"bench_{mode}_urls")
+    module.urlpatterns = [
+        path("api/orders/pending/", views["pending"].as_view()),
+        path("api/orders/courier/active/", views["active"].as_view()),
+        path("api/orders/<int:pk>/", views["detail"].as_view()),
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync (DRF) and async courier read views under concurrent "
+        "polling, driving the ASGI handler in-process. Generates bench data "
+        "(bench_seed) and purges it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoints", nargs="+", choices=["pending", "active", "detail"], default=["pending"])
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+        parser.add_argument("--requests", type=int, default=500, help="requests per (mode, endpoint, concurrency)")
+        parser.add_argument("--orders", type=int, default=2000, help="pending orders generated for the run")
+        parser.add_argument("--output", help="JSON file for the results")
+
+    def handle(self, *args, **options):
+        datagen.generate(couriers=1, orders=options["orders"])
+        try:
+            courier = User.objects.get(username=datagen.courier_username(0))
+            pending = Order.objects.filter(customer_phone__startswith=datagen.PHONE_PREFIX).order_by("id")
+            active = list(pending[:3])
+            Order.objects.filter(pk__in=[o.pk for o in active]).update(courier=courier, status=Order.Status.ASSIGNED)
+            paths = {
+                "pending": "/api/orders/pending/",
+                "active": "/api/orders/courier/active/",
+                "detail": f"/api/orders/{active[0].pk}/",
+            }
+            token = str(AccessToken.for_user(courier))
+            rows = asyncio.run(self._run(options, paths, token))
+        finally:
+            datagen.purge()
+        if options["output"]:
+            params = {name: options[name] for name in ("endpoints", "concurrency", "requests", "orders")}
+            path_ = write_results(options["output"], "async_reads", params, rows)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path_}"))
+
+    async def _run(self, options, paths, token):
+        driver = ASGIDriver(get_asgi_application(), headers=[("Authorization", f"Bearer {token}")])
+        rows = []
+        self.stdout.write(
+            f"{'endpoint':<8} {'mode':<6} {'conc':>5} {'ok':>5} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'req/s':>8} {'threads':>8}"
+        )
+        for endpoint in options["endpoints"]:
+            for concurrency in options["concurrency"]:
+                for mode in ("sync", "async"):
+                    with override_settings(ROOT_URLCONF=urlconf(mode)):
+                        await driver.run(paths[endpoint], min(20, options["requests"]), concurrency)  # warm-up
+                        row = await driver.run(paths[endpoint], options["requests"], concurrency)
+                    row.update(endpoint=endpoint, mode=mode)
+                    rows.append(row)
+                    self.stdout.write(
+                        f"{endpoint:<8} {mode:<6} {concurrency:>5} {row['statuses'].get('200', 0):>5} {row['p50_ms']:>8.1f} "
+                        f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['throughput_per_s']:>8.0f} {row['peak_threads']:>8}"
+                    )
+        return rows
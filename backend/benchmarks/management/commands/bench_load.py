@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import datagen
+from benchmarks.load import SCENARIOS, LoadDriver
+from benchmarks.results import write_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive HTTP load against a running server (runserver, daphne, ...) and "
+        "report p50/p95/p99 latency and throughput per scenario. Log in as the "
+        "couriers created by bench_seed; --output writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=8, help="parallel workers, one courier each")
+        parser.add_argument("--password", default=datagen.DEFAULT_PASSWORD)
+        parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="JSON file for the results")
+
+    def handle(self, *args, **options):
+        couriers = [(datagen.courier_username(i), options["password"]) for i in range(options["concurrency"])]
+        driver = LoadDriver(
+            options["base_url"],
+            couriers,
+            concurrency=options["concurrency"],
+            timeout_s=options["timeout"],
+            seed=options["seed"],
+        )
+        try:
+            driver.setup()
+        except Exception as exc:
+            raise CommandError(f"Could not log in against {options['base_url']} (is the server up and bench_seed run?): {exc}")
+        rows = []
+        self.stdout.write(f"{'scenario':<10} {'requests':>8} {'ok':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'req/s':>8}")
+        for scenario in options["scenarios"]:
+            row = driver.run(scenario, options["requests"])
+            rows.append(row)
+            self.stdout.write(
+                f"{scenario:<10} {row['requests']:>8} {row['ok']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                f"{row['p99_ms']:>9.1f} {row['throughput_per_s']:>8.1f}"
+            )
+        if options["output"]:
+            params = {name: options[name] for name in ("base_url", "scenarios", "requests", "concurrency", "seed")}
+            path = write_results(options["output"], "load", params, rows)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks import micro
+from benchmarks.results import write_results
+
+
+class Command(BaseCommand):
+    help = "Time the optimizer primitives across input sizes; --output writes the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--benchmarks", nargs="+", choices=sorted(micro.CASES), default=sorted(micro.CASES))
+        parser.add_argument("--sizes", type=int, nargs="+", help="input sizes for every benchmark (default: per benchmark)")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="JSON file for the results")
+
+    def handle(self, *args, **options):
+        sizes = {name: options["sizes"] for name in options["benchmarks"]} if options["sizes"] else None
+        rows = micro.run(options["benchmarks"], sizes, repeat=options["repeat"], seed=options["seed"])
+        self.stdout.write(f"{'benchmark':<24} {'size':>7} {'p50_ms':>10} {'p95_ms':>10} {'p99_ms':>10}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['benchmark']:<24} {row['size']:>7} {row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f} {row['p99_ms']:>10.3f}"
+            )
+        if options["output"]:
+            params = {name: options[name] for name in ("benchmarks", "sizes", "repeat", "seed")}
+            path = write_results(options["output"], "micro", params, rows)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks import datagen
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic couriers (with live positions) and pending orders "
+        "spread over a city for benchmarks and load tests. --purge removes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=1000)
+        parser.add_argument("--radius-km", type=float, default=8.0, help="radius of the city disc")
+        parser.add_argument("--password", default=datagen.DEFAULT_PASSWORD, help="shared courier password")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--purge", action="store_true", help="delete generated data and exit")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            removed = datagen.purge()
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed['orders']} orders and {removed['couriers']} couriers."))
+            return
+        summary = datagen.generate(
+            options["couriers"],
+            options["orders"],
+            radius_km=options["radius_km"],
+            seed=options["seed"],
+            password=options["password"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary['couriers']} couriers ({summary['couriers_created']} new), {summary['orders']} orders "
+                f"({summary['order_lines']} lines, {summary['restaurants']} restaurants) in {summary['seconds']:.2f}s. "
+                f"Courier logins: {datagen.courier_username(0)} ... / {options['password']}"
+            )
+        )
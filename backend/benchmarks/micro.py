@@ -0,0 +1,67 @@
+import random
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from logistics.optimizer import haversine_km, knapsack_max_profit, nearest_neighbor_route
+
+from .datagen import CENTER, random_point
+from .results import summarize
+
+DEFAULT_SIZES = {
+    "haversine_km": [1, 100, 10000],
+    "knapsack_max_profit": [10, 100, 500],
+    "nearest_neighbor_route": [10, 100, 1000],
+}
+KNAPSACK_CAPACITY_KM = 10.0
+
+
+def _haversine_case(rng: random.Random, size: int) -> Callable[[], object]:
+    pairs = [random_point(rng, CENTER, 8.0) + random_point(rng, CENTER, 8.0) for _ in range(size)]
+    return lambda: [haversine_km(*pair) for pair in pairs]
+
+
+def _knapsack_case(rng: random.Random, size: int) -> Callable[[], object]:
+    items = [
+        {"id": i, "profit": rng.randint(10, 40), "distance_km": rng.uniform(0.2, 5.0)}
+        for i in range(size)
+    ]
+    return lambda: knapsack_max_profit(items, KNAPSACK_CAPACITY_KM)
+
+
+def _route_case(rng: random.Random, size: int) -> Callable[[], object]:
+    points = [random_point(rng, CENTER, 8.0) for _ in range(size)]
+    return lambda: nearest_neighbor_route(CENTER, points)
+
+
+CASES = {
+    "haversine_km": _haversine_case,
+    "knapsack_max_profit": _knapsack_case,
+    "nearest_neighbor_route": _route_case,
+}
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> List[float]:
+    fn()  # warm-up: first call pays imports and allocations
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def run(
+    benchmarks: Optional[Sequence[str]] = None,
+    sizes: Optional[Dict[str, List[int]]] = None,
+    repeat: int = 20,
+    seed: int = 42,
+) -> List[Dict]:
+    """One summary row per (benchmark, input size); inputs are rebuilt from
+    ``seed`` so runs on different commits time the same data."""
+    sizes = sizes or DEFAULT_SIZES
+    rows = []
+    for name in benchmarks or list(CASES):
+        for size in sizes.get(name, DEFAULT_SIZES[name]):
+            fn = CASES[name](random.Random(seed), size)
+            rows.append({"benchmark": name, "size": size, **summarize(time_call(fn, repeat))})
+    return rows
@@ -0,0 +1,71 @@
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import django
+from django.conf import settings
+from django.db import connection
+
+from logistics.optimizer import np
+
+
+def percentile(sorted_samples: Sequence[float], pct: float) -> float:
+    # nearest-rank percentile of an already sorted sample
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples_ms: Iterable[float], elapsed_s: Optional[float] = None) -> Dict:
+    """count / mean / p50 / p95 / p99 / max in ms, plus throughput when the
+    wall time of the whole run is given."""
+    ordered = sorted(samples_ms)
+    summary = {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+    if elapsed_s is not None:
+        summary["throughput_per_s"] = len(ordered) / elapsed_s if elapsed_s > 0 else 0.0
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment() -> Dict:
+    # what a result needs to be compared with another run
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "numpy": np is not None,
+        "machine": platform.machine(),
+    }
+
+
+def write_results(path, kind: str, params: Dict, results: List[Dict]) -> Path:
+    path = Path(path)
+    if path.parent != Path(""):
+        path.parent.mkdir(parents=True, exist_ok=True)
+    document = {"kind": kind, "environment": environment(), "params": params, "results": results}
+    path.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+    return path
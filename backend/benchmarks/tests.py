@@ -0,0 +1,81 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.db.models import F, FloatField, Sum
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+
+from accounts.models import User
+from logistics.cache import get_plan_cache
+from logistics.incremental import get_incremental_planner
+from logistics.models import CourierLocation
+from orders.models import Order
+
+from . import datagen, micro
+from .load import SCENARIOS, LoadDriver
+from .results import percentile, summarize, write_results
+
+
+class ResultsTests(SimpleTestCase):
+    def test_nearest_rank_percentiles(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7.0], 95), 7.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_summary_and_json_output(self):
+        summary = summarize([3.0, 1.0, 2.0, 4.0], elapsed_s=2.0)
+        self.assertEqual((summary["p50_ms"], summary["max_ms"], summary["throughput_per_s"]), (2.0, 4.0, 2.0))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_results(Path(tmp) / "out" / "micro.json", "micro", {"repeat": 1}, [summary])
+            document = json.loads(path.read_text())
+        self.assertEqual(document["kind"], "micro")
+        self.assertEqual(document["results"], [summary])
+        self.assertIn("commit", document["environment"])
+
+    def test_micro_rows_per_size(self):
+        rows = micro.run(sizes={name: [3, 5] for name in micro.CASES}, repeat=2)
+        self.assertEqual([(row["benchmark"], row["size"]) for row in rows], [(n, s) for n in micro.CASES for s in (3, 5)])
+        self.assertTrue(all(row["count"] == 2 for row in rows))
+
+
+class DatagenTests(TestCase):
+    def test_generate_and_purge(self):
+        summary = datagen.generate(couriers=3, orders=45, radius_km=5.0)
+        self.assertEqual(summary["restaurants"], 3)
+        couriers = User.objects.filter(username__startswith=datagen.USERNAME_PREFIX)
+        self.assertEqual(couriers.filter(role=User.Roles.COURIER).count(), 3)
+        self.assertEqual(CourierLocation.objects.filter(courier__in=couriers).count(), 3)
+        orders = Order.objects.filter(customer_phone__startswith=datagen.PHONE_PREFIX)
+        self.assertEqual(orders.filter(status=Order.Status.PENDING).exclude(location_cell="").count(), 45)
+        # stored weights agree with the generated lines
+        for order in orders.annotate(
+            lines_kg=Sum(F("items__quantity") * F("items__item__weight_per_unit_kg"), output_field=FloatField())
+        ):
+            self.assertAlmostEqual(order.total_weight_kg, order.lines_kg)
+        # rerunning only adds orders, the couriers already exist
+        self.assertEqual(datagen.generate(couriers=3, orders=5)["couriers_created"], 0)
+        self.assertEqual(datagen.purge(), {"orders": 50, "couriers": 3})
+        self.assertFalse(orders.exists())
+
+
+class LoadDriverTests(LiveServerTestCase):
+    def setUp(self):
+        get_plan_cache().backend.clear()
+        get_incremental_planner().clear()
+        datagen.generate(couriers=2, orders=30, radius_km=3.0)
+
+    def test_every_scenario_succeeds(self):
+        driver = LoadDriver(
+            self.live_server_url,
+            [(datagen.courier_username(i), datagen.DEFAULT_PASSWORD) for i in range(2)],
+            concurrency=2,
+            radius_km=3.0,
+        )
+        for scenario in SCENARIOS:
+            row = driver.run(scenario, 4)
+            self.assertEqual((row["requests"], row["ok"]), (4, 4), row)
+            self.assertGreater(row["throughput_per_s"], 0)
+        # accepted orders were handed back
+        self.assertFalse(Order.objects.exclude(status=Order.Status.PENDING).exists())
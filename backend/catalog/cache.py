@@ -0,0 +1,90 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import F
+
+# The version is a database row (CatalogVersion) bumped on every Item
+# save/delete (catalog.signals), so every worker process and management
+# command shares it. Each process keeps its own serialized snapshot and
+# re-reads the version at most this often; its own changes expire the
+# snapshot at once.
+RECHECK_INTERVAL_S = 2.0
+
+
+@dataclass
+class CatalogSnapshot:
+	version: int
+	items: List[Dict]
+	etag: str
+	weights: Dict[int, float] = field(default_factory=dict)
+	# registry of Item rows by id; shared across requests, treat as read-only
+	by_id: Dict[int, Any] = field(default_factory=dict)
+	checked_at: float = 0.0  # time.monotonic() of the last version check
+
+	def resolve(self, item_ids) -> Tuple[Dict[int, Any], List[int]]:
+		# (found items by id, sorted unknown ids) in one pass, no query
+		found, unknown = {}, set()
+		for item_id in item_ids:
+			item = self.by_id.get(item_id)
+			if item is None:
+				unknown.add(item_id)
+			else:
+				found[item_id] = item
+		return found, sorted(unknown)
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_lock = threading.Lock()
+
+
+def catalog_version() -> int:
+	from .models import CatalogVersion
+
+	return CatalogVersion.objects.filter(pk=1).values_list("version", flat=True).first() or 1
+
+
+def bump_catalog_version() -> None:
+	from .models import CatalogVersion
+
+	if not CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1):
+		CatalogVersion.objects.get_or_create(pk=1, defaults={"version": 2})
+	expire_catalog()
+
+
+def expire_catalog() -> None:
+	# rebuilt on the next get_catalog(), whatever the version row says
+	global _snapshot
+	_snapshot = None
+
+
+def get_catalog() -> CatalogSnapshot:
+	global _snapshot
+	snapshot = _snapshot
+	if snapshot is not None and time.monotonic() - snapshot.checked_at < RECHECK_INTERVAL_S:
+		return snapshot
+	version = catalog_version()
+	with _lock:
+		if _snapshot is None or _snapshot.version != version:
+			_snapshot = _build(version)
+		_snapshot.checked_at = time.monotonic()
+		return _snapshot
+
+
+def _build(version: int) -> CatalogSnapshot:
+	from .models import Item
+	from .serializers import ItemSerializer
+
+	rows = list(Item.objects.order_by("name"))
+	items = [dict(row) for row in ItemSerializer(rows, many=True).data]
+	body = json.dumps(items, sort_keys=True, separators=(",", ":")).encode()
+	return CatalogSnapshot(
+		version=version,
+		items=items,
+		etag='"%s"' % hashlib.sha256(body).hexdigest()[:32],
+		weights={row["id"]: row["weight_per_unit_kg"] or 0.0 for row in items},
+		by_id={item.id: item for item in rows},
+	)
@@ -15,3 +15,9 @@ class Item(models.Model):
 	def __str__(self) -> str:
 		return f"{self.name} ({self.category})"
 
+
+
+class CatalogVersion(models.Model):
+	# single row (pk=1), bumped with every Item change in the same transaction;
+	# worker processes compare it with their cached snapshot (catalog.cache)
+	version = models.PositiveBigIntegerField(default=1)
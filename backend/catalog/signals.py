@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version, expire_catalog
+from .models import Item
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, **kwargs):
+	# the version row commits with the item change; expire this process's
+	# snapshot again after commit in case another thread rebuilt it from
+	# the old row in between
+	bump_catalog_version()
+	transaction.on_commit(expire_catalog)
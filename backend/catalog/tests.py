@@ -1,3 +1,50 @@
+from unittest import mock
+
+from django.db.models import F
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from . import cache
+from .cache import get_catalog
+from .models import CatalogVersion, Item
+
+
+class ItemListCacheTests(TestCase):
+	def setUp(self):
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=0.2)
+		self.client = APIClient()
+
+	def test_etag_and_not_modified(self):
+		first = self.client.get("/api/catalog/items/")
+		self.assertEqual(first.status_code, 200)
+		self.assertEqual([row["name"] for row in first.data], ["Pomme"])
+		etag = first["ETag"]
+		with self.assertNumQueries(0):
+			again = self.client.get("/api/catalog/items/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(again["ETag"], etag)
+		with self.assertNumQueries(0):
+			self.assertEqual(self.client.get("/api/catalog/items/").status_code, 200)
+
+	def test_item_change_bumps_version(self):
+		etag = self.client.get("/api/catalog/items/")["ETag"]
+		self.apple.weight_per_unit_kg = 0.25
+		self.apple.save()
+		response = self.client.get("/api/catalog/items/", HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response["ETag"], etag)
+		self.assertEqual(response.data[0]["weight_per_unit_kg"], 0.25)
+		self.assertEqual(get_catalog().weights[self.apple.id], 0.25)
+		apple_id = self.apple.id
+		self.apple.delete()
+		self.assertNotIn(apple_id, get_catalog().weights)
 
-# Create your tests here.
+	def test_change_from_another_process_is_seen_after_recheck(self):
+		get_catalog()
+		# as another worker would: the row and the version change, no signal here
+		Item.objects.filter(pk=self.apple.pk).update(weight_per_unit_kg=0.3)
+		CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1)
+		with self.assertNumQueries(0):
+			self.assertEqual(get_catalog().weights[self.apple.id], 0.2)
+		with mock.patch.object(cache, "RECHECK_INTERVAL_S", 0):
+			self.assertEqual(get_catalog().weights[self.apple.id], 0.3)
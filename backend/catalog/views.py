@@ -1,4 +1,6 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from .cache import get_catalog
 from .models import Item
 from .serializers import ItemSerializer
 
@@ -7,3 +9,16 @@ class ItemListView(generics.ListAPIView):
 	queryset = Item.objects.all().order_by("name")
 	serializer_class = ItemSerializer
 	permission_classes = [permissions.AllowAny]
+
+	def list(self, request, *args, **kwargs):
+		# served from the process-level snapshot (catalog.cache); clients
+		# revalidate with If-None-Match and get 304 while nothing changed
+		catalog = get_catalog()
+		headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+		if catalog.etag in _etags(request.headers.get("If-None-Match", "")):
+			return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+		return Response(catalog.items, headers=headers)
+
+
+def _etags(header: str):
+	return {tag.strip() for tag in header.split(",")} if header else set()
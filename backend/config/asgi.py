@@ -11,15 +11,22 @@ import os
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-import notifications.routing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 django_asgi_app = get_asgi_application()
 
+# consumers use the ORM, so import them once the app registry is ready
+import notifications.routing  # noqa: E402
+from notifications.middleware import JWTAuthMiddleware  # noqa: E402
+from logistics.executor import start_in_background  # noqa: E402
+
 application = ProtocolTypeRouter(
 	{
 		"http": django_asgi_app,
-		"websocket": URLRouter(notifications.routing.websocket_urlpatterns),
+		"websocket": JWTAuthMiddleware(URLRouter(notifications.routing.websocket_urlpatterns)),
 	}
 )
+
+# serving processes only: management commands never load this module
+start_in_background()
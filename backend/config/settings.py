@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,7 +30,7 @@ SECRET_KEY = os.getenv(
 )
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DJANGO_DEBUG", "1").lower() in ("1", "true", "yes")
 
 ALLOWED_HOSTS = ["*"]
 
@@ -52,9 +55,13 @@ INSTALLED_APPS = [
     "orders",
     "logistics",
     "notifications",
+    "benchmarks",
+    "monitoring",
 ]
 
 MIDDLEWARE = [
+    # first, so the latency histograms include the rest of the stack
+    "monitoring.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -89,12 +96,55 @@ ASGI_APPLICATION = "config.asgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE=sqlite (default, single node) or postgres (needs psycopg;
+# DB_POOL=1 additionally needs psycopg[pool])
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "livraison"),
+            "USER": os.getenv("POSTGRES_USER", "livraison"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # persistent connections skip the connect/auth round trips per request
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+        }
     }
-}
+    if os.getenv("DB_POOL", "0") == "1":
+        # the pool replaces persistent connections; Django refuses both at once
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            }
+        }
+elif DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "0")),
+            "OPTIONS": {
+                # writers take the lock at BEGIN and queue on the busy timeout instead
+                # of failing with "database is locked" when upgrading a read lock
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+                # WAL lets readers run alongside the single writer; NORMAL sync is
+                # safe in WAL mode and avoids an fsync per commit
+                "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+            },
+            # file-backed test database: the in-memory shared cache raises
+            # "table is locked" at once rather than waiting for concurrent writers
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_ENGINE '{DB_ENGINE}'")
 
 
 # Password validation
@@ -158,6 +208,47 @@ SPECTACULAR_SETTINGS = {
 # CORS (development defaults)
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Serve the courier polling reads (pending, active, detail) from async views.
+# Only worth it under ASGI (daphne/uvicorn): `manage.py runserver` is WSGI
+# here (daphne is not in INSTALLED_APPS) and would bridge each async view
+# through async_to_sync, so it stays off unless the ASGI server enables it.
+ORDERS_ASYNC_READS = os.getenv("ORDERS_ASYNC_READS", "0") == "1"
+
+# Courier optimization runs in worker processes (logistics.executor) so a
+# large plan does not hold the GIL of a request worker. WORKERS=0 solves in
+# the request thread; past WORKERS + MAX_QUEUE jobs in flight the view serves
+# a greedy plan, or a 503 with ON_SATURATED=reject. With WARM_UP the workers
+# are spawned at startup rather than on the first plan.
+OPTIMIZER = {
+    "WORKERS": int(os.getenv("OPTIMIZER_WORKERS", "0")),
+    "MAX_QUEUE": int(os.getenv("OPTIMIZER_MAX_QUEUE", "8")),
+    "TIMEOUT_S": float(os.getenv("OPTIMIZER_TIMEOUT_S", "5")),
+    "ON_SATURATED": os.getenv("OPTIMIZER_ON_SATURATED", "greedy"),
+    "WARM_UP": os.getenv("OPTIMIZER_WARM_UP", "1") == "1",
+}
+
+# Flush buffered courier pings (logistics.positions) from a background thread
+# every few seconds and at exit. Off under the test runner, whose test
+# transaction the thread's own connection would have to wait on.
+POSITION_FLUSHER = os.getenv("POSITION_FLUSHER", "0" if sys.argv[1:2] == ["test"] else "1") == "1"
+
+# Background plans for POST /api/orders/courier/optimize/jobs/ (orders.jobs):
+# THREADS wait on the optimizer, at most MAX_PENDING distinct jobs run or
+# queue, finished jobs stay readable for TTL_S seconds.
+OPTIMIZE_JOBS = {
+    "THREADS": int(os.getenv("OPTIMIZE_JOB_THREADS", "4")),
+    "MAX_PENDING": int(os.getenv("OPTIMIZE_JOB_MAX_PENDING", "64")),
+    "TTL_S": float(os.getenv("OPTIMIZE_JOB_TTL_S", "300")),
+}
+
+# In-process metrics served at /metrics (monitoring app). SAMPLE_RATE is the
+# share of requests whose latency and queries are recorded; all are counted.
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "1") == "1",
+    "SAMPLE_RATE": float(os.getenv("METRICS_SAMPLE_RATE", "1.0")),
+    "TOKEN": os.getenv("METRICS_TOKEN", ""),
+}
+
 # Channels (development in-memory channel layer)
 CHANNEL_LAYERS = {
     "default": {
@@ -19,6 +19,8 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from monitoring.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # API schema and docs
@@ -32,4 +34,7 @@ urlpatterns = [
     path("api/accounts/", include("accounts.urls")),
     path("api/catalog/", include("catalog.urls")),
     path("api/orders/", include("orders.urls")),
+    path("api/logistics/", include("logistics.urls")),
+    # Prometheus scrape target
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# serving processes only (runserver loads this in the reloaded child, not
+# the watcher): management commands never load this module
+from logistics.executor import start_in_background  # noqa: E402
+
+start_in_background()
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import CourierLocation
 
-# Register your models here.
+
+@admin.register(CourierLocation)
+class CourierLocationAdmin(admin.ModelAdmin):
+    list_display = ("courier", "lat", "lng", "recorded_at")
+    readonly_fields = ("courier", "lat", "lng", "recorded_at")
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Courier positions are snapped to this grid (~200 m) so nearby requests
+# share a plan.
+POSITION_QUANTUM_DEG = 0.002
+DEFAULT_TTL_S = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+VERSION_KEY = "pending_version"
+
+
+class LocMemBackend:
+    """Per-process LRU dict; the pending-set version lives outside the LRU
+    so it can never be evicted."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_s: float) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_int(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Shared cache for several worker processes. Takes any client with the
+    redis-py get/set(ex=)/incr interface; eviction is left to the server
+    (maxmemory-policy allkeys-lru)."""
+
+    def __init__(self, client, prefix: str = "optimize:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl_s: float) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl_s)))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def get_int(self, key: str) -> int:
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self) -> None:
+        pass
+
+
+class PlanCache:
+    """Optimization results keyed on (snapped position, request parameters,
+    pending-set version). Every order entering or leaving PENDING bumps the
+    version (logistics.signals), which orphans all earlier plans at once."""
+
+    def __init__(self, backend, ttl_s: float = DEFAULT_TTL_S):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> int:
+        return self.backend.get_int(VERSION_KEY)
+
+    def bump(self) -> int:
+        return self.backend.incr(VERSION_KEY)
+
+    def key(self, position: Tuple[float, float], capacity_km: float, **params) -> str:
+        lat_q = round(position[0] / POSITION_QUANTUM_DEG)
+        lng_q = round(position[1] / POSITION_QUANTUM_DEG)
+        extra = ":".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"v{self.version()}:{lat_q}:{lng_q}:{capacity_km:g}:{extra}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def reject(self) -> None:
+        # a hit that failed validation is really a miss
+        self.hits -= 1
+        self.misses += 1
+
+    def set(self, key: str, value: Dict) -> None:
+        self.backend.set(key, value, self.ttl_s)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.backend.size(),
+            "pending_version": self.version(),
+        }
+
+
+def build_plan_cache() -> PlanCache:
+    # settings.OPTIMIZE_CACHE = {"BACKEND": "locmem" | "redis", "MAX_ENTRIES": .., "TTL_S": .., "URL": ..}
+    config = getattr(settings, "OPTIMIZE_CACHE", {})
+    kind = config.get("BACKEND", "locmem")
+    if kind == "locmem":
+        backend = LocMemBackend(config.get("MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    elif kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("OPTIMIZE_CACHE BACKEND 'redis' needs the redis package")
+        backend = RedisBackend(redis.Redis.from_url(config["URL"]))
+    else:
+        raise ImproperlyConfigured(f"Unknown OPTIMIZE_CACHE BACKEND '{kind}'")
+    return PlanCache(backend, config.get("TTL_S", DEFAULT_TTL_S))
+
+
+_plan_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    global _plan_cache
+    if _plan_cache is None:
+        _plan_cache = build_plan_cache()
+    return _plan_cache
@@ -0,0 +1,211 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Sequence, Tuple
+
+
+from .models import CourierLocation
+from .optimizer import np, order_distances_km
+from .positions import store
+
+# Pairs the solver must not pick: a courier too far from the order, or an
+# order heavier than the courier can carry. Large but finite so the
+# assignment stays solvable; such pairs are dropped after solving.
+INFEASIBLE = 1e9
+DEFAULT_MAX_KM = 10.0
+DEFAULT_MAX_ORDERS = 500
+
+
+def assign_min_cost(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """Minimum-cost assignment (Hungarian, shortest augmenting paths).
+
+    ``cost`` is a rows x cols matrix; returns (row, col) pairs covering
+    min(rows, cols) of them in O(rows^2 * cols).
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if not n or not m:
+        return []
+    if n > m:
+        transposed = [[cost[i][j] for i in range(n)] for j in range(m)]
+        return sorted((i, j) for j, i in assign_min_cost(transposed))
+    if np is not None:
+        p = _hungarian_np(np.asarray(cost, dtype=float))
+    else:
+        p = _hungarian_py(cost, n, m)
+    return sorted((p[j] - 1, j - 1) for j in range(1, m + 1) if p[j])
+
+
+def _hungarian_py(cost, n: int, m: int) -> List[int]:
+    # rows and columns are 1-based; p[j] is the row matched to column j
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta, j1 = inf, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return p
+
+
+def _hungarian_np(cost) -> List[int]:
+    # same algorithm with the column scan vectorised
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return p.tolist()
+
+
+@dataclass
+class DispatchRound:
+    couriers: int = 0
+    orders: int = 0
+    assigned: List[Tuple[int, int]] = field(default_factory=list)  # (courier_id, order_id)
+    conflicts: int = 0
+    solve_ms: float = 0.0
+    apply_ms: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        # assignments per second of round time
+        total_ms = self.solve_ms + self.apply_ms
+        return len(self.assigned) * 1000 / total_ms if total_ms else 0.0
+
+
+def idle_couriers() -> List[Tuple[object, Tuple[float, float]]]:
+    """(courier, position) for couriers with a live position and no active order."""
+    from orders.models import Order
+
+    cutoff = datetime.now(dt_timezone.utc) - timedelta(seconds=store.ttl_s)
+    # orders of a deleted courier keep their status with courier NULL; a NULL
+    # in NOT IN (...) would exclude every courier
+    busy = Order.objects.filter(
+        status__in=[Order.Status.ASSIGNED, Order.Status.PICKED_UP], courier__isnull=False
+    ).values("courier_id")
+    rows = (
+        CourierLocation.objects.filter(recorded_at__gte=cutoff, courier__role="COURIER", courier__is_active=True)
+        .exclude(courier_id__in=busy)
+        .select_related("courier")
+    )
+    found = []
+    for row in rows:
+        # this process may hold a fresher ping than the last flush
+        live = store.get(row.courier_id)
+        found.append((row.courier, live.point if live is not None else (row.lat, row.lng)))
+    return found
+
+
+def build_costs(couriers, orders, max_km: float) -> List[List[float]]:
+    customers = [(o.location_lat, o.location_lng) for o in orders]
+    restaurants = [(o.restaurant_lat, o.restaurant_lng) for o in orders]
+    costs = []
+    for courier, position in couriers:
+        row = order_distances_km(position, customers, restaurants)
+        costs.append(
+            [
+                d if d <= max_km and o.total_weight_kg <= courier.capacity_kg else INFEASIBLE
+                for d, o in zip(row, orders)
+            ]
+        )
+    return costs
+
+
+def run_round(max_km: float = DEFAULT_MAX_KM, max_orders: int = DEFAULT_MAX_ORDERS, dry_run: bool = False) -> DispatchRound:
+    """One dispatch round: match idle couriers to the oldest pending orders
+    minimising total courier->restaurant->customer distance, then claim each
+    pair through orders.services.accept_order so manual accepts racing the
+    round are never overwritten."""
+    from orders.models import Order
+    from orders.services import AcceptError, accept_order
+    from orders.signals import send_order_event
+
+    result = DispatchRound()
+    started = time.perf_counter()
+    # pings this process holds but has not written yet
+    store.flush(force=True)
+    couriers = idle_couriers()
+    orders = list(
+        Order.objects.filter(status=Order.Status.PENDING)
+        .order_by("created_at", "id")
+        .only("id", "location_lat", "location_lng", "restaurant_lat", "restaurant_lng", "total_weight_kg")[:max_orders]
+    )
+    result.couriers, result.orders = len(couriers), len(orders)
+    costs = build_costs(couriers, orders, max_km)
+    pairs = [(i, j) for i, j in assign_min_cost(costs) if costs[i][j] < INFEASIBLE]
+    result.solve_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if dry_run:
+        result.assigned = [(couriers[i][0].id, orders[j].id) for i, j in pairs]
+        return result
+    # each claim commits on its own: the write lock (SQLite IMMEDIATE) is
+    # held for one conditional UPDATE at a time, not the whole round, and a
+    # pair lost to a manual accept or a failing claim undoes nothing else
+    for i, j in pairs:
+        courier, order_id = couriers[i][0], orders[j].id
+        try:
+            order = accept_order(courier, order_id)
+        except AcceptError:
+            result.conflicts += 1
+            continue
+        send_order_event("accepted", order)
+        result.assigned.append((courier.id, order_id))
+    result.apply_ms = (time.perf_counter() - started) * 1000
+    return result
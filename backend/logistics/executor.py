@@ -0,0 +1,279 @@
+import math
+import multiprocessing
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from monitoring.metrics import OPTIMIZER_FALLBACKS, OPTIMIZER_QUEUE_DEPTH, PhaseTimer
+
+from .routing import PickupDeliveryPlan, pickup_delivery_route, plan_route
+from .solvers import GreedyRatioSolver, solve
+
+DEFAULT_WORKERS = 0
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT_S = 5.0
+# budget of the inline greedy plan served when the pool cannot take a job
+DEGRADED_BUDGET_MS = 20.0
+ON_SATURATED = ("greedy", "reject")
+
+
+@dataclass
+class PlanJob:
+    """Inputs of one courier optimization, as flat typed arrays: a few
+    buffers to pickle instead of one dict per candidate order.
+
+    ``customers`` and ``restaurants`` interleave lat, lng; a restaurant
+    without coordinates is stored as NaN. The pickup/delivery fields are
+    empty in drop-off mode.
+    """
+
+    courier_pos: Tuple[float, float]
+    capacity_km: float
+    time_budget_ms: float
+    solver: Optional[str]
+    ids: array  # 'q'
+    profits: array  # 'd'
+    distances: array  # 'd'
+    customers: array  # 'd'
+    capacity_kg: Optional[float] = None
+    weights: array = field(default_factory=lambda: array("d"))
+    restaurants: array = field(default_factory=lambda: array("d"))
+    restaurant_names: Tuple[str, ...] = ()
+    name_index: array = field(default_factory=lambda: array("i"))
+
+    @property
+    def pickup_delivery(self) -> bool:
+        return self.capacity_kg is not None
+
+    @classmethod
+    def from_items(cls, courier_pos, items: List[Dict], capacity_km, time_budget_ms, solver=None, capacity_kg=None) -> "PlanJob":
+        job = cls(
+            courier_pos=tuple(courier_pos),
+            capacity_km=capacity_km,
+            time_budget_ms=time_budget_ms,
+            solver=solver,
+            ids=array("q", (it["id"] for it in items)),
+            profits=array("d", (it["profit"] for it in items)),
+            distances=array("d", (it["distance_km"] for it in items)),
+            customers=array("d", (c for it in items for c in it["customer"])),
+            capacity_kg=capacity_kg,
+        )
+        if capacity_kg is not None:
+            names: Dict[str, int] = {}
+            job.weights = array("d", (it["weight_kg"] for it in items))
+            job.restaurants = array(
+                "d", (c for it in items for c in (it["restaurant"] or (math.nan, math.nan)))
+            )
+            job.name_index = array("i", (names.setdefault(it["restaurant_name"], len(names)) for it in items))
+            job.restaurant_names = tuple(names)
+        return job
+
+    def items(self) -> List[Dict]:
+        # the dicts the solvers and routers take, rebuilt on the worker side
+        items = []
+        for i, order_id in enumerate(self.ids):
+            item = {
+                "id": order_id,
+                "profit": self.profits[i],
+                "distance_km": self.distances[i],
+                "customer": (self.customers[2 * i], self.customers[2 * i + 1]),
+            }
+            if self.pickup_delivery:
+                restaurant = (self.restaurants[2 * i], self.restaurants[2 * i + 1])
+                item["weight_kg"] = self.weights[i]
+                item["restaurant"] = None if math.isnan(restaurant[0]) else restaurant
+                item["restaurant_name"] = self.restaurant_names[self.name_index[i]]
+            items.append(item)
+        return items
+
+
+@dataclass
+class PlanOutcome:
+    solver: str
+    optimality_gap: float
+    table_cells: int
+    # ids picked by the knapsack; in visiting order for a drop-off route
+    selected_ids: array
+    initial_km: float = 0.0
+    route_km: float = 0.0
+    pickup_delivery: Optional[PickupDeliveryPlan] = None
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    # why a greedy plan was served instead ("saturated", "timeout", "error")
+    degraded: str = ""
+
+
+def run_plan(job: PlanJob) -> PlanOutcome:
+    """Knapsack selection then routing; runs in a worker process."""
+    timer = PhaseTimer()
+    items = job.items()
+    started = time.perf_counter()
+    with timer.phase("knapsack"):
+        result = solve(items, job.capacity_km, time_budget_ms=job.time_budget_ms, solver=job.solver)
+    remaining_ms = max(10.0, job.time_budget_ms - (time.perf_counter() - started) * 1000)
+    outcome = PlanOutcome(
+        result.solver, result.optimality_gap, result.table_cells, array("q", (it["id"] for it in result.selected))
+    )
+    with timer.phase("route"):
+        if job.pickup_delivery:
+            outcome.pickup_delivery = pickup_delivery_route(
+                job.courier_pos, result.selected, job.capacity_kg, time_budget_ms=remaining_ms
+            )
+        else:
+            points = [it["customer"] for it in result.selected]
+            order, outcome.initial_km, outcome.route_km = plan_route(job.courier_pos, points, time_budget_ms=remaining_ms)
+            outcome.selected_ids = array("q", (outcome.selected_ids[idx] for idx in order))
+    outcome.timings_ms = timer.timings_ms
+    return outcome
+
+
+def _warm_up() -> None:
+    # imports (numpy included) happen on the first task a worker runs
+    return None
+
+
+class OptimizerBusy(Exception):
+    """The pool is saturated and ON_SATURATED is "reject"."""
+
+
+class OptimizerExecutor:
+    """Runs plans in a process pool so a large DP does not hold the GIL of
+    the request worker that asked for it.
+
+    At most ``workers + max_queue`` jobs are in flight; beyond that the
+    caller gets an inline greedy plan (O(n log n)) or OptimizerBusy, per
+    ``on_saturated``. A job overrunning ``timeout_s`` is answered with the
+    greedy plan; it still runs to completion in its worker and keeps its
+    slot until then. ``workers=0`` solves inline in the calling thread.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE, timeout_s: float = DEFAULT_TIMEOUT_S, on_saturated: str = "greedy"):
+        if on_saturated not in ON_SATURATED:
+            raise ImproperlyConfigured(f"OPTIMIZER ON_SATURATED must be one of: {', '.join(ON_SATURATED)}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.on_saturated = on_saturated
+        self.in_flight = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the request server has threads (and DB
+                # connections) that a forked child must not inherit
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def start(self) -> None:
+        """Spawn the workers now rather than on the first plan."""
+        if self.workers > 0:
+            pool = self._get_pool()
+            for future in [pool.submit(_warm_up) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                return False
+            self.in_flight += 1
+            OPTIMIZER_QUEUE_DEPTH.set(self.in_flight)
+            return True
+
+    def _release(self, future=None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            OPTIMIZER_QUEUE_DEPTH.set(self.in_flight)
+
+    def submit(self, job: PlanJob) -> PlanOutcome:
+        if self.workers <= 0:
+            return run_plan(job)
+        if not self._acquire():
+            return self._fallback(job, "saturated")
+        try:
+            future = self._get_pool().submit(run_plan, job)
+        except BrokenProcessPool:
+            self._release()
+            self._reset()
+            return self._fallback(job, "error")
+        future.add_done_callback(self._release)
+        started = time.perf_counter()
+        try:
+            outcome = future.result(timeout=self.timeout_s)
+        except FutureTimeout:
+            future.cancel()  # only helps while still queued
+            return self._fallback(job, "timeout")
+        except BrokenProcessPool:
+            self._reset()
+            return self._fallback(job, "error")
+        # time spent queued and pickling, on top of the worker's own phases
+        outcome.timings_ms["wait"] = max(0.0, (time.perf_counter() - started) * 1000 - sum(outcome.timings_ms.values()))
+        return outcome
+
+    def _reset(self) -> None:
+        # a worker died (OOM kill...): the pool is unusable, start a new one
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fallback(self, job: PlanJob, reason: str) -> PlanOutcome:
+        action = "reject" if self.on_saturated == "reject" and reason == "saturated" else "greedy"
+        OPTIMIZER_FALLBACKS.inc(reason=reason, action=action)
+        if action == "reject":
+            raise OptimizerBusy(reason)
+        outcome = run_plan(replace(job, solver=GreedyRatioSolver.name, time_budget_ms=DEGRADED_BUDGET_MS))
+        outcome.degraded = reason
+        return outcome
+
+
+def build_executor() -> OptimizerExecutor:
+    # settings.OPTIMIZER = {"WORKERS": .., "MAX_QUEUE": .., "TIMEOUT_S": .., "ON_SATURATED": "greedy" | "reject",
+    #                       "WARM_UP": bool (start_in_background)}
+    config = getattr(settings, "OPTIMIZER", {})
+    return OptimizerExecutor(
+        workers=config.get("WORKERS", DEFAULT_WORKERS),
+        max_queue=config.get("MAX_QUEUE", DEFAULT_MAX_QUEUE),
+        timeout_s=config.get("TIMEOUT_S", DEFAULT_TIMEOUT_S),
+        on_saturated=config.get("ON_SATURATED", "greedy"),
+    )
+
+
+_executor: Optional[OptimizerExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> OptimizerExecutor:
+    global _executor
+    if _executor is None:
+        # the warm-up thread and the first request may get here together
+        with _executor_lock:
+            if _executor is None:
+                _executor = build_executor()
+    return _executor
+
+
+def start_in_background() -> Optional[threading.Thread]:
+    """Spawn the configured workers off the calling thread (config.asgi and
+    config.wsgi), so the first plans do not pay for process start-up and
+    imports."""
+    config = getattr(settings, "OPTIMIZER", {})
+    if config.get("WORKERS", DEFAULT_WORKERS) <= 0 or not config.get("WARM_UP", True):
+        return None
+    thread = threading.Thread(target=get_executor().start, name="optimizer-warm-up", daemon=True)
+    thread.start()
+    return thread
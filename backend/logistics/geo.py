@@ -0,0 +1,80 @@
+import math
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
+
+from .optimizer import EARTH_RADIUS_KM
+
+# Grid resolution in degrees (~2.2 km of latitude). Orders store the cell of
+# their customer and restaurant so radius queries become indexed IN lookups.
+CELL_SIZE_DEG = 0.02
+
+# Above this many cells the IN list costs more than it saves; callers then
+# fall back to the bounding-box range filter alone.
+MAX_QUERY_CELLS = 2500
+
+
+def valid_point(lat: float, lng: float) -> bool:
+    # finite and on the globe; NaN fails every comparison
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def cell_coords(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_SIZE_DEG), math.floor(lng / CELL_SIZE_DEG)
+
+
+def cell_key(lat: Optional[float], lng: Optional[float]) -> str:
+    if lat is None or lng is None:
+        return ""
+    row, col = cell_coords(lat, lng)
+    return f"{row}_{col}"
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    # (min_lat, max_lat, min_lng, max_lng) enclosing the circle of radius_km
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    widest_lat = min(90.0, abs(lat) + dlat)
+    cos_lat = math.cos(math.radians(widest_lat))
+    if cos_lat < 1e-9:
+        dlng = 180.0
+    else:
+        dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def cells_covering(lat: float, lng: float, radius_km: float) -> Optional[List[str]]:
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    row_lo, col_lo = cell_coords(min_lat, min_lng)
+    row_hi, col_hi = cell_coords(max_lat, max_lng)
+    if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > MAX_QUERY_CELLS:
+        return None
+    return [
+        f"{row}_{col}"
+        for row in range(row_lo, row_hi + 1)
+        for col in range(col_lo, col_hi + 1)
+    ]
+
+
+def filter_within_radius(queryset, center: Tuple[float, float], radius_km: float):
+    """Narrow an Order queryset to rows whose customer and restaurant both lie
+    in the bounding box of ``radius_km`` around ``center``.
+
+    This is a prefilter: any order whose courier->restaurant->customer distance
+    fits in ``radius_km`` is kept, but callers still need the exact distance.
+    """
+    lat, lng = center
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    queryset = queryset.filter(
+        location_lat__range=(min_lat, max_lat),
+        location_lng__range=(min_lng, max_lng),
+    )
+    restaurant_in_box = Q(
+        restaurant_lat__range=(min_lat, max_lat),
+        restaurant_lng__range=(min_lng, max_lng),
+    )
+    cells = cells_covering(lat, lng, radius_km)
+    if cells is None:
+        return queryset.filter(Q(restaurant_cell="") | restaurant_in_box)
+    return queryset.filter(location_cell__in=cells).filter(
+        Q(restaurant_cell="") | (Q(restaurant_cell__in=cells) & restaurant_in_box)
+    )
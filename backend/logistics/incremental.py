@@ -0,0 +1,323 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .optimizer import DEFAULT_RESOLUTION_KM, distance_units, haversine_km, order_distance_km
+from .solvers import _by_ratio, _dantzig_bound
+
+# Share of the plan that may change through local edits before the next
+# request pays for a full solve again.
+DEFAULT_DRIFT_THRESHOLD = 0.25
+# Plans of couriers who stopped asking are dropped after this long.
+PLAN_TTL_S = 120.0
+# A plan only hears about orders changed through its own process; however
+# often it is reused, a full solve comes due this long after seeding.
+MAX_PLAN_AGE_S = 60.0
+
+
+@dataclass
+class Candidate:
+    id: int
+    profit: float
+    distance_km: float
+    customer: Tuple[float, float]
+    weight: int  # distance_km in resolution units, as the DP solvers count it
+
+    @property
+    def ratio(self) -> float:
+        return self.profit / self.weight if self.weight else float("inf")
+
+
+class IncrementalPlan:
+    """A courier's drop-off plan updated one order at a time.
+
+    Keeps every eligible pending order (the pool), the selected ones in
+    visiting order and the leg lengths of that route. An order entering the
+    pool is inserted where it lengthens the route least, possibly evicting
+    lower profit-per-km orders; one leaving it is spliced out and the freed
+    capacity refilled by ratio. Each event costs O(n) distance evaluations
+    (n the route length) plus an O(m) pool scan on refill, against
+    O(m * W) for the DP.
+    """
+
+    def __init__(
+        self,
+        courier_pos: Tuple[float, float],
+        capacity_km: float,
+        items: Iterable[Dict],
+        route_ids: List[int],
+        solver: str,
+        resolution_km: float = DEFAULT_RESOLUTION_KM,
+    ):
+        self.courier_pos = courier_pos
+        self.capacity_km = capacity_km
+        self.solver = solver
+        self.resolution_km = resolution_km
+        self.W = distance_units(capacity_km, resolution_km)
+        self.pool: Dict[int, Candidate] = {}
+        for it in items:
+            self._add_to_pool(it["id"], it["profit"], it["distance_km"], it["customer"])
+        self.route: List[int] = [oid for oid in route_ids if oid in self.pool]
+        self.selected = set(self.route)
+        self.used = sum(self.pool[oid].weight for oid in self.route)
+        # legs[k]: distance into route[k] from route[k - 1] (the courier for k = 0)
+        self.legs: List[float] = []
+        prev = courier_pos
+        for oid in self.route:
+            point = self.pool[oid].customer
+            self.legs.append(haversine_km(prev[0], prev[1], point[0], point[1]))
+            prev = point
+        self.seed_size = len(self.route)
+        self.edits = 0
+
+    @property
+    def drift(self) -> float:
+        return self.edits / max(1, self.seed_size)
+
+    @property
+    def route_km(self) -> float:
+        return sum(self.legs)
+
+    def _add_to_pool(self, order_id, profit, distance_km, customer) -> Optional[Candidate]:
+        weight = distance_units(distance_km, self.resolution_km)
+        if distance_km > self.capacity_km or weight > self.W:
+            return None
+        candidate = Candidate(order_id, float(profit), distance_km, tuple(customer), weight)
+        self.pool[order_id] = candidate
+        return candidate
+
+    def _point(self, k: int) -> Tuple[float, float]:
+        return self.courier_pos if k < 0 else self.pool[self.route[k]].customer
+
+    def _insert(self, candidate: Candidate) -> None:
+        # cheapest insertion: one distance to every route node, O(n)
+        # to_x[k]: distance to x from the node before route[k] (courier first)
+        x = candidate.customer
+        to_x = [haversine_km(p[0], p[1], x[0], x[1]) for p in map(self._point, range(-1, len(self.route)))]
+        best_k, best_cost = len(self.route), to_x[-1]  # append after the last stop
+        for k in range(len(self.route)):
+            cost = to_x[k] + to_x[k + 1] - self.legs[k]
+            if cost < best_cost:
+                best_k, best_cost = k, cost
+        self.route.insert(best_k, candidate.id)
+        self.legs.insert(best_k, to_x[best_k])
+        if best_k + 1 < len(self.route):
+            self.legs[best_k + 1] = to_x[best_k + 1]
+        self.selected.add(candidate.id)
+        self.used += candidate.weight
+        self.edits += 1
+
+    def _splice(self, order_id: int) -> None:
+        k = self.route.index(order_id)
+        del self.route[k]
+        del self.legs[k]
+        if k < len(self.route):
+            prev, nxt = self._point(k - 1), self._point(k)
+            self.legs[k] = haversine_km(prev[0], prev[1], nxt[0], nxt[1])
+        self.selected.discard(order_id)
+        self.used -= self.pool[order_id].weight
+        self.edits += 1
+
+    def _refill(self) -> None:
+        while True:
+            room = self.W - self.used
+            fitting = [c for c in self.pool.values() if c.id not in self.selected and c.weight <= room]
+            if not fitting:
+                return
+            self._insert(max(fitting, key=lambda c: (c.ratio, c.profit)))
+
+    def add(self, order_id: int, profit: float, customer: Tuple[float, float], restaurant=None) -> bool:
+        """An order entered the pending pool; returns whether the plan took it."""
+        if order_id in self.pool:
+            return order_id in self.selected
+        distance_km = order_distance_km(self.courier_pos, customer, restaurant)
+        candidate = self._add_to_pool(order_id, profit, distance_km, customer)
+        if candidate is None:
+            return False
+        if self.used + candidate.weight <= self.W:
+            self._insert(candidate)
+            return True
+        # evict the worst profit-per-km orders if that buys a better total
+        evict, freed, lost = [], self.W - self.used, 0.0
+        for oid in sorted(self.selected, key=lambda oid: (self.pool[oid].ratio, self.pool[oid].profit)):
+            if freed >= candidate.weight:
+                break
+            if self.pool[oid].ratio >= candidate.ratio:
+                return False
+            evict.append(oid)
+            freed += self.pool[oid].weight
+            lost += self.pool[oid].profit
+        if freed < candidate.weight or lost >= candidate.profit:
+            return False
+        for oid in evict:
+            self._splice(oid)
+        self._insert(candidate)
+        self._refill()
+        return True
+
+    def remove(self, order_id: int) -> bool:
+        """An order left the pending pool; returns whether the plan changed."""
+        if order_id not in self.pool:
+            return False
+        changed = order_id in self.selected
+        if changed:
+            self._splice(order_id)
+        del self.pool[order_id]
+        if changed:
+            self._refill()
+        return changed
+
+    def payload(self, time_budget_ms: float) -> Dict:
+        # same shape as a full drop-off plan (orders.optimize)
+        selected = [self.pool[oid] for oid in self.route]
+        profit = sum(c.profit for c in selected)
+        ordered = _by_ratio([(c.weight, c.profit, c.id) for c in self.pool.values()])
+        bound = _dantzig_bound(ordered, self.W)
+        return {
+            "selected_order_ids": list(self.route),
+            "total_profit": profit,
+            "total_distance_km": sum(c.distance_km for c in selected),
+            "capacity_km": self.capacity_km,
+            "count": len(selected),
+            "route_distance_km": self.route_km,
+            "route_improvement_km": 0.0,
+            "solver": "incremental",
+            "optimality_gap": max(0.0, (bound - profit) / bound) if bound > 0 else 0.0,
+            "time_budget_ms": time_budget_ms,
+            "incremental": {"base_solver": self.solver, "edits": self.edits, "drift": self.drift},
+            "metrics": {"candidates": len(self.pool), "dp_table_cells": 0},
+        }
+
+
+@dataclass
+class _Entry:
+    signature: Hashable
+    plan: IncrementalPlan
+    seeded_at: float
+    used_at: float
+    # plan-cache pending version the plan accounts for (None: unchecked)
+    version: Optional[int]
+
+
+@dataclass
+class _Seeding:
+    started_at: float
+    version: Optional[int]
+    # order events raised while the seeding solve ran, replayed on seed()
+    events: List[Tuple] = field(default_factory=list)
+
+
+class IncrementalPlanner:
+    """The live IncrementalPlan of each courier, fed by order events
+    (logistics.signals). A plan is only reused for the same request
+    signature, and is dropped once it drifts past ``drift_threshold``, goes
+    ``ttl_s`` without being asked for, is ``max_age_s`` old, or the pending
+    version moved by more than the events it saw (orders changed through
+    another process)."""
+
+    def __init__(
+        self,
+        drift_threshold: float = DEFAULT_DRIFT_THRESHOLD,
+        ttl_s: float = PLAN_TTL_S,
+        max_age_s: float = MAX_PLAN_AGE_S,
+        clock=time.monotonic,
+    ):
+        self.drift_threshold = drift_threshold
+        self.ttl_s = ttl_s
+        self.max_age_s = max_age_s
+        self.clock = clock
+        self._plans: Dict[int, _Entry] = {}
+        self._seeding: Dict[int, _Seeding] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, courier_id: int, version: Optional[int] = None) -> None:
+        """A full solve for the courier starts: buffer the events from here
+        until seed(). ``version`` is the pending version read beforehand."""
+        with self._lock:
+            self._seeding[courier_id] = _Seeding(self.clock(), version)
+
+    def abandon(self, courier_id: int) -> None:
+        with self._lock:
+            self._seeding.pop(courier_id, None)
+
+    def seed(self, courier_id: int, signature: Hashable, plan: IncrementalPlan) -> None:
+        with self._lock:
+            seeding = self._seeding.pop(courier_id, None)
+            version = None
+            if seeding is not None:
+                for event in seeding.events:
+                    self._apply(plan, event)
+                if seeding.version is not None:
+                    version = seeding.version + len(seeding.events)
+            now = self.clock()
+            self._plans[courier_id] = _Entry(signature, plan, now, now, version)
+
+    def payload(self, courier_id: int, signature: Hashable, time_budget_ms: float, version: Optional[int] = None) -> Optional[Dict]:
+        """The courier's updated plan, or None when a full solve is due."""
+        with self._lock:
+            entry = self._plans.get(courier_id)
+            if entry is None:
+                return None
+            now = self.clock()
+            if (
+                entry.signature != signature
+                or entry.plan.drift > self.drift_threshold
+                or entry.used_at + self.ttl_s <= now
+                or entry.seeded_at + self.max_age_s <= now
+                or (version is not None and entry.version is not None and version != entry.version)
+            ):
+                del self._plans[courier_id]
+                return None
+            entry.used_at = now
+            return entry.plan.payload(time_budget_ms)
+
+    def forget(self, courier_id: int) -> None:
+        with self._lock:
+            self._plans.pop(courier_id, None)
+
+    def order_added(self, order_id: int, profit: float, customer, restaurant=None) -> None:
+        self._dispatch(("add", order_id, profit, customer, restaurant))
+
+    def order_removed(self, order_id: int) -> None:
+        self._dispatch(("remove", order_id))
+
+    def _dispatch(self, event: Tuple) -> None:
+        with self._lock:
+            self._expire()
+            for entry in self._plans.values():
+                self._apply(entry.plan, event)
+                if entry.version is not None:
+                    entry.version += 1
+            for seeding in self._seeding.values():
+                seeding.events.append(event)
+
+    @staticmethod
+    def _apply(plan: IncrementalPlan, event: Tuple) -> None:
+        if event[0] == "add":
+            plan.add(*event[1:])
+        else:
+            plan.remove(event[1])
+
+    def _expire(self) -> None:
+        now = self.clock()
+        for courier_id in [cid for cid, e in self._plans.items() if min(e.used_at + self.ttl_s, e.seeded_at + self.max_age_s) <= now]:
+            del self._plans[courier_id]
+        # a solve that failed or degraded never calls seed()
+        for courier_id in [cid for cid, s in self._seeding.items() if s.started_at + self.ttl_s <= now]:
+            del self._seeding[courier_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._seeding.clear()
+
+
+_planner: Optional[IncrementalPlanner] = None
+
+
+def get_incremental_planner() -> IncrementalPlanner:
+    global _planner
+    if _planner is None:
+        _planner = IncrementalPlanner()
+    return _planner
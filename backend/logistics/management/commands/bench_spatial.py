@@ -0,0 +1,86 @@
+import math
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from logistics.geo import filter_within_radius
+from orders.models import Order
+
+CENTER = (33.5731, -7.5898)  # Casablanca
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark pending-order candidate lookup (full scan vs spatial prefilter) "
+        "as the backlog grows. Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+        parser.add_argument("--radius", type=float, default=10.0, help="capacity_km used for the lookup")
+        parser.add_argument(
+            "--density",
+            type=float,
+            default=0.5,
+            help="pending orders per km²; the covered area grows with the backlog",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.stdout.write(f"{'pending':>8} {'scan_ms':>10} {'indexed_ms':>11} {'candidates':>11}")
+        for size in options["sizes"]:
+            try:
+                with transaction.atomic():
+                    self._seed(rng, size, options["density"])
+                    scan_ms, _ = self._time(
+                        lambda: list(Order.objects.filter(status=Order.Status.PENDING)), options["repeat"]
+                    )
+                    indexed_ms, found = self._time(
+                        lambda: list(
+                            filter_within_radius(
+                                Order.objects.filter(status=Order.Status.PENDING), CENTER, options["radius"]
+                            )
+                        ),
+                        options["repeat"],
+                    )
+                    self.stdout.write(f"{size:>8} {scan_ms:>10.2f} {indexed_ms:>11.2f} {len(found):>11}")
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _seed(self, rng, size, density):
+        half_side_km = math.sqrt(size / density) / 2
+        dlat = half_side_km / 111.0
+        dlng = half_side_km / (111.0 * math.cos(math.radians(CENTER[0])))
+        batch = []
+        for i in range(size):
+            lat = CENTER[0] + rng.uniform(-dlat, dlat)
+            lng = CENTER[1] + rng.uniform(-dlng, dlng)
+            order = Order(
+                customer_phone=f"+2126{i:08d}",
+                location_lat=lat,
+                location_lng=lng,
+                restaurant_lat=lat + rng.uniform(-0.01, 0.01),
+                restaurant_lng=lng + rng.uniform(-0.01, 0.01),
+                delivery_price_offer=Decimal(rng.randint(10, 40)),
+                status=Order.Status.PENDING,
+            )
+            order.refresh_cells()
+            batch.append(order)
+        Order.objects.bulk_create(batch, batch_size=2000)
+
+    def _time(self, fn, repeat):
+        result = fn()  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        return (time.perf_counter() - start) * 1000 / repeat, result
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from logistics.dispatch import DEFAULT_MAX_KM, DEFAULT_MAX_ORDERS, run_round
+
+
+class Command(BaseCommand):
+    help = (
+        "Run dispatch rounds: assign pending orders to idle couriers (live "
+        "position, no active order) by minimum total distance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=5.0, help="seconds between rounds")
+        parser.add_argument("--rounds", type=int, default=0, help="stop after this many rounds (0 = run forever)")
+        parser.add_argument("--once", action="store_true", help="same as --rounds 1")
+        parser.add_argument("--max-km", type=float, default=DEFAULT_MAX_KM, help="longest courier->order trip")
+        parser.add_argument("--max-orders", type=int, default=DEFAULT_MAX_ORDERS, help="oldest pending orders per round")
+        parser.add_argument("--dry-run", action="store_true", help="solve and report without assigning")
+
+    def handle(self, *args, **options):
+        rounds = 1 if options["once"] else options["rounds"]
+        done = 0
+        self.stdout.write(
+            f"{'round':>5} {'couriers':>8} {'orders':>7} {'assigned':>8} {'conflicts':>9} "
+            f"{'solve_ms':>9} {'apply_ms':>9} {'assign/s':>9}"
+        )
+        while True:
+            started = time.monotonic()
+            result = run_round(options["max_km"], options["max_orders"], options["dry_run"])
+            done += 1
+            self.stdout.write(
+                f"{done:>5} {result.couriers:>8} {result.orders:>7} {len(result.assigned):>8} {result.conflicts:>9} "
+                f"{result.solve_ms:>9.1f} {result.apply_ms:>9.1f} {result.throughput:>9.1f}"
+            )
+            if rounds and done >= rounds:
+                break
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started)))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("accounts", "0002_user_cne_user_phone_alter_user_capacity_kg"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourierLocation",
+            fields=[
+                (
+                    "courier",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="location",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("lat", models.FloatField()),
+                ("lng", models.FloatField()),
+                ("recorded_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
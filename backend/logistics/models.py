@@ -1,3 +1,16 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class CourierLocation(models.Model):
+    # latest known position per courier, flushed in batches from
+    # logistics.positions; the in-memory store is the hot copy
+    courier = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="location"
+    )
+    lat = models.FloatField()
+    lng = models.FloatField()
+    recorded_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.courier_id} @ ({self.lat:.5f}, {self.lng:.5f})"
@@ -1,9 +1,17 @@
 import math
-from typing import List, Dict, Tuple
+from array import array
+from typing import List, Dict, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the scalar code below is the fallback
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
 
 
 def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     dlat = math.radians(lat2 - lat1)
     dlng = math.radians(lng2 - lng1)
     a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
@@ -20,36 +28,111 @@ def order_distance_km(courier: Tuple[float, float], customer: Tuple[float, float
     return haversine_km(clat, clng, plat, plng)
 
 
-def knapsack_max_profit(items: List[Dict], capacity_km: float) -> List[Dict]:
+def _haversine_np(lat1, lng1, lat2, lng2):
+    # same formula as haversine_km, broadcast over numpy arrays (degrees in, km out)
+    lat1, lng1, lat2, lng2 = (np.radians(a) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def order_distances_km(
+    courier: Tuple[float, float],
+    customers: Sequence[Tuple[float, float]],
+    restaurants: Sequence[Optional[Tuple[float, float]]],
+) -> List[float]:
+    # batched order_distance_km: one courier->restaurant->customer distance per order
+    if np is None or not customers:
+        return [order_distance_km(courier, c, r) for c, r in zip(customers, restaurants)]
+    clat, clng = courier
+    cust = np.asarray(customers, dtype=float)
+    rest = np.array(
+        [r if r and r[0] is not None and r[1] is not None else (np.nan, np.nan) for r in restaurants],
+        dtype=float,
+    )
+    direct = _haversine_np(clat, clng, cust[:, 0], cust[:, 1])
+    via = _haversine_np(clat, clng, rest[:, 0], rest[:, 1]) + _haversine_np(rest[:, 0], rest[:, 1], cust[:, 0], cust[:, 1])
+    return np.where(np.isnan(rest[:, 0]), direct, via).tolist()
+
+
+def distance_matrix_km(points: Sequence[Tuple[float, float]]):
+    # full pairwise haversine matrix; a numpy array when available, else list of lists
+    if np is None:
+        return [[haversine_km(a[0], a[1], b[0], b[1]) for b in points] for a in points]
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    return _haversine_np(pts[:, 0, None], pts[:, 1, None], pts[None, :, 0], pts[None, :, 1])
+
+
+# default DP granularity: distances are truncated to multiples of 0.1 km
+DEFAULT_RESOLUTION_KM = 0.1
+
+
+def distance_units(distance_km: float, resolution_km: float = DEFAULT_RESOLUTION_KM) -> int:
+    # knapsack weight of a distance; every solver and the incremental plan
+    # use this so they agree on what fits (0.3 / 0.1 is 2.999..., 0.3 * 10 is 3)
+    return int(distance_km * (1.0 / resolution_km))
+
+
+def knapsack_max_profit(items: List[Dict], capacity_km: float, resolution_km: float = DEFAULT_RESOLUTION_KM) -> List[Dict]:
     # items: [{id, profit, distance_km}]
-    n = len(items)
-    # scale distances to integers to use DP; granularity 0.1 km
-    scale = 10
-    W = int(capacity_km * scale)
-    dp = [[0] * (W + 1) for _ in range(n + 1)]
-    keep = [[False] * (W + 1) for _ in range(n + 1)]
-    for i in range(1, n + 1):
-        w_i = int(items[i - 1]["distance_km"] * scale)
-        v_i = float(items[i - 1]["profit"])  # profit as float
-        for w in range(W + 1):
-            if w_i <= w and dp[i - 1][w - w_i] + v_i > dp[i - 1][w]:
-                dp[i][w] = dp[i - 1][w - w_i] + v_i
-                keep[i][w] = True
-            else:
-                dp[i][w] = dp[i - 1][w]
+    # 0/1 knapsack over integer distance units with a rolling 1-D value array;
+    # one bit per (item, capacity) records the choice for reconstruction.
+    W = distance_units(capacity_km, resolution_km)
+    if W < 0:
+        return []
+    weights = [distance_units(it["distance_km"], resolution_km) for it in items]
+    # items that cannot fit on their own never enter the table
+    candidates = [i for i, w_i in enumerate(weights) if w_i <= W]
+    if np is not None:
+        keep = _knapsack_keep_np(items, weights, candidates, W)
+    else:
+        keep = _knapsack_keep_py(items, weights, candidates, W)
     # reconstruct
     res: List[Dict] = []
     w = W
-    for i in range(n, 0, -1):
-        if keep[i][w]:
-            res.append(items[i - 1])
-            w -= int(items[i - 1]["distance_km"] * scale)
+    for k in range(len(candidates) - 1, -1, -1):
+        if (keep[k][w >> 3] >> (w & 7)) & 1:
+            i = candidates[k]
+            res.append(items[i])
+            w -= weights[i]
     res.reverse()
     return res
 
 
+def _knapsack_keep_py(items: List[Dict], weights: List[int], candidates: List[int], W: int) -> List[bytearray]:
+    dp = array("d", bytes(8 * (W + 1)))
+    keep = []
+    for i in candidates:
+        w_i = weights[i]
+        v_i = float(items[i]["profit"])  # profit as float
+        bits = bytearray((W >> 3) + 1)
+        # descending so dp[w - w_i] still holds the previous row
+        for w in range(W, w_i - 1, -1):
+            c = dp[w - w_i] + v_i
+            if c > dp[w]:
+                dp[w] = c
+                bits[w >> 3] |= 1 << (w & 7)
+        keep.append(bits)
+    return keep
+
+
+def _knapsack_keep_np(items: List[Dict], weights: List[int], candidates: List[int], W: int):
+    dp = np.zeros(W + 1)
+    keep = np.zeros((len(candidates), (W >> 3) + 1), dtype=np.uint8)
+    take = np.zeros(W + 1, dtype=bool)
+    for k, i in enumerate(candidates):
+        w_i = weights[i]
+        c = dp[: W + 1 - w_i] + float(items[i]["profit"])
+        take[:w_i] = False
+        np.greater(c, dp[w_i:], out=take[w_i:])
+        np.copyto(dp[w_i:], c, where=take[w_i:])
+        keep[k] = np.packbits(take, bitorder="little")
+    return keep
+
+
 def nearest_neighbor_route(start: Tuple[float, float], points: List[Tuple[float, float]]) -> List[int]:
     # returns order of indices into points by nearest neighbor
+    if np is not None and points:
+        return _nearest_neighbor_route_np(start, points)
     remaining = list(range(len(points)))
     route: List[int] = []
     current = start
@@ -59,3 +142,17 @@ def nearest_neighbor_route(start: Tuple[float, float], points: List[Tuple[float,
         current = points[nearest_idx]
         remaining.remove(nearest_idx)
     return route
+
+
+def _nearest_neighbor_route_np(start: Tuple[float, float], points: List[Tuple[float, float]]) -> List[int]:
+    # row 0 of the matrix is the start; argmin keeps the scalar tie-break (lowest index)
+    dist = distance_matrix_km([start] + list(points))[:, 1:]
+    visited = np.zeros(len(points), dtype=bool)
+    route: List[int] = []
+    row = 0
+    for _ in range(len(points)):
+        nearest_idx = int(np.argmin(np.where(visited, np.inf, dist[row])))
+        route.append(nearest_idx)
+        visited[nearest_idx] = True
+        row = nearest_idx + 1
+    return route
@@ -0,0 +1,237 @@
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .geo import cell_key, cells_covering
+from .optimizer import haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Pings older than this are treated as unknown (courier offline or lost GPS).
+POSITION_TTL_S = 120.0
+# Dirty positions reach the database at most this often per process.
+FLUSH_INTERVAL_S = 5.0
+
+
+@dataclass
+class Position:
+    courier_id: int
+    lat: float
+    lng: float
+    recorded_at: float  # unix seconds
+
+    @property
+    def point(self) -> Tuple[float, float]:
+        return (self.lat, self.lng)
+
+
+class PositionStore:
+    """Latest position per courier, held in process memory.
+
+    Lookups by courier are dict hits; a grid index on logistics.geo cells
+    answers "who is near this point" without scanning every courier.
+    Updates are marked dirty and written to CourierLocation in one bulk
+    upsert at most every ``flush_interval_s``.
+    """
+
+    def __init__(self, ttl_s: float = POSITION_TTL_S, flush_interval_s: float = FLUSH_INTERVAL_S, clock=time.time):
+        self.ttl_s = ttl_s
+        self.flush_interval_s = flush_interval_s
+        self.clock = clock
+        self._positions: Dict[int, Position] = {}
+        self._cells: Dict[str, Set[int]] = {}
+        self._dirty: Set[int] = set()
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    def update(self, courier_id: int, lat: float, lng: float, recorded_at: Optional[float] = None) -> Position:
+        position = Position(courier_id, lat, lng, self.clock() if recorded_at is None else recorded_at)
+        with self._lock:
+            previous = self._positions.get(courier_id)
+            if previous is not None and previous.recorded_at > position.recorded_at:
+                return previous  # late, out-of-order ping
+            self._move(previous, position)
+            self._positions[courier_id] = position
+            self._dirty.add(courier_id)
+        return position
+
+    def get(self, courier_id: int) -> Optional[Position]:
+        position = self._positions.get(courier_id)
+        if position is None or self._expired(position):
+            return None
+        return position
+
+    def fresh(self) -> List[Position]:
+        return [p for p in list(self._positions.values()) if not self._expired(p)]
+
+    def nearest(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[float, Position]]:
+        # (distance_km, position) of live couriers within radius_km, closest first
+        cells = cells_covering(lat, lng, radius_km)
+        if cells is None:
+            candidates = self.fresh()
+        else:
+            ids = set()
+            for cell in cells:
+                ids |= self._cells.get(cell, set())
+            candidates = [p for p in (self._positions.get(i) for i in ids) if p is not None and not self._expired(p)]
+        found = []
+        for p in candidates:
+            d = haversine_km(lat, lng, p.lat, p.lng)
+            if d <= radius_km:
+                found.append((d, p))
+        found.sort(key=lambda t: t[0])
+        return found[:limit] if limit is not None else found
+
+    def expire(self) -> int:
+        with self._lock:
+            stale = [p for p in self._positions.values() if self._expired(p)]
+            for p in stale:
+                self._move(p, None)
+                del self._positions[p.courier_id]
+                self._dirty.discard(p.courier_id)
+        return len(stale)
+
+    def flush_due(self) -> bool:
+        return bool(self._dirty) and self.clock() - self._last_flush >= self.flush_interval_s
+
+    def flush(self, force: bool = False) -> int:
+        """Upsert dirty positions into CourierLocation; returns rows written."""
+        from .models import CourierLocation
+
+        with self._lock:
+            if not force and not self.flush_due():
+                return 0
+            batch = [self._positions[i] for i in self._dirty if i in self._positions]
+            self._dirty.clear()
+            self._last_flush = self.clock()
+        if not batch:
+            return 0
+        # couriers deleted since their last ping would violate the FK
+        known = set(
+            get_user_model().objects.filter(pk__in=[p.courier_id for p in batch]).values_list("pk", flat=True)
+        )
+        batch = [p for p in batch if p.courier_id in known]
+        CourierLocation.objects.bulk_create(
+            [
+                CourierLocation(
+                    courier_id=p.courier_id,
+                    lat=p.lat,
+                    lng=p.lng,
+                    recorded_at=datetime.fromtimestamp(p.recorded_at, tz=dt_timezone.utc),
+                )
+                for p in batch
+            ],
+            update_conflicts=True,
+            unique_fields=["courier"],
+            update_fields=["lat", "lng", "recorded_at"],
+        )
+        return len(batch)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._positions.clear()
+            self._cells.clear()
+            self._dirty.clear()
+
+    def _expired(self, position: Position) -> bool:
+        return self.clock() - position.recorded_at > self.ttl_s
+
+    def _move(self, old: Optional[Position], new: Optional[Position]) -> None:
+        old_cell = cell_key(old.lat, old.lng) if old is not None else None
+        new_cell = cell_key(new.lat, new.lng) if new is not None else None
+        if old_cell == new_cell:
+            return
+        if old_cell is not None:
+            members = self._cells.get(old_cell)
+            if members is not None:
+                members.discard(old.courier_id)
+                if not members:
+                    del self._cells[old_cell]
+        if new_cell is not None:
+            self._cells.setdefault(new_cell, set()).add(new.courier_id)
+
+
+class PositionFlusher:
+    """Flushes a PositionStore every ``flush_interval_s`` from a daemon
+    thread, so the last pings of a courier who went quiet still reach the
+    database, and once more at interpreter exit."""
+
+    def __init__(self, store: PositionStore):
+        self.store = store
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="position-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        atexit.unregister(self.stop)
+        self._stop.set()
+        thread.join()
+        self._flush(force=True)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(self.store.flush_interval_s):
+                self._flush(force=False)
+        finally:
+            # not a request thread: nothing else closes its connection
+            connection.close()
+
+    def _flush(self, force: bool) -> None:
+        try:
+            self.store.flush(force=force)
+        except Exception:
+            logger.exception("courier position flush failed")
+
+
+store = PositionStore()
+flusher = PositionFlusher(store)
+
+
+def record_ping(courier_id: int, lat: float, lng: float) -> Position:
+    # ingestion entry point for HTTP and WebSocket pings; the DB write is
+    # amortised over every ping that arrives within the flush interval, and
+    # the flusher thread writes what is left once pings stop
+    position = store.update(courier_id, lat, lng)
+    if getattr(settings, "POSITION_FLUSHER", False) and not flusher.running:
+        flusher.start()
+    if store.flush_due():
+        store.flush()
+    return position
+
+
+def latest_position(courier_id: int) -> Optional[Tuple[float, float]]:
+    # memory first; another worker process may have taken the ping, so fall
+    # back to the last flushed row while it is still within the TTL
+    position = store.get(courier_id)
+    if position is not None:
+        return position.point
+    from .models import CourierLocation
+
+    cutoff = datetime.now(dt_timezone.utc) - timedelta(seconds=store.ttl_s)
+    row = CourierLocation.objects.filter(courier_id=courier_id, recorded_at__gte=cutoff).values_list("lat", "lng").first()
+    return tuple(row) if row else None
@@ -0,0 +1,339 @@
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .optimizer import distance_matrix_km, haversine_km, nearest_neighbor_route
+
+# Above this many stops the matrix-based nearest neighbour (O(n^2) memory) is
+# replaced by the grid construction below.
+GRID_ROUTE_THRESHOLD = 500
+# Local search needs the full matrix; beyond this the constructed tour is kept.
+MAX_IMPROVE_POINTS = 1500
+DEFAULT_MAX_ITERATIONS = 50
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+_KM_PER_DEG_LAT = 110.574
+
+
+def route_length_km(start: Tuple[float, float], points: Sequence[Tuple[float, float]], order: Sequence[int]) -> float:
+    # open tour: start -> points[order[0]] -> ... -> points[order[-1]]
+    total = 0.0
+    current = start
+    for idx in order:
+        total += haversine_km(current[0], current[1], points[idx][0], points[idx][1])
+        current = points[idx]
+    return total
+
+
+def grid_nearest_neighbor_route(start: Tuple[float, float], points: Sequence[Tuple[float, float]]) -> List[int]:
+    """Nearest-neighbour tour using a uniform grid over an equirectangular
+    projection, so each step only scans the rings of cells around the current
+    position instead of every remaining point."""
+    n = len(points)
+    if n == 0:
+        return []
+    lat0 = math.radians(start[0])
+    kx = _KM_PER_DEG_LAT * math.cos(lat0)
+    xy = [(p[1] * kx, p[0] * _KM_PER_DEG_LAT) for p in points]
+    xs = [x for x, _ in xy]
+    ys = [y for _, y in xy]
+    area = max(max(xs) - min(xs), 1e-6) * max(max(ys) - min(ys), 1e-6)
+    # about two points per cell on average
+    cell = max(math.sqrt(2 * area / n), 1e-3)
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    for idx, (x, y) in enumerate(xy):
+        grid.setdefault((int(x // cell), int(y // cell)), []).append(idx)
+    min_i = min(k[0] for k in grid)
+    max_i = max(k[0] for k in grid)
+    min_j = min(k[1] for k in grid)
+    max_j = max(k[1] for k in grid)
+
+    route: List[int] = []
+    cx, cy = start[1] * kx, start[0] * _KM_PER_DEG_LAT
+    remaining = n
+    while remaining:
+        ci, cj = int(cx // cell), int(cy // cell)
+        best, best_d2 = -1, float("inf")
+        ring = 0
+        last_ring = max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+        while ring <= last_ring:
+            for key in _ring_cells(ci, cj, ring):
+                for idx in grid.get(key, ()):
+                    x, y = xy[idx]
+                    d2 = (x - cx) ** 2 + (y - cy) ** 2
+                    if d2 < best_d2 or (d2 == best_d2 and idx < best):
+                        best, best_d2 = idx, d2
+            # every unseen point is at least `ring * cell` away
+            if best >= 0 and best_d2 <= (ring * cell) ** 2:
+                break
+            ring += 1
+        bucket = grid[(int(xy[best][0] // cell), int(xy[best][1] // cell))]
+        bucket.remove(best)
+        route.append(best)
+        cx, cy = xy[best]
+        remaining -= 1
+    return route
+
+
+def _ring_cells(ci: int, cj: int, ring: int):
+    if ring == 0:
+        yield (ci, cj)
+        return
+    for di in range(-ring, ring + 1):
+        yield (ci + di, cj - ring)
+        yield (ci + di, cj + ring)
+    for dj in range(-ring + 1, ring):
+        yield (ci - ring, cj + dj)
+        yield (ci + ring, cj + dj)
+
+
+def _tour_cost(tour: List[int], D) -> float:
+    return sum(D[tour[k]][tour[k + 1]] for k in range(len(tour) - 1))
+
+
+def two_opt(tour: List[int], D, deadline: Optional[float] = None, max_iterations: int = DEFAULT_MAX_ITERATIONS) -> List[int]:
+    # tour[0] is the fixed start; the path is open so the last edge has no successor
+    n = len(tour)
+    for _ in range(max_iterations):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, n):
+                c = tour[j]
+                d = tour[j + 1] if j + 1 < n else None
+                delta = D[a][c] - D[a][b]
+                if d is not None:
+                    delta += D[b][d] - D[c][d]
+                if delta < -1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    a, b = tour[i - 1], tour[i]
+                    improved = True
+            if deadline is not None and time.perf_counter() > deadline:
+                return tour
+        if not improved:
+            break
+    return tour
+
+
+def or_opt(tour: List[int], D, deadline: Optional[float] = None, max_iterations: int = DEFAULT_MAX_ITERATIONS) -> List[int]:
+    # move segments of 1-3 consecutive stops (optionally reversed) elsewhere in the tour
+    for _ in range(max_iterations):
+        improved = False
+        for seg_len in OR_OPT_SEGMENT_LENGTHS:
+            i = 1
+            while i + seg_len <= len(tour):
+                n = len(tour)
+                j = i + seg_len - 1
+                prev, first, last = tour[i - 1], tour[i], tour[j]
+                nxt = tour[j + 1] if j + 1 < n else None
+                removed = D[prev][first] + (D[last][nxt] - D[prev][nxt] if nxt is not None else 0.0)
+                best = None
+                for k in range(0, n):
+                    if i - 1 <= k <= j:
+                        continue
+                    p, q = tour[k], tour[k + 1] if k + 1 < n else None
+                    base = D[p][q] if q is not None else 0.0
+                    for rev in (False, True):
+                        head, tail = (last, first) if rev else (first, last)
+                        added = D[p][head] + (D[tail][q] if q is not None else 0.0) - base
+                        gain = removed - added
+                        if gain > 1e-9 and (best is None or gain > best[0]):
+                            best = (gain, k, rev)
+                if best is not None:
+                    _, k, rev = best
+                    segment = tour[i:j + 1]
+                    if rev:
+                        segment.reverse()
+                    rest = tour[:i] + tour[j + 1:]
+                    insert_at = k + 1 if k < i else k + 1 - seg_len
+                    tour[:] = rest[:insert_at] + segment + rest[insert_at:]
+                    improved = True
+                i += 1
+                if deadline is not None and time.perf_counter() > deadline:
+                    return tour
+        if not improved:
+            break
+    return tour
+
+
+def plan_route(
+    start: Tuple[float, float],
+    points: Sequence[Tuple[float, float]],
+    time_budget_ms: float = 50.0,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+) -> Tuple[List[int], float, float]:
+    # nearest-neighbour construction followed by 2-opt and Or-opt under a time cap;
+    # returns (order of indices into points, initial km, improved km)
+    deadline = time.perf_counter() + time_budget_ms / 1000.0
+    if len(points) > GRID_ROUTE_THRESHOLD:
+        order = grid_nearest_neighbor_route(start, points)
+    else:
+        order = nearest_neighbor_route(start, list(points))
+    initial = route_length_km(start, points, order)
+    if len(points) < 2 or len(points) > MAX_IMPROVE_POINTS:
+        return order, initial, initial
+    D = distance_matrix_km([start] + list(points))
+    if hasattr(D, "tolist"):
+        D = D.tolist()
+    tour = [0] + [idx + 1 for idx in order]
+    best = _tour_cost(tour, D)
+    while time.perf_counter() < deadline:
+        two_opt(tour, D, deadline, max_iterations)
+        or_opt(tour, D, deadline, max_iterations)
+        cost = _tour_cost(tour, D)
+        if cost >= best - 1e-9:
+            break
+        best = cost
+    order = [node - 1 for node in tour[1:]]
+    return order, initial, route_length_km(start, points, order)
+
+
+
+@dataclass
+class Stop:
+    kind: str  # "pickup" or "dropoff"
+    location: Tuple[float, float]
+    order_ids: List[int]
+    restaurant_name: str = ""
+    load_kg: float = 0.0  # carried when leaving the stop
+
+
+@dataclass
+class PickupDeliveryPlan:
+    stops: List[Stop]
+    initial_km: float
+    distance_km: float
+    unserved_order_ids: List[int] = field(default_factory=list)
+
+    @property
+    def delivery_order_ids(self) -> List[int]:
+        return [oid for stop in self.stops if stop.kind == "dropoff" for oid in stop.order_ids]
+
+
+def _pd_feasible(tour: List[int], stops: List[Stop], weights: Dict[int, float], onboard: set, onboard_kg: float, capacity_kg: float) -> bool:
+    # every drop after its pickup, and the cumulative load never above capacity
+    load = onboard_kg
+    carried = set(onboard)
+    for k in tour:
+        stop = stops[k]
+        if stop.kind == "pickup":
+            carried.update(stop.order_ids)
+            load += sum(weights[oid] for oid in stop.order_ids)
+            if load > capacity_kg + 1e-9:
+                return False
+        else:
+            if stop.order_ids[0] not in carried:
+                return False
+            load -= weights[stop.order_ids[0]]
+    return True
+
+
+def _pd_cost(tour: List[int], D) -> float:
+    # D is indexed by stop index + 1, with row 0 the courier start
+    cost, prev = 0.0, 0
+    for k in tour:
+        cost += D[prev][k + 1]
+        prev = k + 1
+    return cost
+
+
+def pickup_delivery_route(
+    start: Tuple[float, float],
+    orders: List[Dict],
+    capacity_kg: float,
+    time_budget_ms: float = 50.0,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+) -> PickupDeliveryPlan:
+    """Route through restaurants and customers with precedence and load limits.
+
+    ``orders`` are dicts with ``id``, ``customer`` and ``restaurant`` (lat, lng)
+    tuples (restaurant may be None), ``restaurant_name`` and ``weight_kg``.
+    Orders sharing a restaurant name are collected at one pickup stop when the
+    bag allows it; orders without restaurant coordinates are already on board.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000.0
+    weights: Dict[int, float] = {}
+    customers: Dict[int, Tuple[float, float]] = {}
+    unserved: List[int] = []
+    onboard: set = set()
+    onboard_kg = 0.0
+    groups: Dict[str, Dict] = {}
+    for o in orders:
+        oid, weight = o["id"], float(o.get("weight_kg") or 0.0)
+        restaurant = o.get("restaurant")
+        if weight > capacity_kg or (restaurant is None and onboard_kg + weight > capacity_kg):
+            unserved.append(oid)
+            continue
+        weights[oid] = weight
+        customers[oid] = o["customer"]
+        if restaurant is None:
+            onboard.add(oid)
+            onboard_kg += weight
+            continue
+        name = o.get("restaurant_name") or ""
+        key = name or f"{restaurant[0]},{restaurant[1]}"
+        group = groups.setdefault(key, {"location": restaurant, "name": name, "pending": []})
+        group["pending"].append(oid)
+
+    # greedy construction: always drive to the nearest stop that keeps the plan feasible
+    stops: List[Stop] = []
+    pos, load = start, onboard_kg
+    carrying = set(onboard)
+    while carrying or any(g["pending"] for g in groups.values()):
+        best = None
+        for oid in sorted(carrying):
+            d = haversine_km(pos[0], pos[1], customers[oid][0], customers[oid][1])
+            if best is None or d < best[0]:
+                best = (d, Stop("dropoff", customers[oid], [oid]))
+        for group in groups.values():
+            take, room = [], capacity_kg - load
+            for oid in group["pending"]:
+                if weights[oid] <= room:
+                    take.append(oid)
+                    room -= weights[oid]
+            if not take:
+                continue
+            loc = group["location"]
+            d = haversine_km(pos[0], pos[1], loc[0], loc[1])
+            if best is None or d < best[0]:
+                best = (d, Stop("pickup", loc, take, group["name"]), group)
+        stop = best[1]
+        if stop.kind == "pickup":
+            group = best[2]
+            group["pending"] = [oid for oid in group["pending"] if oid not in stop.order_ids]
+            carrying.update(stop.order_ids)
+            load += sum(weights[oid] for oid in stop.order_ids)
+        else:
+            carrying.discard(stop.order_ids[0])
+            load -= weights[stop.order_ids[0]]
+        stops.append(stop)
+        pos = stop.location
+
+    D = distance_matrix_km([start] + [s.location for s in stops])
+    if hasattr(D, "tolist"):
+        D = D.tolist()
+    tour = list(range(len(stops)))
+    initial = best_cost = _pd_cost(tour, D)
+    # relocate single stops while precedence and capacity still hold
+    for _ in range(max_iterations):
+        improved = False
+        for i in range(len(tour)):
+            for j in range(len(tour)):
+                if i == j or time.perf_counter() > deadline:
+                    continue
+                candidate = tour[:i] + tour[i + 1:]
+                candidate.insert(j, tour[i])
+                cost = _pd_cost(candidate, D)
+                if cost < best_cost - 1e-9 and _pd_feasible(candidate, stops, weights, onboard, onboard_kg, capacity_kg):
+                    tour, best_cost, improved = candidate, cost, True
+        if not improved or time.perf_counter() > deadline:
+            break
+
+    ordered, load = [], onboard_kg
+    for k in tour:
+        stop = stops[k]
+        delta = sum(weights[oid] for oid in stop.order_ids)
+        load += delta if stop.kind == "pickup" else -delta
+        stop.load_kg = load
+        ordered.append(stop)
+    return PickupDeliveryPlan(ordered, initial, best_cost, unserved)
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from orders.models import Order
+from orders.signals import order_event
+
+from .cache import get_plan_cache
+from .incremental import get_incremental_planner
+
+# events that add an order to, or remove one from, the pending pool
+PENDING_SET_EVENTS = {"created", "accepted", "cancelled"}
+
+
+@receiver(order_event)
+def bump_pending_version(sender, kind, order, **kwargs):
+    if kind in PENDING_SET_EVENTS:
+        get_plan_cache().bump()
+
+
+@receiver(order_event)
+def update_incremental_plans(sender, kind, order, **kwargs):
+    if kind not in PENDING_SET_EVENTS:
+        return
+    planner = get_incremental_planner()
+    if order.status == Order.Status.PENDING:
+        planner.order_added(
+            order.id, float(order.delivery_price_offer),
+            (order.location_lat, order.location_lng), (order.restaurant_lat, order.restaurant_lng),
+        )
+    else:
+        planner.order_removed(order.id)
+
+
+@receiver(post_delete, sender=Order)
+def bump_on_pending_delete(sender, instance, **kwargs):
+    if instance.status == Order.Status.PENDING:
+        get_plan_cache().bump()
+        get_incremental_planner().order_removed(instance.pk)
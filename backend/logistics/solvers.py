@@ -0,0 +1,262 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .optimizer import DEFAULT_RESOLUTION_KM, distance_units, knapsack_max_profit, np
+
+# Rough throughput of the DP kernels (table cells per millisecond), used to
+# predict whether a solver fits a time budget before running it.
+DP_CELLS_PER_MS = 50000 if np is not None else 4000
+DEFAULT_TIME_BUDGET_MS = 200.0
+DEFAULT_EPSILON = 0.1
+
+
+@dataclass
+class SolveResult:
+    selected: List[Dict]
+    solver: str
+    upper_bound: float
+    timed_out: bool = False
+    # DP cells filled (dp, fptas); 0 for the solvers without a table
+    table_cells: int = 0
+
+    @property
+    def total_profit(self) -> float:
+        return sum(float(it["profit"]) for it in self.selected)
+
+    @property
+    def optimality_gap(self) -> float:
+        # relative distance to the best known upper bound (0.0 means proven optimal)
+        if self.upper_bound <= 0:
+            return 0.0
+        return max(0.0, (self.upper_bound - self.total_profit) / self.upper_bound)
+
+
+def _prepare(items: List[Dict], capacity_km: float, resolution_km: float) -> Tuple[int, List[Tuple[int, float, int]]]:
+    # integer distance units as in knapsack_max_profit, so every solver agrees on
+    # feasibility; returns (W, [(weight, profit, index)]) for items that fit alone
+    W = distance_units(capacity_km, resolution_km)
+    fitting = []
+    for idx, it in enumerate(items):
+        w_i = distance_units(it["distance_km"], resolution_km)
+        if 0 <= w_i <= W:
+            fitting.append((w_i, float(it["profit"]), idx))
+    return W, fitting
+
+
+def _by_ratio(fitting):
+    return sorted(fitting, key=lambda t: t[1] / t[0] if t[0] else float("inf"), reverse=True)
+
+
+def _dantzig_bound(ordered, W: int, start: int = 0, used: int = 0, value: float = 0.0) -> float:
+    # LP relaxation bound: fill greedily by ratio, then a fraction of the next item
+    room = W - used
+    for w_i, p_i, _ in ordered[start:]:
+        if w_i <= room:
+            room -= w_i
+            value += p_i
+        else:
+            return value + p_i * room / w_i
+    return value
+
+
+class Solver:
+    name = ""
+
+    def __init__(self, resolution_km: float = DEFAULT_RESOLUTION_KM):
+        self.resolution_km = resolution_km
+
+    def solve(self, items: List[Dict], capacity_km: float, deadline: Optional[float] = None) -> SolveResult:
+        raise NotImplementedError
+
+
+class ExactDPSolver(Solver):
+    name = "dp"
+
+    def solve(self, items, capacity_km, deadline=None):
+        selected = knapsack_max_profit(items, capacity_km, self.resolution_km)
+        W, fitting = _prepare(items, capacity_km, self.resolution_km)
+        return SolveResult(
+            selected,
+            self.name,
+            upper_bound=sum(float(it["profit"]) for it in selected),
+            table_cells=len(fitting) * (W + 1),
+        )
+
+
+def _greedy_indices(ordered, W: int) -> List[int]:
+    chosen, room = [], W
+    for w_i, _, idx in ordered:
+        if w_i <= room:
+            chosen.append(idx)
+            room -= w_i
+    # the best single item guards the classic worst case of ratio greedy
+    if ordered:
+        best = max(ordered, key=lambda t: t[1])
+        profits = {idx: p for _, p, idx in ordered}
+        if best[1] > sum(profits[i] for i in chosen):
+            chosen = [best[2]]
+    return sorted(chosen)
+
+
+class GreedyRatioSolver(Solver):
+    name = "greedy"
+
+    def solve(self, items, capacity_km, deadline=None):
+        W, fitting = _prepare(items, capacity_km, self.resolution_km)
+        ordered = _by_ratio(fitting)
+        chosen = _greedy_indices(ordered, W)
+        return SolveResult([items[i] for i in chosen], self.name, upper_bound=_dantzig_bound(ordered, W))
+
+
+class FPTASSolver(Solver):
+    # profit-scaling DP: at least (1 - epsilon) of the optimum in O(n^3 / epsilon)
+    name = "fptas"
+
+    def __init__(self, resolution_km: float = DEFAULT_RESOLUTION_KM, epsilon: float = DEFAULT_EPSILON):
+        super().__init__(resolution_km)
+        self.epsilon = epsilon
+
+    @staticmethod
+    def table_size(n: int, epsilon: float) -> int:
+        # n rows over a scaled profit axis of at most n * n / epsilon
+        return n * n * (int(n / epsilon) + 1)
+
+    def solve(self, items, capacity_km, deadline=None):
+        W, fitting = _prepare(items, capacity_km, self.resolution_km)
+        p_max = max((p for _, p, _ in fitting), default=0.0)
+        if p_max <= 0:
+            return SolveResult([], self.name, upper_bound=0.0)
+        k = self.epsilon * p_max / len(fitting)
+        scaled = [int(p / k) for _, p, _ in fitting]
+        total = sum(scaled)
+        if np is not None:
+            min_weight, keep = self._table_np(fitting, scaled, total, W)
+        else:
+            min_weight, keep = self._table_py(fitting, scaled, total, W)
+        q = max(q for q in range(total + 1) if min_weight[q] <= W)
+        chosen = []
+        for j in range(len(fitting) - 1, -1, -1):
+            if (keep[j][q >> 3] >> (q & 7)) & 1:
+                chosen.append(fitting[j][2])
+                q -= scaled[j]
+        selected = [items[i] for i in sorted(chosen)]
+        profit = sum(float(it["profit"]) for it in selected)
+        bound = min(_dantzig_bound(_by_ratio(fitting), W), profit / (1 - self.epsilon))
+        return SolveResult(
+            selected, self.name, upper_bound=max(bound, profit), table_cells=len(fitting) * (total + 1)
+        )
+
+    @staticmethod
+    def _table_py(fitting, scaled, total, W):
+        # min_weight[q]: smallest distance (units) reaching scaled profit q
+        min_weight = [0] + [float("inf")] * total
+        keep = []
+        for (w_i, _, _), q_i in zip(fitting, scaled):
+            bits = bytearray((total >> 3) + 1)
+            for q in range(total, q_i - 1, -1):
+                c = min_weight[q - q_i] + w_i
+                if c < min_weight[q] and c <= W:
+                    min_weight[q] = c
+                    bits[q >> 3] |= 1 << (q & 7)
+            keep.append(bits)
+        return min_weight, keep
+
+    @staticmethod
+    def _table_np(fitting, scaled, total, W):
+        min_weight = np.full(total + 1, np.inf)
+        min_weight[0] = 0
+        keep = np.zeros((len(fitting), (total >> 3) + 1), dtype=np.uint8)
+        take = np.zeros(total + 1, dtype=bool)
+        for j, ((w_i, _, _), q_i) in enumerate(zip(fitting, scaled)):
+            c = min_weight[: total + 1 - q_i] + w_i
+            take[:q_i] = False
+            take[q_i:] = (c < min_weight[q_i:]) & (c <= W)
+            np.copyto(min_weight[q_i:], c, where=take[q_i:])
+            keep[j] = np.packbits(take, bitorder="little")
+        return min_weight, keep
+
+
+class BranchAndBoundSolver(Solver):
+    # depth-first search on ratio-sorted items with the Dantzig bound; anytime
+    # under a deadline since it starts from the greedy solution
+    name = "bnb"
+    CHECK_EVERY = 512
+
+    def solve(self, items, capacity_km, deadline=None):
+        W, fitting = _prepare(items, capacity_km, self.resolution_km)
+        ordered = _by_ratio(fitting)
+        best = _greedy_indices(ordered, W)
+        best_value = sum(float(items[i]["profit"]) for i in best)
+        n = len(ordered)
+        # stack entries: (next position in ordered, used weight, value, chosen positions)
+        stack = [(0, 0, 0.0, ())]
+        nodes = 0
+        timed_out = False
+        while stack:
+            nodes += 1
+            if deadline is not None and nodes % self.CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                timed_out = True
+                break
+            i, used, value, chosen = stack.pop()
+            if value > best_value:
+                best_value = value
+                best = sorted(ordered[j][2] for j in chosen)
+            if i >= n or _dantzig_bound(ordered, W, i, used, value) <= best_value + 1e-9:
+                continue
+            stack.append((i + 1, used, value, chosen))
+            if used + ordered[i][0] <= W:
+                stack.append((i + 1, used + ordered[i][0], value + ordered[i][1], chosen + (i,)))
+        upper = best_value
+        if timed_out:
+            upper = max([upper] + [_dantzig_bound(ordered, W, i, used, value) for i, used, value, _ in stack])
+        return SolveResult([items[i] for i in best], self.name, upper_bound=upper, timed_out=timed_out)
+
+
+SOLVERS = {
+    cls.name: cls for cls in (ExactDPSolver, GreedyRatioSolver, FPTASSolver, BranchAndBoundSolver)
+}
+
+
+def fits_budget(name: str, n: int, capacity_km: float, time_budget_ms: float, resolution_km: float = DEFAULT_RESOLUTION_KM, epsilon: float = DEFAULT_EPSILON) -> bool:
+    # the table solvers never look at the deadline: predict their cost (half
+    # of the budget at most) before running them
+    cells = DP_CELLS_PER_MS * time_budget_ms / 2
+    if name == ExactDPSolver.name:
+        return n * (distance_units(capacity_km, resolution_km) + 1) <= cells
+    if name == FPTASSolver.name:
+        return FPTASSolver.table_size(n, epsilon) <= cells
+    return True
+
+
+def choose_solver(n: int, capacity_km: float, time_budget_ms: float, resolution_km: float = DEFAULT_RESOLUTION_KM, epsilon: float = DEFAULT_EPSILON) -> str:
+    # pick the strongest solver whose predicted cost fits the budget
+    for name in (ExactDPSolver.name, FPTASSolver.name):
+        if fits_budget(name, n, capacity_km, time_budget_ms, resolution_km, epsilon):
+            return name
+    if time_budget_ms >= 5:
+        return BranchAndBoundSolver.name
+    return GreedyRatioSolver.name
+
+
+def solve(
+    items: List[Dict],
+    capacity_km: float,
+    time_budget_ms: float = DEFAULT_TIME_BUDGET_MS,
+    solver: Optional[str] = None,
+    resolution_km: float = DEFAULT_RESOLUTION_KM,
+    epsilon: float = DEFAULT_EPSILON,
+) -> SolveResult:
+    start = time.perf_counter()
+    name = solver or choose_solver(len(items), capacity_km, time_budget_ms, resolution_km, epsilon)
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown solver '{name}'. Choose one of: {', '.join(SOLVERS)}")
+    if not fits_budget(name, len(items), capacity_km, time_budget_ms, resolution_km, epsilon):
+        # a requested table solver too big for the budget would hold the
+        # worker regardless of it; the result reports the solver that ran
+        name = choose_solver(len(items), capacity_km, time_budget_ms, resolution_km, epsilon)
+    if name == FPTASSolver.name:
+        instance = FPTASSolver(resolution_km, epsilon)
+    else:
+        instance = SOLVERS[name](resolution_km)
+    return instance.solve(items, capacity_km, deadline=start + time_budget_ms / 1000.0)
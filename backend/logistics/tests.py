@@ -1,3 +1,784 @@
-from django.test import TestCase
+import itertools
+import random
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from orders.models import Order
+
+from . import dispatch, positions
+from .cache import LocMemBackend, PlanCache, RedisBackend, get_plan_cache
+from .executor import OptimizerBusy, OptimizerExecutor, PlanJob, run_plan, start_in_background
+from .geo import cell_key, cells_covering, filter_within_radius
+from .incremental import IncrementalPlan, IncrementalPlanner, get_incremental_planner
+from .models import CourierLocation
+from . import optimizer
+from .optimizer import (
+    distance_matrix_km,
+    haversine_km,
+    knapsack_max_profit,
+    nearest_neighbor_route,
+    order_distance_km,
+    order_distances_km,
+)
+from .routing import grid_nearest_neighbor_route, pickup_delivery_route, plan_route, route_length_km
+from .solvers import SOLVERS, _prepare, choose_solver, solve
+
+
+def make_order(lat, lng, restaurant=None, **kwargs):
+    kwargs.setdefault("customer_phone", "+212600000000")
+    kwargs.setdefault("delivery_price_offer", Decimal("10.00"))
+    if restaurant is not None:
+        kwargs["restaurant_lat"], kwargs["restaurant_lng"] = restaurant
+    return Order.objects.create(location_lat=lat, location_lng=lng, **kwargs)
+
+
+class GeoCellTests(TestCase):
+    def test_cells_are_kept_current_on_save(self):
+        order = make_order(33.5731, -7.5898)
+        self.assertEqual(order.location_cell, cell_key(33.5731, -7.5898))
+        self.assertEqual(order.restaurant_cell, "")
+        order.location_lat = 34.0209
+        order.restaurant_lat, order.restaurant_lng = 34.02, -6.84
+        order.save(update_fields=["location_lat", "restaurant_lat", "restaurant_lng"])
+        order.refresh_from_db()
+        self.assertEqual(order.location_cell, cell_key(34.0209, -7.5898))
+        self.assertEqual(order.restaurant_cell, cell_key(34.02, -6.84))
+
+    def test_covering_cells_contain_every_point_in_radius(self):
+        center = (33.5731, -7.5898)
+        cells = set(cells_covering(*center, 5.0))
+        for dlat, dlng in [(0.044, 0), (-0.044, 0), (0, 0.053), (0, -0.053), (0.03, 0.03)]:
+            point = (center[0] + dlat, center[1] + dlng)
+            self.assertLessEqual(haversine_km(*center, *point), 5.0)
+            self.assertIn(cell_key(*point), cells)
+
+
+class FilterWithinRadiusTests(TestCase):
+    def test_prefilter_keeps_every_order_reachable_within_radius(self):
+        courier = (33.5731, -7.5898)
+        near = make_order(33.58, -7.59, restaurant=(33.575, -7.60))
+        no_restaurant = make_order(33.56, -7.58)
+        far_customer = make_order(33.90, -7.59)
+        far_restaurant = make_order(33.58, -7.59, restaurant=(34.02, -6.84))
+        found = set(
+            filter_within_radius(Order.objects.all(), courier, 10.0).values_list("id", flat=True)
+        )
+        self.assertEqual(found, {near.id, no_restaurant.id})
+        for order in Order.objects.exclude(id__in=found):
+            restaurant = (order.restaurant_lat, order.restaurant_lng) if order.restaurant_lat is not None else None
+            self.assertGreater(
+                order_distance_km(courier, (order.location_lat, order.location_lng), restaurant), 10.0
+            )
+        self.assertNotIn(far_customer.id, found)
+        self.assertNotIn(far_restaurant.id, found)
+
+
+def random_points(rng, n, center=(33.5731, -7.5898), spread=0.1):
+    return [(center[0] + rng.uniform(-spread, spread), center[1] + rng.uniform(-spread, spread)) for _ in range(n)]
+
+
+@skipIf(optimizer.np is None, "numpy not installed")
+class VectorizedDistanceTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.courier = (33.5731, -7.5898)
+        self.customers = random_points(rng, 200)
+        self.restaurants = [p if i % 3 else None for i, p in enumerate(random_points(rng, 200))]
+
+    def test_batched_order_distances_match_scalar(self):
+        batched = order_distances_km(self.courier, self.customers, self.restaurants)
+        for got, customer, restaurant in zip(batched, self.customers, self.restaurants):
+            self.assertAlmostEqual(got, order_distance_km(self.courier, customer, restaurant), places=9)
+
+    def test_distance_matrix_matches_scalar(self):
+        points = self.customers[:40]
+        matrix = distance_matrix_km(points)
+        for i, a in enumerate(points):
+            for j, b in enumerate(points):
+                self.assertAlmostEqual(matrix[i][j], haversine_km(a[0], a[1], b[0], b[1]), places=9)
+
+    def test_route_matches_scalar_fallback(self):
+        vectorized = nearest_neighbor_route(self.courier, self.customers)
+        with mock.patch.object(optimizer, "np", None):
+            scalar = nearest_neighbor_route(self.courier, self.customers)
+            self.assertEqual(
+                order_distances_km(self.courier, self.customers[:3], self.restaurants[:3]),
+                [order_distance_km(self.courier, c, r) for c, r in zip(self.customers[:3], self.restaurants[:3])],
+            )
+        self.assertEqual(vectorized, scalar)
+
+
+def reference_knapsack(items, capacity_km):
+    # the original full-table implementation, kept to pin down equivalence
+    n = len(items)
+    scale = 10
+    W = int(capacity_km * scale)
+    dp = [[0] * (W + 1) for _ in range(n + 1)]
+    keep = [[False] * (W + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        w_i = int(items[i - 1]["distance_km"] * scale)
+        v_i = float(items[i - 1]["profit"])
+        for w in range(W + 1):
+            if w_i <= w and dp[i - 1][w - w_i] + v_i > dp[i - 1][w]:
+                dp[i][w] = dp[i - 1][w - w_i] + v_i
+                keep[i][w] = True
+            else:
+                dp[i][w] = dp[i - 1][w]
+    res = []
+    w = W
+    for i in range(n, 0, -1):
+        if keep[i][w]:
+            res.append(items[i - 1])
+            w -= int(items[i - 1]["distance_km"] * scale)
+    res.reverse()
+    return res
+
+
+class KnapsackTests(SimpleTestCase):
+    def random_items(self, rng, n):
+        return [
+            {"id": i, "profit": rng.choice([10, 15, 20, 25.5, 40]), "distance_km": rng.uniform(0, 12)}
+            for i in range(n)
+        ]
+
+    def assert_matches_reference(self):
+        rng = random.Random(3)
+        for n, capacity in [(0, 10), (1, 0.5), (12, 0), (40, 10), (120, 25.3), (300, 50)]:
+            items = self.random_items(rng, n)
+            expected = [it["id"] for it in reference_knapsack(items, capacity)]
+            self.assertEqual([it["id"] for it in knapsack_max_profit(items, capacity)], expected)
+
+    @skipIf(optimizer.np is None, "numpy not installed")
+    def test_numpy_matches_full_table(self):
+        self.assert_matches_reference()
+
+    def test_pure_python_matches_full_table(self):
+        with mock.patch.object(optimizer, "np", None):
+            self.assert_matches_reference()
+
+    def test_resolution_is_configurable(self):
+        items = [{"id": 1, "profit": 10, "distance_km": 1.04}, {"id": 2, "profit": 12, "distance_km": 0.98}]
+        self.assertEqual(len(knapsack_max_profit(items, 2.0)), 2)
+        self.assertEqual([it["id"] for it in knapsack_max_profit(items, 2.0, resolution_km=0.01)], [2])
+
+
+class SolverTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.items = [
+            {"id": i, "profit": rng.randint(5, 40), "distance_km": rng.uniform(0.5, 8)} for i in range(40)
+        ]
+        self.capacity = 20.0
+        self.optimum = sum(it["profit"] for it in knapsack_max_profit(self.items, self.capacity))
+
+    def units(self, selected):
+        return sum(int(it["distance_km"] * 10) for it in selected)
+
+    def test_every_solver_returns_a_feasible_selection(self):
+        for name in SOLVERS:
+            result = solve(self.items, self.capacity, solver=name, time_budget_ms=1000)
+            self.assertEqual(result.solver, name)
+            self.assertLessEqual(self.units(result.selected), 200)
+            self.assertLessEqual(result.total_profit, self.optimum + 1e-9)
+            self.assertGreaterEqual(result.optimality_gap, 0.0)
+
+    def test_exact_solvers_reach_the_optimum(self):
+        for name in ("dp", "bnb"):
+            result = solve(self.items, self.capacity, solver=name, time_budget_ms=5000)
+            self.assertAlmostEqual(result.total_profit, self.optimum)
+            self.assertEqual(result.optimality_gap, 0.0)
+
+    def test_fptas_respects_epsilon(self):
+        result = solve(self.items, self.capacity, solver="fptas", epsilon=0.2, time_budget_ms=1000)
+        self.assertGreaterEqual(result.total_profit, 0.8 * self.optimum)
+
+    def test_upper_bounds_are_valid(self):
+        for name in ("greedy", "fptas"):
+            result = solve(self.items, self.capacity, solver=name, time_budget_ms=1000)
+            self.assertGreaterEqual(result.upper_bound + 1e-9, self.optimum)
+
+    def test_solver_choice_follows_problem_size_and_budget(self):
+        self.assertEqual(choose_solver(50, 10.0, 200), "dp")
+        self.assertEqual(choose_solver(100000, 50.0, 50), "bnb")
+        self.assertEqual(choose_solver(100000, 50.0, 1), "greedy")
+
+    def test_requested_table_solver_over_budget_is_downgraded(self):
+        rng = random.Random(9)
+        items = [{"id": i, "profit": rng.uniform(1, 30), "distance_km": rng.uniform(0.5, 5)} for i in range(600)]
+        started = time.perf_counter()
+        result = solve(items, 50.0, solver="fptas", time_budget_ms=50)
+        self.assertEqual(result.solver, choose_solver(600, 50.0, 50))
+        self.assertNotEqual(result.solver, "fptas")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(solve(items[:20], 5.0, solver="fptas", time_budget_ms=50).solver, "fptas")
+
+    def test_unknown_solver_is_rejected(self):
+        with self.assertRaises(ValueError):
+            solve(self.items, self.capacity, solver="simplex")
+
+
+class RoutingTests(SimpleTestCase):
+    start = (33.5731, -7.5898)
+
+    def test_local_search_never_lengthens_the_tour(self):
+        rng = random.Random(5)
+        for n in (2, 3, 10, 60):
+            points = random_points(rng, n)
+            order, initial, improved = plan_route(self.start, points, time_budget_ms=500)
+            self.assertEqual(sorted(order), list(range(n)))
+            self.assertAlmostEqual(initial, route_length_km(self.start, points, nearest_neighbor_route(self.start, points)))
+            self.assertAlmostEqual(improved, route_length_km(self.start, points, order))
+            self.assertLessEqual(improved, initial + 1e-9)
+
+    def test_uncrosses_a_zigzag(self):
+        # nearest neighbour goes east, doubles back west, then east again
+        lat, lng = self.start
+        points = [(lat, lng + 0.01), (lat, lng - 0.015), (lat, lng + 0.03)]
+        order, initial, improved = plan_route(self.start, points, time_budget_ms=500)
+        self.assertLess(improved, initial)
+
+    def test_grid_construction_visits_every_point(self):
+        rng = random.Random(9)
+        points = random_points(rng, 800, spread=0.3)
+        order = grid_nearest_neighbor_route(self.start, points)
+        self.assertEqual(sorted(order), list(range(800)))
+        self.assertEqual(grid_nearest_neighbor_route(self.start, points[:50]), nearest_neighbor_route(self.start, points[:50]))
+
+
+class PickupDeliveryRouteTests(SimpleTestCase):
+    start = (33.5731, -7.5898)
+
+    def make_orders(self, n, seed=1):
+        rng = random.Random(seed)
+        restaurants = [((33.58, -7.60), "Pizza"), ((33.56, -7.57), "Tajine")]
+        orders = []
+        for i in range(n):
+            location, name = restaurants[i % 2]
+            orders.append({
+                "id": i,
+                "customer": random_points(rng, 1)[0],
+                "restaurant": location,
+                "restaurant_name": name,
+                "weight_kg": rng.choice([0.5, 1.0, 2.0]),
+            })
+        return orders
+
+    def test_pickups_precede_drops_and_load_stays_within_capacity(self):
+        orders = self.make_orders(14)
+        weights = {o["id"]: o["weight_kg"] for o in orders}
+        plan = pickup_delivery_route(self.start, orders, capacity_kg=5.0, time_budget_ms=500)
+        picked, load = set(), 0.0
+        for stop in plan.stops:
+            delta = sum(weights[oid] for oid in stop.order_ids)
+            if stop.kind == "pickup":
+                picked.update(stop.order_ids)
+                load += delta
+            else:
+                self.assertTrue(set(stop.order_ids) <= picked)
+                load -= delta
+            self.assertLessEqual(load, 5.0)
+            self.assertAlmostEqual(stop.load_kg, load)
+        self.assertEqual(sorted(plan.delivery_order_ids), list(range(14)))
+        self.assertLessEqual(plan.distance_km, plan.initial_km + 1e-9)
+
+    def test_orders_from_one_restaurant_share_a_pickup(self):
+        orders = [o for o in self.make_orders(6) if o["restaurant_name"] == "Pizza"]
+        plan = pickup_delivery_route(self.start, orders, capacity_kg=10.0)
+        pickups = [stop for stop in plan.stops if stop.kind == "pickup"]
+        self.assertEqual(len(pickups), 1)
+        self.assertEqual(sorted(pickups[0].order_ids), sorted(o["id"] for o in orders))
+
+    def test_overweight_and_preloaded_orders(self):
+        orders = [
+            {"id": 1, "customer": (33.58, -7.59), "restaurant": None, "weight_kg": 1.0},
+            {"id": 2, "customer": (33.57, -7.58), "restaurant": (33.56, -7.57), "weight_kg": 12.0},
+        ]
+        plan = pickup_delivery_route(self.start, orders, capacity_kg=10.0)
+        self.assertEqual(plan.unserved_order_ids, [2])
+        self.assertEqual([(s.kind, s.order_ids) for s in plan.stops], [("dropoff", [1])])
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PositionStoreTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = positions.PositionStore(ttl_s=60, flush_interval_s=5, clock=self.clock)
+        self.couriers = [User.objects.create(username=f"c{i}@example.com", role=User.Roles.COURIER) for i in range(3)]
+
+    def test_latest_ping_wins_and_expires(self):
+        a = self.couriers[0].id
+        self.store.update(a, 33.57, -7.59)
+        self.store.update(a, 33.58, -7.60)
+        self.store.update(a, 10.0, 10.0, recorded_at=self.clock.now - 30)  # late, out of order
+        self.assertEqual(self.store.get(a).point, (33.58, -7.60))
+        self.clock.now += 61
+        self.assertIsNone(self.store.get(a))
+        self.assertEqual(self.store.expire(), 1)
+        self.assertEqual(self.store.nearest(33.58, -7.60, 5), [])
+
+    def test_nearest_uses_current_cell(self):
+        a, b, c = (courier.id for courier in self.couriers)
+        self.store.update(a, 33.5731, -7.5898)
+        self.store.update(b, 33.60, -7.62)
+        self.store.update(c, 34.0209, -6.8416)  # Rabat
+        self.assertEqual([p.courier_id for _, p in self.store.nearest(33.5731, -7.5898, 10)], [a, b])
+        self.store.update(b, 34.02, -6.84)  # moves to Rabat
+        self.assertEqual([p.courier_id for _, p in self.store.nearest(33.5731, -7.5898, 10)], [a])
+        self.assertEqual([p.courier_id for _, p in self.store.nearest(34.02, -6.84, 10, limit=1)], [b])
+
+    def test_flush_batches_pings(self):
+        for i in range(50):
+            for courier in self.couriers:
+                self.store.update(courier.id, 33.5 + i * 0.001, -7.6)
+        self.assertFalse(self.store.flush_due())
+        self.clock.now += 5
+        self.assertTrue(self.store.flush_due())
+        with self.assertNumQueries(2):  # user check + one upsert
+            self.assertEqual(self.store.flush(), 3)
+        self.assertEqual(CourierLocation.objects.count(), 3)
+        self.assertAlmostEqual(CourierLocation.objects.get(pk=self.couriers[0].id).lat, 33.549)
+        self.assertFalse(self.store.flush_due())
+
+    def test_flush_skips_deleted_couriers(self):
+        self.store.update(self.couriers[0].id, 33.57, -7.59)
+        self.store.update(self.couriers[1].id, 33.57, -7.59)
+        self.couriers[1].delete()
+        self.assertEqual(self.store.flush(force=True), 1)
+
+
+class PositionFlusherTests(TransactionTestCase):
+    # the flusher writes through its own thread's connection
+    def test_flushes_without_further_pings_and_on_stop(self):
+        courier = User.objects.create(username="c@example.com", role=User.Roles.COURIER)
+        store = positions.PositionStore(flush_interval_s=0.05)
+        flusher = positions.PositionFlusher(store)
+        store.update(courier.id, 33.57, -7.59)
+        flusher.start()
+        try:
+            for _ in range(100):
+                if CourierLocation.objects.filter(courier=courier).exists():
+                    break
+                time.sleep(0.02)
+            self.assertAlmostEqual(CourierLocation.objects.get(courier=courier).lat, 33.57)
+            store.flush_interval_s = 3600
+            store.update(courier.id, 33.58, -7.59)
+        finally:
+            flusher.stop()
+        self.assertFalse(flusher.running)
+        self.assertAlmostEqual(CourierLocation.objects.get(courier=courier).lat, 33.58)
+
+
+class CourierLocationViewTests(TestCase):
+    def setUp(self):
+        positions.store.clear()
+        get_plan_cache().backend.clear()
+        get_incremental_planner().clear()
+        self.courier = User.objects.create(username="courier@example.com", role=User.Roles.COURIER)
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+
+    def tearDown(self):
+        positions.store.clear()
+
+    def test_ping_feeds_optimizer_position(self):
+        response = self.client.post("/api/logistics/courier/location/", {"lat": 33.5731, "lng": -7.5898}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(positions.latest_position(self.courier.id), (33.5731, -7.5898))
+        near = make_order(33.575, -7.59)
+        response = self.client.post("/api/orders/courier/optimize/", {"capacity_km": 10}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["selected_order_ids"], [near.id])
+
+    def test_falls_back_to_flushed_row(self):
+        self.client.post("/api/logistics/courier/location/", {"lat": 33.5731, "lng": -7.5898}, format="json")
+        positions.store.flush(force=True)
+        positions.store.clear()  # as seen from another worker process
+        self.assertEqual(positions.latest_position(self.courier.id), (33.5731, -7.5898))
+
+    def test_rejects_bad_pings(self):
+        url = "/api/logistics/courier/location/"
+        self.assertEqual(self.client.post(url, {"lat": "x", "lng": 1}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"lat": 95, "lng": 1}, format="json").status_code, 400)
+        customer = User.objects.create(username="client@example.com")
+        self.client.force_authenticate(customer)
+        self.assertEqual(self.client.post(url, {"lat": 1, "lng": 1}, format="json").status_code, 403)
+
+    def test_optimize_without_any_position(self):
+        response = self.client.post("/api/orders/courier/optimize/", {"capacity_km": 10}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+def brute_force_assignment(cost):
+    n, m = len(cost), len(cost[0])
+    if n <= m:
+        return min(sum(cost[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+    return min(sum(cost[i][j] for j, i in enumerate(rows)) for rows in itertools.permutations(range(n), m))
+
+
+class AssignmentTests(SimpleTestCase):
+    def check_optimal(self):
+        rng = random.Random(3)
+        for n, m in [(1, 1), (3, 3), (2, 5), (5, 2), (4, 6), (6, 6)]:
+            cost = [[rng.uniform(0, 20) for _ in range(m)] for _ in range(n)]
+            pairs = dispatch.assign_min_cost(cost)
+            self.assertEqual(len(pairs), min(n, m))
+            self.assertEqual(len({i for i, _ in pairs}), len(pairs))
+            self.assertEqual(len({j for _, j in pairs}), len(pairs))
+            self.assertAlmostEqual(sum(cost[i][j] for i, j in pairs), brute_force_assignment(cost))
+
+    def test_optimal_on_small_matrices(self):
+        self.check_optimal()
+
+    def test_optimal_without_numpy(self):
+        with mock.patch.object(dispatch, "np", None):
+            self.check_optimal()
+
+    def test_infeasible_pairs_are_avoided_when_possible(self):
+        big = dispatch.INFEASIBLE
+        cost = [[1.0, big], [2.0, 3.0]]
+        self.assertEqual(dispatch.assign_min_cost(cost), [(0, 0), (1, 1)])
+
+
+class DispatchRoundTests(TestCase):
+    def setUp(self):
+        positions.store.clear()
+
+    def tearDown(self):
+        positions.store.clear()
+
+    def courier_at(self, username, lat, lng, **kwargs):
+        courier = User.objects.create(username=username, role=User.Roles.COURIER, **kwargs)
+        CourierLocation.objects.create(courier=courier, lat=lat, lng=lng, recorded_at=datetime.now(dt_timezone.utc))
+        return courier
+
+    def test_round_assigns_nearest_feasible_pairs(self):
+        west = self.courier_at("west@example.com", 33.57, -7.65)
+        east = self.courier_at("east@example.com", 33.57, -7.55)
+        weak = self.courier_at("weak@example.com", 33.57, -7.60, capacity_kg=1)
+        busy = self.courier_at("busy@example.com", 33.57, -7.60)
+        make_order(33.57, -7.61, courier=busy, status=Order.Status.ASSIGNED)
+        near_west = make_order(33.571, -7.649)
+        near_east = make_order(33.571, -7.551)
+        heavy = make_order(33.571, -7.601, total_weight_kg=5.0)
+        make_order(34.02, -6.84)  # Rabat: out of reach for everyone
+
+        # with 3 km of reach only "weak" could take the heavy order, and can't carry it
+        result = dispatch.run_round(max_km=3)
+
+        self.assertEqual(result.couriers, 3)
+        self.assertEqual(result.orders, 4)
+        self.assertEqual(sorted(result.assigned), sorted([(west.id, near_west.id), (east.id, near_east.id)]))
+        self.assertEqual(Order.objects.get(pk=near_west.pk).courier_id, west.id)
+        self.assertEqual(Order.objects.get(pk=heavy.pk).status, Order.Status.PENDING)
+        self.assertFalse(Order.objects.filter(courier=weak).exists())
+        # assigned couriers are busy now, so the next round has nothing to do
+        self.assertEqual(dispatch.run_round(max_km=3).assigned, [])
+
+    def test_deleted_courier_with_an_active_order_blocks_nobody(self):
+        gone = self.courier_at("gone@example.com", 33.57, -7.60)
+        make_order(33.57, -7.61, courier=gone, status=Order.Status.ASSIGNED)
+        gone.delete()  # the order keeps ASSIGNED with courier NULL
+        west = self.courier_at("west@example.com", 33.57, -7.65)
+        order = make_order(33.571, -7.649)
+        self.assertEqual([c.id for c, _ in dispatch.idle_couriers()], [west.id])
+        self.assertEqual(dispatch.run_round(max_km=3).assigned, [(west.id, order.id)])
+
+    def test_round_sees_pings_not_yet_flushed(self):
+        courier = User.objects.create(username="west@example.com", role=User.Roles.COURIER)
+        positions.store.update(courier.id, 33.57, -7.65)
+        order = make_order(33.571, -7.649)
+        self.assertEqual(dispatch.run_round(max_km=3).assigned, [(courier.id, order.id)])
+
+    def test_claims_commit_one_by_one(self):
+        from orders import services
+
+        west = self.courier_at("west@example.com", 33.57, -7.65)
+        east = self.courier_at("east@example.com", 33.57, -7.55)
+        make_order(33.571, -7.649)
+        make_order(33.571, -7.551)
+        real_accept = services.accept_order
+        calls = []
+
+        def accept_then_fail(courier, order_id):
+            calls.append(order_id)
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return real_accept(courier, order_id)
+
+        with mock.patch.object(services, "accept_order", accept_then_fail), self.assertRaises(RuntimeError):
+            dispatch.run_round(max_km=3)
+        # the claim made before the failure stands
+        self.assertEqual(Order.objects.get(pk=calls[0]).status, Order.Status.ASSIGNED)
+        self.assertEqual(Order.objects.filter(courier__in=[west, east]).count(), 1)
+
+    def test_dry_run_changes_nothing(self):
+        self.courier_at("west@example.com", 33.57, -7.65)
+        order = make_order(33.571, -7.649)
+        result = dispatch.run_round(dry_run=True)
+        self.assertEqual(len(result.assigned), 1)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.Status.PENDING)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class PlanCacheTests(SimpleTestCase):
+    def test_locmem_evicts_least_recently_used(self):
+        backend = LocMemBackend(max_entries=2)
+        backend.set("a", 1, 60)
+        backend.set("b", 2, 60)
+        backend.get("a")
+        backend.set("c", 3, 60)
+        self.assertEqual((backend.get("a"), backend.get("b"), backend.get("c")), (1, None, 3))
+
+    def test_locmem_expires_entries(self):
+        clock = FakeClock()
+        backend = LocMemBackend(clock=clock)
+        backend.set("a", 1, 10)
+        clock.now += 11
+        self.assertIsNone(backend.get("a"))
+
+    def test_version_bump_changes_every_key(self):
+        for backend in (LocMemBackend(), RedisBackend(FakeRedis())):
+            cache = PlanCache(backend)
+            key = cache.key((33.5731, -7.5898), 10.0, mode="dropoff")
+            cache.set(key, {"selected_order_ids": [1]})
+            self.assertEqual(cache.get(key), {"selected_order_ids": [1]})
+            cache.bump()
+            fresh = cache.key((33.5731, -7.5898), 10.0, mode="dropoff")
+            self.assertNotEqual(fresh, key)
+            self.assertIsNone(cache.get(fresh))
+            self.assertEqual(cache.stats()["hits"], 1)
+            self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_positions_snap_to_grid(self):
+        cache = PlanCache(LocMemBackend())
+        self.assertEqual(cache.key((33.5731, -7.5898), 10), cache.key((33.5734, -7.5894), 10))
+        self.assertNotEqual(cache.key((33.5731, -7.5898), 10), cache.key((33.5781, -7.5898), 10))
+
+
+class OptimizeCacheStatsViewTests(TestCase):
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="courier@example.com", role=User.Roles.COURIER))
+        self.assertEqual(client.get("/api/logistics/optimize-cache/").status_code, 403)
+        client.force_authenticate(User.objects.create(username="admin@example.com", is_staff=True))
+        response = client.get("/api/logistics/optimize-cache/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {"hits", "misses", "hit_rate", "entries", "pending_version"})
+
+
+class OptimizerExecutorTests(SimpleTestCase):
+    def items(self, n=30, pickup_delivery=False):
+        rng = random.Random(5)
+        items = []
+        for i in range(n):
+            item = {
+                "id": 100 + i,
+                "profit": rng.uniform(5, 50),
+                "distance_km": rng.uniform(0.5, 4),
+                "customer": (33.57 + rng.uniform(-0.03, 0.03), -7.59 + rng.uniform(-0.03, 0.03)),
+            }
+            if pickup_delivery:
+                item["weight_kg"] = rng.uniform(0.5, 2)
+                item["restaurant"] = None if i % 3 == 0 else (33.574, -7.588 + i % 2 * 0.01)
+                item["restaurant_name"] = "" if i % 3 == 0 else f"R{i % 2}"
+            items.append(item)
+        return items
+
+    def test_job_round_trips_through_arrays(self):
+        items = self.items(pickup_delivery=True)
+        job = PlanJob.from_items((33.57, -7.59), items, 10.0, 100.0, capacity_kg=8.0)
+        self.assertEqual(job.items(), items)
+        self.assertEqual(job.restaurant_names, ("", "R1", "R0"))
+
+    def test_pool_matches_inline(self):
+        job = PlanJob.from_items((33.57, -7.59), self.items(), 10.0, 100.0, solver="dp")
+        pool = OptimizerExecutor(workers=1)
+        self.addCleanup(pool.shutdown)
+        pooled, inline = pool.submit(job), run_plan(job)
+        self.assertEqual(list(pooled.selected_ids), list(inline.selected_ids))
+        self.assertEqual(pooled.solver, "dp")
+        self.assertIn("wait", pooled.timings_ms)
+        self.assertEqual(pool.in_flight, 0)
+
+    def test_saturated_pool_serves_greedy(self):
+        job = PlanJob.from_items((33.57, -7.59), self.items(), 10.0, 100.0, solver="dp")
+        pool = OptimizerExecutor(workers=1, max_queue=0)
+        pool.in_flight = 1  # a job already running
+        outcome = pool.submit(job)
+        self.assertEqual((outcome.solver, outcome.degraded), ("greedy", "saturated"))
+        self.assertIsNone(pool._pool)
+
+    def test_saturated_pool_can_reject(self):
+        job = PlanJob.from_items((33.57, -7.59), self.items(), 10.0, 100.0)
+        pool = OptimizerExecutor(workers=1, max_queue=0, on_saturated="reject")
+        pool.in_flight = 1
+        with self.assertRaises(OptimizerBusy):
+            pool.submit(job)
+
+    def test_workers_are_spawned_at_startup(self):
+        with self.settings(OPTIMIZER={"WORKERS": 0}):
+            self.assertIsNone(start_in_background())
+        pool = OptimizerExecutor(workers=1)
+        self.addCleanup(pool.shutdown)
+        with self.settings(OPTIMIZER={"WORKERS": 1}), mock.patch("logistics.executor._executor", pool):
+            start_in_background().join(timeout=60)
+        self.assertIsNotNone(pool._pool)
+        self.assertEqual(len(pool._pool._processes), 1)
+
+
+class IncrementalPlanTests(SimpleTestCase):
+    start = (33.57, -7.59)
+
+    def items(self, n=40, seed=3):
+        rng = random.Random(seed)
+        return [
+            {
+                "id": i + 1,
+                "profit": rng.uniform(5, 40),
+                "distance_km": rng.uniform(0.3, 3),
+                "customer": (33.57 + rng.uniform(-0.02, 0.02), -7.59 + rng.uniform(-0.02, 0.02)),
+            }
+            for i in range(n)
+        ]
+
+    def seeded(self, items, capacity_km=8.0):
+        result = solve(items, capacity_km, solver="dp")
+        order, _, _ = plan_route(self.start, [it["customer"] for it in result.selected])
+        return IncrementalPlan(self.start, capacity_km, items, [result.selected[i]["id"] for i in order], "dp")
+
+    def assertConsistent(self, plan):
+        self.assertEqual(set(plan.route), plan.selected)
+        self.assertLessEqual(plan.used, plan.W)
+        self.assertEqual(plan.used, sum(plan.pool[oid].weight for oid in plan.route))
+        points = [plan.pool[oid].customer for oid in plan.route]
+        self.assertAlmostEqual(plan.route_km, route_length_km(self.start, points, range(len(points))))
+
+    def test_cheap_order_is_inserted_without_eviction(self):
+        plan = self.seeded(self.items(), capacity_km=50.0)  # everything fits
+        before = list(plan.route)
+        self.assertTrue(plan.add(999, 10.0, (33.571, -7.589)))
+        self.assertEqual([oid for oid in plan.route if oid != 999], before)
+        self.assertConsistent(plan)
+
+    def test_better_order_evicts_the_worst_ratio(self):
+        plan = self.seeded(self.items())
+        profit = sum(plan.pool[oid].profit for oid in plan.route)
+        # far enough to need room, but paid far more than anything selected
+        self.assertTrue(plan.add(999, 500.0, (33.585, -7.60)))
+        self.assertIn(999, plan.selected)
+        self.assertGreater(sum(plan.pool[oid].profit for oid in plan.route), profit + 400)
+        self.assertConsistent(plan)
+        # a poor one is pooled, not selected
+        self.assertFalse(plan.add(1000, 0.5, (33.585, -7.60)))
+        self.assertIn(1000, plan.pool)
+
+    def test_out_of_range_order_is_ignored(self):
+        plan = self.seeded(self.items())
+        self.assertFalse(plan.add(999, 500.0, (34.02, -6.84)))
+        self.assertNotIn(999, plan.pool)
+
+    def test_removal_refills_from_the_pool(self):
+        plan = self.seeded(self.items())
+        taken = plan.route[0]
+        self.assertTrue(plan.remove(taken))
+        self.assertNotIn(taken, plan.pool)
+        self.assertConsistent(plan)
+        room = plan.W - plan.used
+        self.assertFalse([c for c in plan.pool.values() if c.id not in plan.selected and c.weight <= room])
+        self.assertFalse(plan.remove(taken))
+
+    def test_random_events_keep_the_plan_consistent(self):
+        rng = random.Random(11)
+        items = self.items(60)
+        plan = self.seeded(items[:30])
+        waiting = items[30:]
+        for _ in range(200):
+            if waiting and rng.random() < 0.5:
+                it = waiting.pop()
+                plan.add(it["id"], it["profit"], it["customer"])
+            elif plan.pool:
+                plan.remove(rng.choice(list(plan.pool)))
+            self.assertConsistent(plan)
+        # stays close to what a full solve would pick
+        full = solve([{"id": c.id, "profit": c.profit, "distance_km": c.distance_km} for c in plan.pool.values()], 8.0, solver="dp")
+        self.assertGreaterEqual(sum(plan.pool[oid].profit for oid in plan.route), 0.9 * full.total_profit)
+
+    def test_weights_match_the_solvers(self):
+        # 0.3 / 0.1 truncates to 2 units, 0.3 * (1 / 0.1) to 3
+        items = [{"id": 1, "profit": 5.0, "distance_km": 0.3, "customer": self.start}]
+        plan = IncrementalPlan(self.start, 0.3, items, [1], "dp")
+        W, fitting = _prepare(items, 0.3, 0.1)
+        self.assertEqual((plan.W, plan.pool[1].weight), (W, fitting[0][0]))
+        self.assertEqual(plan.pool[1].weight, 3)
+
+    def test_planner_drops_drifted_or_mismatched_plans(self):
+        planner = IncrementalPlanner(drift_threshold=0.25)
+        plan = self.seeded(self.items())
+        planner.seed(7, "sig", plan)
+        self.assertEqual(planner.payload(7, "sig", 100.0)["solver"], "incremental")
+        self.assertIsNone(planner.payload(7, "other", 100.0))
+        planner.seed(7, "sig", plan)
+        for oid in list(plan.route)[: len(plan.route) // 2]:
+            planner.order_removed(oid)
+        self.assertIsNone(planner.payload(7, "sig", 100.0))
+
+    def test_planner_caps_plan_age_and_checks_pending_version(self):
+        clock = FakeClock()
+        planner = IncrementalPlanner(ttl_s=120, max_age_s=60, clock=clock)
+        planner.seed(7, "sig", self.seeded(self.items()))
+        # asked for every 30 s: still too old after a minute
+        clock.now += 30
+        self.assertIsNotNone(planner.payload(7, "sig", 100.0))
+        clock.now += 30
+        self.assertIsNone(planner.payload(7, "sig", 100.0))
+
+        planner.begin(7, version=3)
+        planner.seed(7, "sig", self.seeded(self.items()))
+        planner.order_removed(10_000)  # seen here: the version moves with it
+        self.assertIsNotNone(planner.payload(7, "sig", 100.0, version=4))
+        # moved again without an event reaching this process
+        self.assertIsNone(planner.payload(7, "sig", 100.0, version=5))
+
+    def test_events_during_the_seeding_solve_are_replayed(self):
+        items = self.items()
+        planner = IncrementalPlanner()
+        planner.begin(7, version=3)
+        plan = self.seeded(items)  # the solve runs...
+        taken = plan.route[0]
+        planner.order_removed(taken)  # ...while another courier accepts an order
+        planner.seed(7, "sig", plan)
+        payload = planner.payload(7, "sig", 100.0, version=4)
+        self.assertNotIn(taken, payload["selected_order_ids"])
+        self.assertConsistent(plan)
+        # a solve that never seeds leaves nothing buffered
+        planner.begin(8)
+        planner.abandon(8)
+        planner.order_removed(plan.route[0])
+        self.assertEqual(planner._seeding, {})
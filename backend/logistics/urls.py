@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import CourierLocationView, OptimizeCacheStatsView
+
+urlpatterns = [
+    path("courier/location/", CourierLocationView.as_view(), name="courier-location"),
+    path("optimize-cache/", OptimizeCacheStatsView.as_view(), name="optimize-cache-stats"),
+]
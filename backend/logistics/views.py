@@ -1,3 +1,36 @@
-from django.shortcuts import render
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .cache import get_plan_cache
+from .geo import valid_point
+from .positions import record_ping
+
+
+class CourierLocationView(APIView):
+    # high-frequency GPS pings: memory only, the DB sees throttled batches
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, "role") or user.role != "COURIER":
+            return Response({"detail": "Only couriers can report a location."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            lat = float(request.data["lat"])
+            lng = float(request.data["lng"])
+        except (KeyError, TypeError, ValueError):
+            return Response({"detail": "lat and lng are required numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not valid_point(lat, lng):
+            return Response({"detail": "lat/lng out of range."}, status=status.HTTP_400_BAD_REQUEST)
+        position = record_ping(user.id, lat, lng)
+        return Response(
+            {"lat": position.lat, "lng": position.lng, "recorded_at": position.recorded_at},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class OptimizeCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_plan_cache().stats())
@@ -0,0 +1,227 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from django.conf import settings
+
+# seconds; Prometheus' client defaults, tightened at the low end for API views
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def total(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines += self._metrics[name].render()
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+
+# One registry per process: with several workers each one is scraped (or
+# aggregated) separately, as with any in-process Prometheus exporter.
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(
+    Counter("http_requests_total", "Requests handled, sampled or not.", ("method", "route", "status"))
+)
+HTTP_LATENCY = registry.register(
+    Histogram("http_request_duration_seconds", "View latency of sampled requests.", ("method", "route", "status"))
+)
+DB_QUERIES = registry.register(
+    Histogram("http_db_queries", "Database queries per sampled request.", ("method", "route"), COUNT_BUCKETS)
+)
+DB_LATENCY = registry.register(
+    Histogram("http_db_duration_seconds", "Database time per sampled request.", ("method", "route"))
+)
+SAMPLE_RATE = registry.register(Gauge("metrics_sample_rate", "Share of requests timed (METRICS SAMPLE_RATE)."))
+OPTIMIZER_PHASE = registry.register(
+    Histogram("optimizer_phase_duration_seconds", "Courier optimization time per phase.", ("phase", "solver"))
+)
+OPTIMIZER_CANDIDATES = registry.register(
+    Histogram("optimizer_candidates", "Orders handed to the knapsack solver.", ("solver",), COUNT_BUCKETS)
+)
+OPTIMIZER_TABLE_CELLS = registry.register(
+    Histogram("optimizer_dp_table_cells", "DP table cells filled by the solver.", ("solver",), SIZE_BUCKETS)
+)
+OPTIMIZER_QUEUE_DEPTH = registry.register(
+    Gauge("optimizer_jobs_in_flight", "Plans running or queued in the optimizer pool.")
+)
+OPTIMIZER_FALLBACKS = registry.register(
+    Counter("optimizer_fallbacks_total", "Plans the pool could not serve, by reason and action.", ("reason", "action"))
+)
+
+
+def metrics_config() -> Dict:
+    # settings.METRICS = {"ENABLED": bool, "SAMPLE_RATE": 0..1, "TOKEN": str}
+    config = getattr(settings, "METRICS", {})
+    return {
+        "ENABLED": config.get("ENABLED", True),
+        "SAMPLE_RATE": float(config.get("SAMPLE_RATE", 1.0)),
+        "TOKEN": config.get("TOKEN", ""),
+    }
+
+
+def sampled(rate: float) -> bool:
+    return rate >= 1.0 or random.random() < rate
+
+
+class PhaseTimer:
+    """Wall time per named phase, in ms, for one optimization run."""
+
+    def __init__(self):
+        self.timings_ms: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings_ms[name] = self.timings_ms.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def observe(self, solver: str, candidates: int, table_cells: int) -> None:
+        for name, ms in self.timings_ms.items():
+            OPTIMIZER_PHASE.observe(ms / 1000, phase=name, solver=solver)
+        OPTIMIZER_CANDIDATES.observe(candidates, solver=solver)
+        if table_cells:
+            OPTIMIZER_TABLE_CELLS.observe(table_cells, solver=solver)
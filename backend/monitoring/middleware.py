@@ -0,0 +1,114 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import DB_LATENCY, DB_QUERIES, HTTP_LATENCY, HTTP_REQUESTS, SAMPLE_RATE, metrics_config, sampled
+
+METRICS_PATH = "/metrics"
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Stats of the request being measured. A context variable rather than a
+# per-connection hook: connections are thread-local, and under ASGI the
+# queries of an async view run in a sync_to_async thread, which sees the
+# request's context but not its connection objects.
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    # installed on every connection by monitoring.signals
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def route_label(request) -> str:
+    # the URL pattern, not the path, so /api/orders/12/ and /api/orders/13/ share a series
+    match = getattr(request, "resolver_match", None)
+    return "/" + match.route if match is not None and match.route else "unmatched"
+
+
+class RequestMeasurement:
+    """Counts one request; when ``timed``, also times it and collects its
+    queries into a QueryStats while it runs."""
+
+    def __init__(self, timed: bool):
+        self.timed = timed
+        self.queries = QueryStats()
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._token = current_query_stats.set(self.queries if self.timed else None)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._started
+        current_query_stats.reset(self._token)
+
+    def record(self, request, response) -> None:
+        route = route_label(request)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        if not self.timed:
+            return
+        HTTP_LATENCY.observe(self.elapsed, method=request.method, route=route, status=response.status_code)
+        DB_QUERIES.observe(self.queries.count, method=request.method, route=route)
+        DB_LATENCY.observe(self.queries.seconds, method=request.method, route=route)
+
+
+class MetricsMiddleware:
+    """Per-endpoint latency histograms and DB query count/time.
+
+    Every request is counted; only a SAMPLE_RATE share of them is timed and
+    has its queries wrapped, which bounds the overhead on hot endpoints.
+    Runs natively in both stacks so async views are not bridged to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def measurement(self, request):
+        config = metrics_config()
+        if not config["ENABLED"] or request.path == METRICS_PATH:
+            return None
+        SAMPLE_RATE.set(config["SAMPLE_RATE"])
+        return RequestMeasurement(timed=sampled(config["SAMPLE_RATE"]))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        measurement = self.measurement(request)
+        if measurement is None:
+            return self.get_response(request)
+        with measurement:
+            response = self.get_response(request)
+        measurement.record(request, response)
+        return response
+
+    async def __acall__(self, request):
+        measurement = self.measurement(request)
+        if measurement is None:
+            return await self.get_response(request)
+        with measurement:
+            response = await self.get_response(request)
+        measurement.record(request, response)
+        return response
@@ -0,0 +1,11 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .middleware import count_query
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # fires again on reconnect; the wrapper list lives on the DatabaseWrapper
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
@@ -0,0 +1,123 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from logistics.cache import get_plan_cache
+from logistics.incremental import get_incremental_planner
+from orders.models import Order
+
+from .metrics import (
+    DB_QUERIES,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    OPTIMIZER_CANDIDATES,
+    OPTIMIZER_PHASE,
+    OPTIMIZER_TABLE_CELLS,
+    Counter,
+    Histogram,
+    registry,
+)
+
+
+class ExpositionTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, route="/a/")
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP demo_seconds Demo.",
+                "# TYPE demo_seconds histogram",
+                'demo_seconds_bucket{route="/a/",le="0.1"} 2',
+                'demo_seconds_bucket{route="/a/",le="1"} 3',
+                'demo_seconds_bucket{route="/a/",le="+Inf"} 4',
+                'demo_seconds_sum{route="/a/"} 3.65',
+                'demo_seconds_count{route="/a/"} 4',
+            ],
+        )
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("demo_total", "Demo.", ("path",))
+        counter.inc(path='a"b\\c')
+        self.assertEqual(counter.render()[-1], 'demo_total{path="a\\"b\\\\c"} 1')
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        get_plan_cache().backend.clear()
+        get_incremental_planner().clear()
+        self.courier = User.objects.create_user(username="courier@example.com", password="pass", role=User.Roles.COURIER)
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+
+    def test_records_latency_and_queries_per_route(self):
+        Order.objects.create(customer_phone="+212600000001", location_lat=33.57, location_lng=-7.59, delivery_price_offer=15)
+        self.client.get("/api/orders/pending/")
+        self.client.get("/api/orders/pending/")
+        labels = {"method": "GET", "route": "/api/orders/pending/"}
+        self.assertEqual(HTTP_REQUESTS.value(status=200, **labels), 2)
+        self.assertEqual(HTTP_LATENCY.count(status=200, **labels), 2)
+        # the paginated list is a single query
+        self.assertEqual((DB_QUERIES.count(**labels), DB_QUERIES.total(**labels)), (2, 2))
+
+    def test_detail_routes_share_a_series(self):
+        for pk in (123456, 654321):
+            self.client.get(f"/api/orders/{pk}/")
+        self.assertEqual(HTTP_REQUESTS.value(method="GET", route="/api/orders/<int:pk>/", status=404), 2)
+
+    async def test_async_stack_records_queries(self):
+        # AsyncClient goes through the ASGI handler, with this middleware running as a coroutine
+        token = str(AccessToken.for_user(self.courier))
+        response = await self.async_client.get("/api/orders/pending/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        labels = {"method": "GET", "route": "/api/orders/pending/"}
+        self.assertEqual(HTTP_LATENCY.count(status=200, **labels), 1)
+        # JWT user lookup + the page
+        self.assertEqual(DB_QUERIES.total(**labels), 2)
+
+    @override_settings(METRICS={"SAMPLE_RATE": 0.0})
+    def test_unsampled_requests_are_only_counted(self):
+        self.client.get("/api/orders/pending/")
+        labels = {"method": "GET", "route": "/api/orders/pending/"}
+        self.assertEqual(HTTP_REQUESTS.value(status=200, **labels), 1)
+        self.assertEqual(HTTP_LATENCY.count(status=200, **labels), 0)
+
+    def test_optimizer_phases(self):
+        Order.objects.create(customer_phone="+212600000001", location_lat=33.575, location_lng=-7.59, delivery_price_offer=15)
+        response = self.client.post(
+            "/api/orders/courier/optimize/",
+            {"courier": {"lat": 33.57, "lng": -7.59}, "capacity_km": 5, "solver": "dp"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        metrics = response.data["metrics"]
+        self.assertEqual(set(metrics["timings_ms"]), {"candidates", "distance", "knapsack", "route"})
+        self.assertEqual(metrics["candidates"], 1)
+        self.assertEqual(metrics["dp_table_cells"], 51)
+        self.assertEqual(OPTIMIZER_PHASE.count(phase="knapsack", solver="dp"), 1)
+        self.assertEqual(OPTIMIZER_CANDIDATES.total(solver="dp"), 1)
+        self.assertEqual(OPTIMIZER_TABLE_CELLS.total(solver="dp"), 51)
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_prometheus_text(self):
+        APIClient().get("/api/catalog/items/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="/api/catalog/items/",status="200"} 1', body)
+        self.assertIn("# TYPE optimizer_phase_duration_seconds histogram", body)
+        # scrapes are not measured themselves
+        self.assertNotIn('route="/metrics"', body)
+
+    @override_settings(METRICS={"TOKEN": "s3cret"})
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
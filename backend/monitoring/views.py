@@ -0,0 +1,19 @@
+import hmac
+
+from django.http import HttpResponse
+
+from .metrics import metrics_config, registry
+
+
+def metrics_view(request):
+    # Prometheus text exposition of this process' aggregates; with
+    # METRICS["TOKEN"] set, scrapers must send "Authorization: Bearer <token>"
+    config = metrics_config()
+    if not config["ENABLED"]:
+        return HttpResponse(status=404)
+    token = config["TOKEN"]
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
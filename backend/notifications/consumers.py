@@ -1,4 +1,24 @@
+import math
+from collections import deque
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db.models import Q
+
+from logistics.geo import cells_covering, valid_point
+from logistics.positions import record_ping
+from orders.models import Order
+from orders.pagination import OrderCursorPagination
+from orders.serializers import OrderListSerializer
+
+from .signals import PENDING_GROUP, cell_group, courier_group
+
+# couriers hear about orders whose customer or restaurant lies within this
+# radius of their last reported position
+DEFAULT_WATCH_RADIUS_KM = 5.0
+MIN_WATCH_RADIUS_KM = 0.5
+MAX_WATCH_RADIUS_KM = 20.0
+RECENT_EVENT_IDS = 256
 
 
 class EchoConsumer(AsyncJsonWebsocketConsumer):
@@ -11,3 +31,103 @@ class EchoConsumer(AsyncJsonWebsocketConsumer):
 
     async def disconnect(self, code):
         pass
+
+
+@database_sync_to_async
+def order_snapshot(user, cells=None):
+    # same first page the REST lists return, so the client can swap polling
+    # for this snapshot plus the deltas that follow; with ``cells``, only the
+    # orders whose events reach those cell groups
+    limit = OrderCursorPagination.page_size
+    ordering = OrderCursorPagination.ordering
+    pending = Order.objects.filter(status=Order.Status.PENDING)
+    if cells is not None:
+        pending = pending.filter(Q(location_cell__in=cells) | Q(restaurant_cell__in=cells))
+    pending = pending.order_by(*ordering)[:limit]
+    active = Order.objects.filter(
+        courier=user, status__in=[Order.Status.ASSIGNED, Order.Status.PICKED_UP]
+    ).order_by(*ordering)[:limit]
+    return {
+        "pending": OrderListSerializer(pending, many=True).data,
+        "active": OrderListSerializer(active, many=True).data,
+    }
+
+
+class CourierOrdersConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes pending-order changes to couriers.
+
+    On connect the courier gets a {"type": "snapshot"} message, then one
+    {"type": "order.<kind>", "order": {...}} message per order event
+    (created, accepted, cancelled, delivered), and a
+    {"type": "optimize.result", "job": {...}} message when one of the
+    courier's optimization jobs finishes. Sending
+    {"type": "position", "lat": .., "lng": .., "radius_km": ..} narrows the
+    feed to the grid cells around that point; send it again as the courier
+    moves. Whenever that changes the watched cells, a new snapshot limited
+    to them follows the {"type": "watching"} reply, since orders outside
+    them no longer get events.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not getattr(user, "is_authenticated", False) or getattr(user, "role", None) != "COURIER":
+            await self.close(code=4403)
+            return
+        self.own_group = courier_group(user.id)
+        self.watched = {PENDING_GROUP}
+        self.recent_ids = deque(maxlen=RECENT_EVENT_IDS)
+        for group in (self.own_group, PENDING_GROUP):
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+        await self.send_json({"type": "snapshot", **await order_snapshot(user)})
+
+    async def disconnect(self, code):
+        if not hasattr(self, "own_group"):
+            return
+        for group in self.watched | {self.own_group}:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("type") != "position":
+            await self.send_json({"type": "error", "detail": "Unknown message type."})
+            return
+        try:
+            lat, lng = float(content["lat"]), float(content["lng"])
+            radius_km = float(content.get("radius_km", DEFAULT_WATCH_RADIUS_KM))
+        except (KeyError, TypeError, ValueError):
+            await self.send_json({"type": "error", "detail": "position needs numeric lat and lng."})
+            return
+        if not valid_point(lat, lng) or math.isnan(radius_km):
+            await self.send_json({"type": "error", "detail": "lat/lng out of range."})
+            return
+        radius_km = min(max(radius_km, MIN_WATCH_RADIUS_KM), MAX_WATCH_RADIUS_KM)
+        await database_sync_to_async(record_ping)(self.scope["user"].id, lat, lng)
+        cells = cells_covering(lat, lng, radius_km)
+        if cells:
+            changed = await self.watch({cell_group(cell) for cell in cells})
+        else:
+            # too many cells to subscribe to (near the poles): keep the citywide feed
+            changed = await self.watch({PENDING_GROUP})
+        await self.send_json({"type": "watching", "cells": len(cells or []), "radius_km": radius_km})
+        if changed:
+            await self.send_json({"type": "snapshot", **await order_snapshot(self.scope["user"], cells or None)})
+
+    async def watch(self, groups) -> bool:
+        # only the difference hits the channel layer as the courier moves
+        if groups == self.watched:
+            return False
+        for group in self.watched - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in groups - self.watched:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.watched = groups
+        return True
+
+    async def order_event(self, message):
+        if message["id"] in self.recent_ids:
+            return
+        self.recent_ids.append(message["id"])
+        await self.send_json({"type": f"order.{message['event']}", "order": message["order"]})
+
+    async def optimize_result(self, message):
+        await self.send_json({"type": "optimize.result", "job": message["job"]})
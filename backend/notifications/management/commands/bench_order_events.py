@@ -0,0 +1,138 @@
+import asyncio
+import math
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from orders.models import Order
+
+PREFIX = "bench-events-"
+CENTER = (33.5731, -7.5898)  # Casablanca
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare order-event push latency over the courier WebSocket against "
+        "the expected latency and load of polling /api/orders/pending/. "
+        "Creates temporary couriers and orders and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=50, help="connected courier sockets")
+        parser.add_argument("--events", type=int, default=20, help="orders created while measuring")
+        parser.add_argument("--backlog", type=int, default=200, help="pending orders present during the run")
+        parser.add_argument("--poll-interval", type=float, default=8.0, help="frontend polling period (s)")
+        parser.add_argument(
+            "--city-km",
+            type=float,
+            default=0.0,
+            help="spread couriers and orders over a square of this side; each socket reports its "
+            "position so only nearby couriers receive an event (0 = every socket gets every event)",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        couriers = User.objects.bulk_create(
+            [User(username=f"{PREFIX}{i}@example.com", role=User.Roles.COURIER) for i in range(options["couriers"])]
+        )
+        Order.objects.bulk_create(
+            [
+                Order(customer_phone=f"{PREFIX}{i}", location_lat=33.57, location_lng=-7.59, delivery_price_offer=Decimal(15))
+                for i in range(options["backlog"])
+            ]
+        )
+        try:
+            poll_ms = self._time_poll(couriers[0])
+            push_ms, fanout = asyncio.run(
+                self._measure_push(couriers, options["events"], options["city_km"], random.Random(options["seed"]))
+            )
+        finally:
+            Order.objects.filter(customer_phone__startswith=PREFIX).delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+        interval_ms = options["poll_interval"] * 1000
+        push_ms.sort()
+        self.stdout.write(f"sockets={len(couriers)} events={options['events']} backlog={options['backlog']}")
+        self.stdout.write(f"sockets reached per event: {statistics.mean(fanout):.1f}")
+        self.stdout.write(f"{'':>8} {'mean_ms':>10} {'p95_ms':>10} {'max_ms':>10} {'req/s':>8}")
+        self.stdout.write(
+            f"{'push':>8} {statistics.mean(push_ms):>10.2f} {push_ms[int(len(push_ms) * 0.95) - 1]:>10.2f}"
+            f" {push_ms[-1]:>10.2f} {0:>8}"
+        )
+        # an event lands uniformly within a polling period
+        self.stdout.write(
+            f"{'poll':>8} {interval_ms / 2 + poll_ms:>10.2f} {interval_ms * 0.95 + poll_ms:>10.2f}"
+            f" {interval_ms + poll_ms:>10.2f} {len(couriers) / options['poll_interval']:>8.1f}"
+        )
+        self.stdout.write(f"one pending-list request: {poll_ms:.2f} ms")
+
+    def _time_poll(self, courier, repeat=20):
+        client = APIClient()
+        client.force_authenticate(courier)
+        client.get("/api/orders/pending/")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            client.get("/api/orders/pending/")
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    async def _measure_push(self, couriers, events, city_km, rng):
+        from config.asgi import application
+
+        def random_point():
+            if not city_km:
+                return CENTER
+            dlat = city_km / 2 / 111.0
+            dlng = dlat / math.cos(math.radians(CENTER[0]))
+            return CENTER[0] + rng.uniform(-dlat, dlat), CENTER[1] + rng.uniform(-dlng, dlng)
+
+        tokens = await sync_to_async(lambda: [str(RefreshToken.for_user(c).access_token) for c in couriers])()
+        sockets = [WebsocketCommunicator(application, f"/ws/courier/orders/?token={t}") for t in tokens]
+        for socket in sockets:
+            connected, _ = await socket.connect()
+            if not connected:
+                raise RuntimeError("courier socket refused")
+            await socket.receive_json_from()  # snapshot
+            if city_km:
+                lat, lng = random_point()
+                await socket.send_json_to({"type": "position", "lat": lat, "lng": lng})
+                await socket.receive_json_from()
+        client = APIClient()
+        latencies, fanout = [], []
+        # with geo groups most sockets never hear about an event, so give up quickly
+        timeout = 0.3 if city_km else 5
+
+        async def wait_for(socket, started):
+            # receive_nothing polls without cancelling the consumer on timeout
+            if await socket.receive_nothing(timeout=timeout, interval=0.001):
+                return False
+            await socket.receive_json_from()
+            latencies.append((time.perf_counter() - started) * 1000)
+            return True
+
+        for i in range(events):
+            lat, lng = random_point()
+            started = time.perf_counter()
+            waiters = [asyncio.ensure_future(wait_for(s, started)) for s in sockets]
+            await sync_to_async(client.post)(
+                "/api/orders/",
+                {
+                    "customer_phone": f"{PREFIX}new{i}",
+                    "location_lat": lat,
+                    "location_lng": lng,
+                    "delivery_price_offer": "15.00",
+                    "items": [],
+                },
+                format="json",
+            )
+            fanout.append(sum(await asyncio.gather(*waiters)))
+        for socket in sockets:
+            await socket.disconnect()
+        return latencies, fanout
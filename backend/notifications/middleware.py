@@ -0,0 +1,32 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token: str):
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return AnonymousUser()
+    User = get_user_model()
+    try:
+        return User.objects.get(**{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]})
+    except (User.DoesNotExist, KeyError):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    # browsers can't set headers on a WebSocket handshake, so the access token
+    # comes as ?token=<jwt>
+    async def __call__(self, scope, receive, send):
+        params = parse_qs(scope.get("query_string", b"").decode())
+        raw_token = (params.get("token") or [""])[0]
+        scope["user"] = await get_user_for_token(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import EchoConsumer
+from .consumers import CourierOrdersConsumer, EchoConsumer
 
 websocket_urlpatterns = [
     re_path(r"^ws/echo/$", EchoConsumer.as_asgi()),
+    re_path(r"^ws/courier/orders/$", CourierOrdersConsumer.as_asgi()),
 ]
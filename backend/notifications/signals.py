@@ -0,0 +1,64 @@
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.dispatch import receiver
+
+from logistics.geo import cell_key
+from orders.jobs import optimize_job_finished
+from orders.serializers import OrderListSerializer
+from orders.signals import order_event
+
+# Sockets that have not reported a position yet listen on PENDING_GROUP;
+# located couriers listen on the cell_group()s around them instead, so an
+# event only reaches couriers near the order.
+PENDING_GROUP = "orders.pending"
+
+
+def courier_group(user_id: int) -> str:
+    return f"courier.{user_id}"
+
+
+def cell_group(cell: str) -> str:
+    return f"orders.cell.{cell}"
+
+
+def event_groups(order) -> list:
+    groups = [PENDING_GROUP]
+    for cell in (
+        cell_key(order.location_lat, order.location_lng),
+        cell_key(order.restaurant_lat, order.restaurant_lng),
+    ):
+        if cell and cell_group(cell) not in groups:
+            groups.append(cell_group(cell))
+    if order.courier_id:
+        groups.append(courier_group(order.courier_id))
+    return groups
+
+
+@receiver(order_event)
+def broadcast_order_event(sender, kind, order, **kwargs):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    # a socket can sit in several of these groups; the id lets it drop repeats
+    message = {
+        "type": "order.event",
+        "id": uuid.uuid4().hex,
+        "event": kind,
+        "order": dict(OrderListSerializer(order).data),
+    }
+    send = async_to_sync(layer.group_send)
+    for group in event_groups(order):
+        send(group, message)
+
+
+@receiver(optimize_job_finished)
+def push_optimize_result(sender, job, **kwargs):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    message = {"type": "optimize.result", "job": job.as_dict()}
+    send = async_to_sync(layer.group_send)
+    for courier_id in sorted(job.courier_ids):
+        send(courier_group(courier_id), message)
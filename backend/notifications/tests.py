@@ -1,3 +1,174 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from config.asgi import application
+from orders import jobs
+from orders.models import Order
+
+
+def make_courier(username):
+    return User.objects.create(username=username, role=User.Roles.COURIER)
+
+
+def make_order(**kwargs):
+    return Order.objects.create(
+        customer_phone="+212600000001", location_lat=33.57, location_lng=-7.59,
+        delivery_price_offer=Decimal("20.00"), **kwargs
+    )
+
+
+def post_order(lat, lng, **extra):
+    payload = {
+        "customer_phone": "+212600000002", "location_lat": lat, "location_lng": lng,
+        "delivery_price_offer": "12.00", "items": [], **extra,
+    }
+    return APIClient().post("/api/orders/", payload, format="json")
+
+
+class CourierOrdersConsumerTests(TransactionTestCase):
+    async def connect(self, user=None):
+        path = "/ws/courier/orders/"
+        if user is not None:
+            token = await sync_to_async(lambda: str(RefreshToken.for_user(user).access_token))()
+            path += f"?token={token}"
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_rejects_anonymous_and_customers(self):
+        _, connected = await self.connect()
+        self.assertFalse(connected)
+        customer = await User.objects.acreate(username="client@example.com", role=User.Roles.CUSTOMER)
+        _, connected = await self.connect(customer)
+        self.assertFalse(connected)
+
+    async def test_snapshot_then_deltas(self):
+        courier = await sync_to_async(make_courier)("courier@example.com")
+        existing = await sync_to_async(make_order)()
+        communicator, connected = await self.connect(courier)
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual([o["id"] for o in snapshot["pending"]], [existing.id])
+        self.assertEqual(snapshot["active"], [])
+
+        response = await sync_to_async(post_order)(33.58, -7.6)
+        created = await communicator.receive_json_from()
+        self.assertEqual(created["type"], "order.created")
+        self.assertEqual(created["order"]["id"], response.data["id"])
+
+        other = await sync_to_async(make_courier)("other@example.com")
+        client = APIClient()
+        client.force_authenticate(other)
+        await sync_to_async(client.post)(f"/api/orders/{existing.id}/accept/")
+        accepted = await communicator.receive_json_from()
+        self.assertEqual(accepted["type"], "order.accepted")
+        self.assertEqual(accepted["order"]["courier"], other.id)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def located_courier(self, username, lat, lng):
+        courier = await sync_to_async(make_courier)(username)
+        communicator, connected = await self.connect(courier)
+        self.assertTrue(connected)
+        await communicator.receive_json_from()  # snapshot
+        await communicator.send_json_to({"type": "position", "lat": lat, "lng": lng})
+        watching = await communicator.receive_json_from()
+        self.assertEqual(watching["type"], "watching")
+        self.assertEqual((await communicator.receive_json_from())["type"], "snapshot")
+        return communicator
+
+    async def test_events_reach_only_nearby_couriers(self):
+        casablanca = await self.located_courier("casa@example.com", 33.5731, -7.5898)
+        rabat = await self.located_courier("rabat@example.com", 34.0209, -6.8416)
+
+        # customer and restaurant in different cells, both near Casablanca
+        response = await sync_to_async(post_order)(
+            33.575, -7.59, restaurant_name="Chez Ali", restaurant_lat=33.60, restaurant_lng=-7.62
+        )
+        created = await casablanca.receive_json_from()
+        self.assertEqual(created["order"]["id"], response.data["id"])
+        self.assertTrue(await casablanca.receive_nothing())
+        self.assertTrue(await rabat.receive_nothing())
+
+        # moving re-subscribes the socket to the cells around the new position
+        # and resends the pending list of that area
+        await rabat.send_json_to({"type": "position", "lat": 33.5731, "lng": -7.5898})
+        await rabat.receive_json_from()  # watching
+        snapshot = await rabat.receive_json_from()
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual([o["id"] for o in snapshot["pending"]], [response.data["id"]])
+        await sync_to_async(post_order)(33.575, -7.59)
+        self.assertEqual((await rabat.receive_json_from())["type"], "order.created")
+        await casablanca.disconnect()
+        await rabat.disconnect()
+
+    async def test_position_snapshot_is_scoped_to_watched_cells(self):
+        near = await sync_to_async(make_order)()
+        far = await sync_to_async(post_order)(34.0209, -6.8416)
+        courier = await sync_to_async(make_courier)("courier@example.com")
+        communicator, _ = await self.connect(courier)
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual({o["id"] for o in snapshot["pending"]}, {near.id, far.data["id"]})
+        await communicator.send_json_to({"type": "position", "lat": 33.5731, "lng": -7.5898})
+        await communicator.receive_json_from()  # watching
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual([o["id"] for o in snapshot["pending"]], [near.id])
+        # same cells again: nothing to resend
+        await communicator.send_json_to({"type": "position", "lat": 33.5731, "lng": -7.5898})
+        self.assertEqual((await communicator.receive_json_from())["type"], "watching")
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_keeps_the_citywide_feed_without_cells(self):
+        # near the pole the watch radius spans too many cells to subscribe to
+        polar = await sync_to_async(make_courier)("polar@example.com")
+        communicator, _ = await self.connect(polar)
+        await communicator.receive_json_from()  # snapshot
+        await communicator.send_json_to({"type": "position", "lat": 89.99, "lng": 0.0, "radius_km": 20})
+        self.assertEqual((await communicator.receive_json_from())["cells"], 0)
+        response = await sync_to_async(post_order)(33.575, -7.59)
+        self.assertEqual((await communicator.receive_json_from())["order"]["id"], response.data["id"])
+        await communicator.disconnect()
+
+    async def test_rejects_malformed_position(self):
+        courier = await sync_to_async(make_courier)("courier@example.com")
+        communicator, _ = await self.connect(courier)
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "position", "lat": "north"})
+        self.assertEqual((await communicator.receive_json_from())["type"], "error")
+        for bad in ({"lat": "nan", "lng": 1}, {"lat": 95, "lng": 1}, {"lat": 1, "lng": "-inf"}, {"lat": 1, "lng": 1, "radius_km": "nan"}):
+            await communicator.send_json_to({"type": "position", **bad})
+            self.assertEqual((await communicator.receive_json_from())["type"], "error")
+        # the socket survives, and a non-positive radius still watches a few cells
+        await communicator.send_json_to({"type": "position", "lat": 33.5731, "lng": -7.5898, "radius_km": -1})
+        watching = await communicator.receive_json_from()
+        self.assertEqual(watching["radius_km"], 0.5)
+        self.assertGreater(watching["cells"], 0)
+        await communicator.disconnect()
+
+    async def test_optimize_job_result_is_pushed(self):
+        courier = await sync_to_async(make_courier)("courier@example.com")
+        order = await sync_to_async(make_order)()
+        communicator, connected = await self.connect(courier)
+        self.assertTrue(connected)
+        await communicator.receive_json_from()  # snapshot
+        client = APIClient()
+        client.force_authenticate(courier)
+        with mock.patch.object(jobs, "_job_store", jobs.OptimizeJobStore(threads=0)):
+            response = await sync_to_async(client.post)(
+                "/api/orders/courier/optimize/jobs/", {"courier": {"lat": 33.57, "lng": -7.59}}, format="json"
+            )
+        self.assertEqual(response.status_code, 202)
+        pushed = await communicator.receive_json_from()
+        self.assertEqual(pushed["type"], "optimize.result")
+        self.assertEqual(pushed["job"]["id"], response.data["id"])
+        self.assertEqual(pushed["job"]["result"]["selected_order_ids"], [order.id])
+        await communicator.disconnect()
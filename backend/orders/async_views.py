@@ -0,0 +1,93 @@
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from accounts.authentication import AsyncJWTAuthentication
+
+from .models import Order
+from .pagination import OrderCursorPagination
+from .serializers import OrderDetailSerializer, OrderListSerializer
+from .views import active_orders, pending_orders
+
+
+class AsyncOrderView(View):
+	"""Base for the async read endpoints (courier polling).
+
+	Authentication, the queries and serialization all run in the request's
+	coroutine: only the DB round trips leave the event loop, so a waiting
+	request does not hold a worker thread. Errors and payloads match the
+	DRF views they replace.
+	"""
+
+	authentication = AsyncJWTAuthentication()
+	http_method_names = ["get"]
+
+	async def get(self, request, *args, **kwargs):
+		drf_request = Request(request)
+		try:
+			drf_request.user = await self.authenticate(request)
+			data = await self.aget(drf_request, *args, **kwargs)
+		except exceptions.APIException as exc:
+			return self.error_response(exc)
+		return self.render(data)
+
+	async def authenticate(self, request):
+		# APIClient.force_authenticate (tests) bypasses the token as in DRF
+		forced = getattr(request, "_force_auth_user", None)
+		if forced is not None:
+			return forced
+		auth = await self.authentication.aauthenticate(request)
+		if auth is None:
+			raise exceptions.NotAuthenticated()
+		return auth[0]
+
+	async def aget(self, request, *args, **kwargs):
+		raise NotImplementedError
+
+	def render(self, data, status_code=status.HTTP_200_OK):
+		# rendered here: a lazy DRF Response would be rendered in a worker thread
+		response = HttpResponse(JSONRenderer().render(data), status=status_code, content_type="application/json")
+		response.data = data  # as on DRF's Response, for callers and tests reading .data
+		return response
+
+	def error_response(self, exc):
+		# rest_framework.views.exception_handler, minus the sync-only parts
+		data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+		response = self.render(data, exc.status_code)
+		if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+			response["WWW-Authenticate"] = self.authentication.authenticate_header(None)
+		return response
+
+
+class AsyncOrderListView(AsyncOrderView):
+	pagination_class = OrderCursorPagination
+
+	def get_queryset(self, request):
+		raise NotImplementedError
+
+	async def aget(self, request):
+		paginator = self.pagination_class()
+		page = await paginator.apaginate_queryset(self.get_queryset(request), request, view=self)
+		data = OrderListSerializer(page, many=True, context={"request": request}).data
+		return paginator.get_paginated_data(data)
+
+
+class AsyncPendingOrdersListView(AsyncOrderListView):
+	def get_queryset(self, request):
+		return pending_orders(request)
+
+
+class AsyncCourierActiveOrdersView(AsyncOrderListView):
+	def get_queryset(self, request):
+		return active_orders(request)
+
+
+class AsyncOrderDetailView(AsyncOrderView):
+	async def aget(self, request, pk):
+		try:
+			order = await Order.objects.prefetch_related("items__item").aget(pk=pk)
+		except Order.DoesNotExist:
+			raise exceptions.NotFound("No Order matches the given query.")
+		return OrderDetailSerializer(order, context={"request": request}).data
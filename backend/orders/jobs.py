@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.dispatch import Signal
+
+from logistics.cache import get_plan_cache
+from logistics.executor import OptimizerBusy
+
+from .optimize import OptimizeParams, build_plan, cached_plan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 4
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TTL_S = 300.0
+
+# Sent when a job finishes (done or failed); notifications pushes the result
+# to the sockets of every courier waiting on it.
+optimize_job_finished = Signal()
+
+
+class JobQueueFull(Exception):
+	pass
+
+
+@dataclass
+class OptimizeJob:
+	id: str
+	key: str
+	params: OptimizeParams
+	courier_ids: Set[int] = field(default_factory=set)
+	status: str = "queued"  # queued, running, done, failed
+	result: Optional[Dict] = None
+	error: str = ""
+	finished_at: Optional[float] = None
+
+	def as_dict(self) -> Dict:
+		data = {"id": self.id, "status": self.status, "result": self.result}
+		if self.error:
+			data["error"] = self.error
+		return data
+
+
+class OptimizeJobStore:
+	"""Background optimization jobs, kept in process for ``ttl_s`` once done.
+
+	Jobs are keyed on the plan-cache key (snapped position, parameters,
+	pending-set version): a request identical to one still in flight joins
+	that job instead of starting another. The threads mostly wait on the
+	optimizer pool; ``threads=0`` runs each job inline when submitted.
+	"""
+
+	def __init__(self, threads: int = DEFAULT_THREADS, max_pending: int = DEFAULT_MAX_PENDING, ttl_s: float = DEFAULT_TTL_S, clock=time.monotonic):
+		self.threads = threads
+		self.max_pending = max_pending
+		self.ttl_s = ttl_s
+		self.clock = clock
+		self._jobs: Dict[str, OptimizeJob] = {}
+		self._in_flight: Dict[str, OptimizeJob] = {}
+		self._pool = ThreadPoolExecutor(threads, thread_name_prefix="optimize-job") if threads > 0 else None
+		self._lock = threading.Lock()
+
+	def submit(self, courier_id: int, params: OptimizeParams):
+		"""Returns (job, joined): ``joined`` when an identical job was running."""
+		key = params.cache_key(get_plan_cache())
+		with self._lock:
+			self._expire()
+			job = self._in_flight.get(key)
+			if job is not None:
+				job.courier_ids.add(courier_id)
+				return job, True
+			if len(self._in_flight) >= self.max_pending:
+				raise JobQueueFull()
+			job = OptimizeJob(uuid.uuid4().hex, key, params, {courier_id})
+			self._jobs[job.id] = job
+			self._in_flight[key] = job
+		if self._pool is None:
+			self._run(job)
+		else:
+			self._pool.submit(self._run, job)
+		return job, False
+
+	def get(self, job_id: str) -> Optional[OptimizeJob]:
+		with self._lock:
+			self._expire()
+			return self._jobs.get(job_id)
+
+	def _expire(self) -> None:
+		now = self.clock()
+		for job_id in [j.id for j in self._jobs.values() if j.finished_at is not None and j.finished_at + self.ttl_s <= now]:
+			del self._jobs[job_id]
+
+	def _run(self, job: OptimizeJob) -> None:
+		job.status = "running"
+		try:
+			cache = get_plan_cache()
+			payload = cached_plan(cache, job.key)
+			if payload is not None:
+				payload = {**payload, "cached": True}
+			else:
+				payload = build_plan(job.params)
+				if not payload.get("degraded"):
+					cache.set(job.key, payload)
+				payload = {**payload, "cached": False}
+			job.result, job.status = payload, "done"
+		except ValueError as exc:
+			job.error, job.status = str(exc), "failed"
+		except OptimizerBusy:
+			job.error, job.status = "Optimizer saturated, retry shortly.", "failed"
+		except Exception:
+			logger.exception("optimization job %s failed", job.id)
+			job.error, job.status = "Optimization failed.", "failed"
+		finally:
+			if self._pool is not None:
+				# job threads are not request threads: nothing else closes their connection
+				close_old_connections()
+			with self._lock:
+				self._in_flight.pop(job.key, None)
+				job.finished_at = self.clock()
+		optimize_job_finished.send(sender=OptimizeJob, job=job)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._jobs.clear()
+			self._in_flight.clear()
+
+
+def build_job_store() -> OptimizeJobStore:
+	# settings.OPTIMIZE_JOBS = {"THREADS": .., "MAX_PENDING": .., "TTL_S": ..}
+	config = getattr(settings, "OPTIMIZE_JOBS", {})
+	return OptimizeJobStore(
+		config.get("THREADS", DEFAULT_THREADS),
+		config.get("MAX_PENDING", DEFAULT_MAX_PENDING),
+		config.get("TTL_S", DEFAULT_TTL_S),
+	)
+
+
+_job_store: Optional[OptimizeJobStore] = None
+
+
+def get_job_store() -> OptimizeJobStore:
+	global _job_store
+	if _job_store is None:
+		_job_store = build_job_store()
+	return _job_store
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Backfill Order.total_weight_kg from the order lines, or verify it with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report orders whose stored weight differs from their lines; exit non-zero if any",
+        )
+        parser.add_argument("--tolerance", type=float, default=1e-6)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tolerance = options["tolerance"]
+        mismatched = []
+        rows = (
+            Order.objects.with_computed_weight()
+            .values_list("id", "total_weight_kg", "computed_weight_kg")
+            .order_by("id")
+        )
+        checked = 0
+        for order_id, stored, computed in rows.iterator(chunk_size=options["batch_size"]):
+            checked += 1
+            if abs((stored or 0.0) - computed) > tolerance:
+                mismatched.append(order_id)
+
+        if options["verify"]:
+            for order_id in mismatched[:20]:
+                self.stdout.write(f"  order #{order_id} has a stale total_weight_kg")
+            if mismatched:
+                raise CommandError(f"{len(mismatched)} of {checked} orders have a stale total_weight_kg.")
+            self.stdout.write(self.style.SUCCESS(f"Verified {checked} orders."))
+            return
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(mismatched), batch_size):
+            Order.objects.filter(pk__in=mismatched[start:start + batch_size]).refresh_total_weight()
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} orders, updated {len(mismatched)}."))
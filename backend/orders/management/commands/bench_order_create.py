@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from catalog.cache import bump_catalog_version
+from catalog.models import Item
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare orders/second for one POST /api/orders/ per order against "
+        "POST /api/orders/bulk/. Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--lines", type=int, default=3, help="items per order")
+        parser.add_argument("--batch", type=int, default=100, help="orders per bulk request")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["orders"], options["lines"], options["batch"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count, lines, batch):
+        items = Item.objects.bulk_create(
+            [Item(name=f"bench-item-{i}", category=Item.Category.PREPARED, weight_per_unit_kg=0.4) for i in range(lines)]
+        )
+        # bulk_create skips the Item signals; make the registry pick them up
+        bump_catalog_version()
+        payloads = [
+            {
+                "customer_phone": f"+2126{i:08d}",
+                "location_lat": 33.57 + (i % 100) * 0.001,
+                "location_lng": -7.59,
+                "delivery_price_offer": "15.00",
+                "items": [{"item_id": item.id, "quantity": 1 + i % 3} for item in items],
+            }
+            for i in range(count)
+        ]
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="bench-partner"))
+
+        self.stdout.write(f"{'mode':>8} {'orders':>7} {'requests':>8} {'queries':>8} {'seconds':>8} {'orders/s':>9}")
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for payload in payloads:
+                client.post("/api/orders/", payload, format="json")
+            elapsed = time.perf_counter() - started
+        self._row("single", count, count, len(queries), elapsed)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for start in range(0, count, batch):
+                client.post("/api/orders/bulk/", payloads[start:start + batch], format="json")
+            elapsed = time.perf_counter() - started
+        self._row("bulk", count, -(-count // batch), len(queries), elapsed)
+
+    def _row(self, mode, count, requests, queries, elapsed):
+        self.stdout.write(f"{mode:>8} {count:>7} {requests:>8} {queries:>8} {elapsed:>8.2f} {count / elapsed:>9.0f}")
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+from logistics.geo import cell_key
+
+
+def backfill_cells(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    batch = []
+    for order in Order.objects.only(
+        "id", "location_lat", "location_lng", "restaurant_lat", "restaurant_lng"
+    ).iterator():
+        order.location_cell = cell_key(order.location_lat, order.location_lng)
+        order.restaurant_cell = cell_key(order.restaurant_lat, order.restaurant_lng)
+        batch.append(order)
+        if len(batch) >= 1000:
+            Order.objects.bulk_update(batch, ["location_cell", "restaurant_cell"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["location_cell", "restaurant_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_order_delivered_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="location_cell",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=24
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="restaurant_cell",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=24
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "location_cell"], name="order_status_cell_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_cells, migrations.RunPython.noop),
+    ]
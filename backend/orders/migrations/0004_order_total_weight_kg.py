@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:26
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_weight(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    lines = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(weight=Sum(F("quantity") * F("item__weight_per_unit_kg"), output_field=FloatField()))
+        .values("weight")
+    )
+    Order.objects.update(total_weight_kg=Coalesce(Subquery(lines), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_cells"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="total_weight_kg",
+            field=models.FloatField(db_index=True, default=0.0, editable=False),
+        ),
+        migrations.RunPython(backfill_total_weight, migrations.RunPython.noop),
+    ]
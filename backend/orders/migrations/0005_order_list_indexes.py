@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_total_weight_kg"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "created_at"], name="order_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["courier", "status", "delivered_at"],
+                name="order_courier_delivered_idx",
+            ),
+        ),
+    ]
@@ -1,7 +1,30 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from catalog.models import Item
+from logistics.geo import cell_key
+
+
+def _lines_weight():
+	return Sum(F("items__quantity") * F("items__item__weight_per_unit_kg"), output_field=FloatField())
+
+
+class OrderQuerySet(models.QuerySet):
+	def with_computed_weight(self):
+		# weight recomputed from the order lines; total_weight_kg is the stored copy
+		return self.annotate(computed_weight_kg=Coalesce(_lines_weight(), 0.0))
+
+	def refresh_total_weight(self) -> int:
+		# one UPDATE rewriting total_weight_kg from the order lines
+		lines = (
+			OrderItem.objects.filter(order=OuterRef("pk"))
+			.values("order")
+			.annotate(weight=Sum(F("quantity") * F("item__weight_per_unit_kg"), output_field=FloatField()))
+			.values("weight")
+		)
+		return self.update(total_weight_kg=Coalesce(Subquery(lines), 0.0))
 
 
 class Order(models.Model):
@@ -28,11 +51,45 @@ class Order(models.Model):
 	restaurant_lat = models.FloatField(null=True, blank=True)
 	restaurant_lng = models.FloatField(null=True, blank=True)
 
+	# grid cells (see logistics.geo) maintained on save for radius queries
+	location_cell = models.CharField(max_length=24, blank=True, default="", editable=False)
+	restaurant_cell = models.CharField(max_length=24, blank=True, default="", editable=False)
+
+	# sum of quantity * item weight, maintained from the order lines (orders.signals)
+	total_weight_kg = models.FloatField(default=0.0, db_index=True, editable=False)
+
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	objects = OrderQuerySet.as_manager()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["status", "location_cell"], name="order_status_cell_idx"),
+			# list views: the pending feed, and a courier's history; the latter's
+			# (courier, status) prefix also serves the active-orders list
+			models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+			models.Index(fields=["courier", "status", "delivered_at"], name="order_courier_delivered_idx"),
+		]
+
+	def refresh_cells(self) -> None:
+		self.location_cell = cell_key(self.location_lat, self.location_lng)
+		self.restaurant_cell = cell_key(self.restaurant_lat, self.restaurant_lng)
+
+	def save(self, *args, **kwargs):
+		self.refresh_cells()
+		update_fields = kwargs.get("update_fields")
+		if update_fields is not None:
+			update_fields = set(update_fields)
+			if update_fields & {"location_lat", "location_lng"}:
+				update_fields.add("location_cell")
+			if update_fields & {"restaurant_lat", "restaurant_lng"}:
+				update_fields.add("restaurant_cell")
+			kwargs["update_fields"] = update_fields
+		super().save(*args, **kwargs)
+
 	def estimated_weight_kg(self) -> float:
-		return sum([oi.quantity * (oi.item.weight_per_unit_kg or 0.0) for oi in self.items.all()])
+		return self.total_weight_kg
 
 	def __str__(self) -> str:
 		return f"Order #{self.pk} ({self.status})"
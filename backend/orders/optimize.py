@@ -0,0 +1,249 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from rest_framework.exceptions import ParseError
+
+from logistics.cache import POSITION_QUANTUM_DEG, PlanCache, get_plan_cache
+from logistics.executor import PlanJob, get_executor
+from logistics.geo import filter_within_radius, valid_point
+from logistics.incremental import IncrementalPlan, get_incremental_planner
+from logistics.optimizer import order_distances_km
+from logistics.positions import latest_position, record_ping
+from logistics.solvers import DEFAULT_TIME_BUDGET_MS, SOLVERS
+from monitoring.metrics import PhaseTimer
+
+from .models import Order
+
+MODES = ("dropoff", "pickup_delivery")
+# upper bounds on the request knobs that size the solve
+MAX_CAPACITY_KM = 50.0
+MAX_TIME_BUDGET_MS = 2000.0
+
+
+@dataclass(frozen=True)
+class OptimizeParams:
+	courier_pos: Tuple[float, float]
+	capacity_km: float
+	capacity_kg: float
+	time_budget_ms: float
+	solver: Optional[str]
+	mode: str
+
+	@property
+	def pickup_delivery(self) -> bool:
+		return self.mode == "pickup_delivery"
+
+	def cache_key(self, cache: PlanCache) -> str:
+		return cache.key(
+			self.courier_pos, self.capacity_km, mode=self.mode, solver=self.solver or "auto", budget=self.time_budget_ms,
+			capacity_kg=self.capacity_kg if self.pickup_delivery else "-",
+		)
+
+	def signature(self) -> Tuple:
+		# the cache key minus the pending-set version
+		return (
+			round(self.courier_pos[0] / POSITION_QUANTUM_DEG), round(self.courier_pos[1] / POSITION_QUANTUM_DEG),
+			self.capacity_km, self.mode, self.solver, self.time_budget_ms,
+		)
+
+
+def optimize_params(request) -> OptimizeParams:
+	# Expect body: { "courier": {"lat": float, "lng": float} (optional once pinged), "capacity_km": float,
+	#                "time_budget_ms": float (optional), "solver": "dp"|"greedy"|"fptas"|"bnb" (optional),
+	#                "mode": "dropoff" (default) | "pickup_delivery" }
+	data = request.data or {}
+	mode = data.get("mode", "dropoff")
+	if mode not in MODES:
+		raise ParseError("mode must be 'dropoff' or 'pickup_delivery'")
+	solver = data.get("solver")
+	if solver is not None and solver not in SOLVERS:
+		# caught here rather than by solve(), before a job is queued or a worker is used
+		raise ParseError(f"Unknown solver '{solver}'. Choose one of: {', '.join(SOLVERS)}")
+	courier_lat = data.get("courier", {}).get("lat")
+	courier_lng = data.get("courier", {}).get("lng")
+	if courier_lat is not None and courier_lng is not None:
+		try:
+			courier_pos = (float(courier_lat), float(courier_lng))
+		except (TypeError, ValueError):
+			raise ParseError("courier.lat and courier.lng must be numbers")
+		# checked like a location ping before it reaches the position store
+		if not valid_point(*courier_pos):
+			raise ParseError("courier.lat/courier.lng out of range")
+		record_ping(request.user.id, *courier_pos)
+	else:
+		# no position in the body: use the last ping (logistics.positions)
+		courier_pos = latest_position(request.user.id)
+		if courier_pos is None:
+			raise ParseError("courier.lat and courier.lng are required (no recent location on record)")
+	return OptimizeParams(
+		courier_pos=courier_pos,
+		capacity_km=_bounded(data, "capacity_km", 10.0, MAX_CAPACITY_KM),
+		capacity_kg=float(getattr(request.user, "capacity_kg", 0) or 0),
+		time_budget_ms=_bounded(data, "time_budget_ms", DEFAULT_TIME_BUDGET_MS, MAX_TIME_BUDGET_MS),
+		solver=solver,
+		mode=mode,
+	)
+
+
+def _bounded(data, name: str, default: float, maximum: float) -> float:
+	try:
+		value = float(data.get(name, default))
+	except (TypeError, ValueError):
+		raise ParseError(f"{name} must be a number")
+	if not (math.isfinite(value) and 0 < value <= maximum):
+		raise ParseError(f"{name} must be greater than 0 and at most {maximum:g}")
+	return value
+
+
+def cached_plan(cache: PlanCache, key: str) -> Optional[Dict]:
+	cached = cache.get(key)
+	if cached is None:
+		return None
+	# the version bump runs after commit; make sure nothing in the plan
+	# was taken in that window before serving it
+	if _all_pending(cached["selected_order_ids"]):
+		return cached
+	cache.reject()
+	return None
+
+
+def _all_pending(ids) -> bool:
+	return Order.objects.filter(pk__in=ids, status=Order.Status.PENDING).count() == len(ids)
+
+
+def incremental_plan(params: OptimizeParams, courier_id: int) -> Optional[Dict]:
+	"""The courier's last drop-off plan, patched order by order since
+	(logistics.incremental); None when a full solve is due."""
+	if params.pickup_delivery:
+		return None
+	planner = get_incremental_planner()
+	timer = PhaseTimer()
+	with timer.phase("incremental"):
+		payload = planner.payload(courier_id, params.signature(), params.time_budget_ms, get_plan_cache().version())
+	if payload is None:
+		return None
+	# orders taken through another process never reach this one's plans, and
+	# a per-process plan cache cannot tell
+	if not _all_pending(payload["selected_order_ids"]):
+		planner.forget(courier_id)
+		return None
+	timer.observe("incremental", payload["metrics"]["candidates"], 0)
+	payload["metrics"]["timings_ms"] = timer.timings_ms
+	return payload
+
+
+def build_plan(params: OptimizeParams, courier_id: Optional[int] = None) -> Dict:
+	"""Plan for one courier over the pending pool. Raises ValueError for an
+	unknown solver and logistics.executor.OptimizerBusy when the pool
+	rejects the job. With ``courier_id``, a drop-off plan also seeds that
+	courier's incremental plan."""
+	timer = PhaseTimer()
+	courier_pos, capacity_km, capacity_kg = params.courier_pos, params.capacity_km, params.capacity_kg
+	planner = get_incremental_planner()
+	seeding = courier_id is not None and not params.pickup_delivery
+	if seeding:
+		# order events from here on are replayed on the plan once it is seeded
+		planner.begin(courier_id, get_plan_cache().version())
+	# Candidate orders: pending ones whose restaurant and customer both fall
+	# within capacity_km of the courier (spatial prefilter, then exact check)
+	with timer.phase("candidates"):
+		candidates = list(
+			filter_within_radius(
+				Order.objects.filter(status=Order.Status.PENDING), courier_pos, capacity_km
+			).only(
+				"id", "location_lat", "location_lng", "restaurant_lat", "restaurant_lng",
+				"restaurant_name", "delivery_price_offer", "total_weight_kg",
+			)
+		)
+	with timer.phase("distance"):
+		customers = [(o.location_lat, o.location_lng) for o in candidates]
+		restaurants = [(o.restaurant_lat, o.restaurant_lng) for o in candidates]
+		distances = order_distances_km(courier_pos, customers, restaurants)
+	items = []
+	for o, customer, restaurant, dist_km in zip(candidates, customers, restaurants, distances):
+		if dist_km > capacity_km:
+			continue
+		profit = float(o.delivery_price_offer)
+		item = {"id": o.id, "profit": profit, "distance_km": dist_km, "customer": customer}
+		if params.pickup_delivery:
+			item["weight_kg"] = o.total_weight_kg
+			if item["weight_kg"] > capacity_kg:
+				continue
+			item["restaurant"] = restaurant if None not in restaurant else None
+			item["restaurant_name"] = o.restaurant_name
+		items.append(item)
+
+	# Knapsack then route (nearest neighbour + 2-opt/Or-opt, or shared
+	# pickups per restaurant in pickup_delivery mode) run in the optimizer
+	# pool (logistics.executor), off this request thread
+	job = PlanJob.from_items(
+		courier_pos, items, capacity_km, params.time_budget_ms, params.solver,
+		capacity_kg if params.pickup_delivery else None,
+	)
+	outcome = get_executor().submit(job)
+	timer.timings_ms.update(outcome.timings_ms)
+	by_id = {item["id"]: item for item in items}
+	if params.pickup_delivery:
+		payload = _pickup_delivery_response(by_id, outcome, capacity_km, capacity_kg, params.time_budget_ms)
+	else:
+		payload = _dropoff_response(by_id, outcome, capacity_km, params.time_budget_ms)
+	if outcome.degraded:
+		payload["degraded"] = outcome.degraded
+		if seeding:
+			planner.abandon(courier_id)
+	elif seeding:
+		plan = IncrementalPlan(courier_pos, capacity_km, items, payload["selected_order_ids"], outcome.solver)
+		planner.seed(courier_id, params.signature(), plan)
+	timer.observe(outcome.solver, len(items), outcome.table_cells)
+	payload["metrics"] = {"candidates": len(items), "dp_table_cells": outcome.table_cells, "timings_ms": timer.timings_ms}
+	return payload
+
+
+def _dropoff_response(by_id, outcome, capacity_km, time_budget_ms):
+	selected = [by_id[oid] for oid in outcome.selected_ids]
+	return {
+		"selected_order_ids": list(outcome.selected_ids),
+		"total_profit": sum(i["profit"] for i in selected),
+		"total_distance_km": sum(i["distance_km"] for i in selected),
+		"capacity_km": capacity_km,
+		"count": len(selected),
+		"route_distance_km": outcome.route_km,
+		"route_improvement_km": outcome.initial_km - outcome.route_km,
+		"solver": outcome.solver,
+		"optimality_gap": outcome.optimality_gap,
+		"time_budget_ms": time_budget_ms,
+	}
+
+
+def _pickup_delivery_response(by_id, outcome, capacity_km, capacity_kg, time_budget_ms):
+	plan = outcome.pickup_delivery
+	served = set(plan.delivery_order_ids)
+	served_items = [by_id[oid] for oid in outcome.selected_ids if oid in served]
+	return {
+		"mode": "pickup_delivery",
+		"selected_order_ids": plan.delivery_order_ids,
+		"stops": [
+			{
+				"type": stop.kind,
+				"order_ids": stop.order_ids,
+				"lat": stop.location[0],
+				"lng": stop.location[1],
+				"restaurant_name": stop.restaurant_name,
+				"load_kg": stop.load_kg,
+			}
+			for stop in plan.stops
+		],
+		"unserved_order_ids": plan.unserved_order_ids,
+		"total_profit": sum(i["profit"] for i in served_items),
+		"total_distance_km": sum(i["distance_km"] for i in served_items),
+		"total_weight_kg": sum(i["weight_kg"] for i in served_items),
+		"capacity_km": capacity_km,
+		"capacity_kg": capacity_kg,
+		"count": len(served_items),
+		"route_distance_km": plan.distance_km,
+		"route_improvement_km": plan.initial_km - plan.distance_km,
+		"solver": outcome.solver,
+		"optimality_gap": outcome.optimality_gap,
+		"time_budget_ms": time_budget_ms,
+	}
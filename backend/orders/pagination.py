@@ -0,0 +1,93 @@
+from rest_framework.pagination import CursorPagination
+
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith("-") else "-" + field for field in ordering)
+
+
+class OrderCursorPagination(CursorPagination):
+    # keyset pagination: each page is an indexed range scan past the cursor,
+    # so cost stays flat however many orders are open (no COUNT, no OFFSET)
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    # DRF's paginate_queryset, split around its single page query so the
+    # async views can run that query through the async ORM
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.finish_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.finish_page([obj async for obj in page_queryset.aiterator()])
+
+    def page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self._offset, self._reverse, self._current_position = 0, False, None
+        else:
+            self._offset, self._reverse, self._current_position = self.cursor
+
+        if self._reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self._current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip("-")
+            # (cursor reversed) XOR (queryset reversed)
+            lookup = "__lt" if self.cursor.reverse != order.startswith("-") else "__gt"
+            queryset = queryset.filter(**{order_attr + lookup: self._current_position})
+        # one extra row tells whether a following page exists
+        return queryset[self._offset:self._offset + self.page_size + 1]
+
+    def finish_page(self, results):
+        self.page = list(results[:self.page_size])
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        current_position = self._current_position
+        if self._reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or self._offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or self._offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_paginated_data(self, data):
+        # get_paginated_response's body, for views that render it themselves
+        return {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
+
+
+class DeliveredOrderCursorPagination(OrderCursorPagination):
+    ordering = ("-delivered_at", "-id")
@@ -1,12 +1,17 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import Order, OrderItem
-from catalog.models import Item
+from catalog.cache import expire_catalog, get_catalog
+
+# an item deleted by another process since this one last checked the catalog
+# version passes validation and only fails its foreign key on insert
+CATALOG_CHANGED = "The catalog changed while the order was placed; please retry."
 
 
 class OrderItemCreateSerializer(serializers.ModelSerializer):
-    item_id = serializers.PrimaryKeyRelatedField(
-        queryset=Item.objects.all(), write_only=True, source="item"
-    )
+    # resolved against the catalog registry by OrderSerializer.validate_items,
+    # all lines at once, instead of one PrimaryKeyRelatedField query per line
+    item_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = OrderItem
@@ -30,18 +35,62 @@ class OrderSerializer(serializers.ModelSerializer):
             "restaurant_lat",
             "restaurant_lng",
             "items",
+            "total_weight_kg",
             "created_at",
         ]
-        read_only_fields = ["status", "courier", "created_at"]
+        read_only_fields = ["status", "courier", "total_weight_kg", "created_at"]
+
+    def validate_items(self, lines):
+        found, unknown = get_catalog().resolve(line["item_id"] for line in lines)
+        if unknown:
+            raise serializers.ValidationError(
+                [f'Invalid pk "{item_id}" - object does not exist.' for item_id in unknown]
+            )
+        return [{"item": found[line["item_id"]], "quantity": line["quantity"]} for line in lines]
 
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        validated_data["total_weight_kg"] = sum(
+            d["quantity"] * (d["item"].weight_per_unit_kg or 0.0) for d in items_data
+        )
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+                # bulk insert skips the per-line signal; the weight is already set above
+                OrderItem.objects.bulk_create([OrderItem(order=order, **item_data) for item_data in items_data])
+        except IntegrityError:
+            expire_catalog()
+            raise serializers.ValidationError({"items": [CATALOG_CHANGED]})
         return order
 
 
+class OrderLineSerializer(serializers.ModelSerializer):
+    # bulk path: the view checks item ids against the catalog snapshot
+    # (catalog.cache.get_catalog().weights), no query per line
+    item_id = serializers.IntegerField()
+
+    class Meta:
+        model = OrderItem
+        fields = ["item_id", "quantity"]
+
+
+class OrderBulkSerializer(serializers.ModelSerializer):
+    items = OrderLineSerializer(many=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "customer_phone",
+            "location_lat",
+            "location_lng",
+            "delivery_price_offer",
+            "restaurant_name",
+            "restaurant_lat",
+            "restaurant_lng",
+            "items",
+        ]
+
+
 class OrderItemReadSerializer(serializers.ModelSerializer):
     item_id = serializers.IntegerField(source="item.id")
     name = serializers.CharField(source="item.name")
@@ -54,7 +103,6 @@ class OrderItemReadSerializer(serializers.ModelSerializer):
 
 class OrderDetailSerializer(serializers.ModelSerializer):
     items = OrderItemReadSerializer(many=True, read_only=True)
-    total_weight_kg = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
@@ -75,13 +123,21 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             "delivered_at",
         ]
 
-    def get_total_weight_kg(self, obj):
-        return obj.estimated_weight_kg()
 
+class SparseFieldsMixin:
+    # ?fields=id,status,... trims the representation to the listed fields;
+    # unknown names are ignored so older clients keep working
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = request.query_params.get("fields") if request is not None else None
+        if requested:
+            keep = {name.strip() for name in requested.split(",")}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
 
-class OrderListSerializer(serializers.ModelSerializer):
-    total_weight_kg = serializers.SerializerMethodField()
 
+class OrderListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
@@ -96,6 +152,3 @@ class OrderListSerializer(serializers.ModelSerializer):
             "total_weight_kg",
             "created_at",
         ]
-
-    def get_total_weight_kg(self, obj):
-        return obj.estimated_weight_kg()
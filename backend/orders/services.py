@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem
+from .signals import send_order_event
+
+ACTIVE_STATUSES = (Order.Status.ASSIGNED, Order.Status.PICKED_UP)
+
+
+class AcceptError(Exception):
+	NOT_FOUND = "not_found"
+	CONFLICT = "conflict"
+	OVER_CAPACITY = "over_capacity"
+
+	def __init__(self, code: str, detail: str):
+		super().__init__(detail)
+		self.code = code
+		self.detail = detail
+
+
+def accept_order(courier, order_id: int) -> Order:
+	"""Assign a pending order to ``courier`` or raise AcceptError.
+
+	The status flip is a single ``UPDATE ... WHERE status = 'PENDING'`` so two
+	couriers racing for the same order cannot both win; the courier row is
+	locked for the duration so concurrent accepts by one courier cannot
+	overshoot capacity_kg together.
+	"""
+	with transaction.atomic():
+		get_user_model().objects.select_for_update().filter(pk=courier.pk).values("pk").first()
+		# order weight, its pending flag and the courier's current load in one query
+		is_order = Q(pk=order_id)
+		totals = Order.objects.filter(is_order | Q(courier=courier, status__in=ACTIVE_STATUSES)).aggregate(
+			found=Count("pk", filter=is_order),
+			pending=Count("pk", filter=is_order & Q(status=Order.Status.PENDING)),
+			order_weight=Sum("total_weight_kg", filter=is_order),
+			load=Sum("total_weight_kg", filter=~is_order),
+		)
+		if not totals["found"]:
+			raise AcceptError(AcceptError.NOT_FOUND, "Commande introuvable.")
+		if not totals["pending"]:
+			raise AcceptError(AcceptError.CONFLICT, "Cette commande a déjà été acceptée par un autre livreur.")
+		order_weight = totals["order_weight"] or 0.0
+		if order_weight > courier.capacity_kg:
+			raise AcceptError(
+				AcceptError.OVER_CAPACITY, "Le poids de la commande dépasse votre capacité maximale."
+			)
+		if (totals["load"] or 0.0) + order_weight > courier.capacity_kg:
+			raise AcceptError(
+				AcceptError.OVER_CAPACITY,
+				"Accepter cette commande dépasserait votre capacité totale autorisée.",
+			)
+		claimed = Order.objects.filter(pk=order_id, status=Order.Status.PENDING).update(
+			courier=courier,
+			status=Order.Status.ASSIGNED,
+			delivered_at=None,
+			updated_at=timezone.now(),
+		)
+		if not claimed:
+			raise AcceptError(AcceptError.CONFLICT, "Cette commande a déjà été acceptée par un autre livreur.")
+	return Order.objects.get(pk=order_id)
+
+
+def bulk_create_orders(orders_data: list, weights: dict) -> list:
+	"""Insert validated orders and their lines with two bulk INSERTs.
+
+	``orders_data`` are OrderBulkSerializer payloads, ``weights`` maps every
+	referenced item id to its weight_per_unit_kg. Cells and total weight are
+	filled here since bulk_create bypasses Order.save and the OrderItem signals.
+	"""
+	rows = []
+	for data in orders_data:
+		fields = {name: value for name, value in data.items() if name != "items"}
+		lines = data["items"]
+		order = Order(
+			**fields,
+			total_weight_kg=sum(line["quantity"] * weights[line["item_id"]] for line in lines),
+		)
+		order.refresh_cells()
+		rows.append((order, lines))
+	with transaction.atomic():
+		Order.objects.bulk_create([order for order, _ in rows])
+		OrderItem.objects.bulk_create(
+			[
+				OrderItem(order=order, item_id=line["item_id"], quantity=line["quantity"])
+				for order, lines in rows
+				for line in lines
+			]
+		)
+		for order, _ in rows:
+			send_order_event("created", order)
+	return [order for order, _ in rows]
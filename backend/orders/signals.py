@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from catalog.models import Item
+
+from .models import Order, OrderItem
+
+# Sent after commit whenever an order enters or leaves the pending pool or
+# changes hands: kind is one of ORDER_EVENTS, order the saved instance.
+order_event = Signal()
+
+ORDER_EVENTS = ("created", "accepted", "cancelled", "delivered")
+
+
+def send_order_event(kind: str, order: Order) -> None:
+	# on_commit so listeners never announce a row other connections can't see yet
+	transaction.on_commit(lambda: order_event.send(sender=Order, kind=kind, order=order))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_weight(sender, instance, **kwargs):
+	Order.objects.filter(pk=instance.order_id).refresh_total_weight()
+
+
+@receiver(post_save, sender=Item)
+def refresh_weights_for_item(sender, instance, created, **kwargs):
+	# a catalog weight change affects every order carrying that item
+	if not created:
+		Order.objects.filter(
+			pk__in=OrderItem.objects.filter(item=instance).values("order_id")
+		).refresh_total_weight()
@@ -1,3 +1,666 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+import threading
+from types import ModuleType
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from catalog.cache import get_catalog
+from catalog.models import Item
+
+from logistics import executor, positions
+from logistics.cache import get_plan_cache
+from logistics.incremental import get_incremental_planner
+from logistics.executor import OptimizerExecutor
+from logistics.geo import cell_key
+
+from . import jobs
+from .async_views import AsyncCourierActiveOrdersView, AsyncOrderDetailView, AsyncPendingOrdersListView
+from .models import Order, OrderItem
+from .views import CourierActiveOrdersView, PendingOrdersListView
+
+# the async read views at their real paths, whatever ORDERS_ASYNC_READS says
+async_reads_urls = ModuleType("async_reads_urls")
+async_reads_urls.urlpatterns = [
+	path("api/orders/pending/", AsyncPendingOrdersListView.as_view()),
+	path("api/orders/courier/active/", AsyncCourierActiveOrdersView.as_view()),
+	path("api/orders/<int:pk>/", AsyncOrderDetailView.as_view()),
+]
+
+
+def make_courier(username="courier@example.com", **kwargs):
+	return User.objects.create_user(username=username, password="pass", role=User.Roles.COURIER, **kwargs)
+
+
+def make_order(lat=33.5731, lng=-7.5898, price="20.00", **kwargs):
+	kwargs.setdefault("customer_phone", "+212600000001")
+	return Order.objects.create(location_lat=lat, location_lng=lng, delivery_price_offer=Decimal(price), **kwargs)
+
+
+class OrderListQueryCountTests(TestCase):
+	def setUp(self):
+		self.courier = make_courier()
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=1.0)
+		self.pizza = Item.objects.create(name="Pizza", category=Item.Category.PREPARED, weight_per_unit_kg=0.5)
+
+	def add_orders(self, count, **kwargs):
+		for _ in range(count):
+			order = make_order(**kwargs)
+			OrderItem.objects.create(order=order, item=self.apple, quantity=2)
+			OrderItem.objects.create(order=order, item=self.pizza, quantity=1)
+
+	def assert_constant_queries(self, url, **order_kwargs):
+		self.add_orders(1, **order_kwargs)
+		with self.assertNumQueries(1):
+			small = self.client.get(url)
+		self.add_orders(25, **order_kwargs)
+		with self.assertNumQueries(1):
+			large = self.client.get(url)
+		self.assertEqual(len(small.data["results"]), 1)
+		self.assertEqual(len(large.data["results"]), 26)
+		self.assertEqual({row["total_weight_kg"] for row in large.data["results"]}, {2.5})
+
+	def test_pending_list(self):
+		self.assert_constant_queries("/api/orders/pending/")
+
+	def test_active_list(self):
+		self.assert_constant_queries("/api/orders/courier/active/", courier=self.courier, status=Order.Status.ASSIGNED)
+
+	def test_completed_list(self):
+		self.assert_constant_queries("/api/orders/courier/completed/", courier=self.courier, status=Order.Status.DELIVERED)
+
+
+class OrderListPaginationTests(TestCase):
+	def setUp(self):
+		self.courier = make_courier()
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+
+	def test_cursor_walks_every_order_once(self):
+		created = [make_order().id for _ in range(7)]
+		seen, url = [], "/api/orders/pending/?page_size=3"
+		while url:
+			with self.assertNumQueries(1):
+				response = self.client.get(url)
+			self.assertLessEqual(len(response.data["results"]), 3)
+			seen += [row["id"] for row in response.data["results"]]
+			url = response.data["next"]
+		self.assertEqual(seen, sorted(created, reverse=True))
+
+	def test_page_size_is_capped(self):
+		for _ in range(3):
+			make_order()
+		response = self.client.get("/api/orders/pending/?page_size=100000")
+		self.assertEqual(len(response.data["results"]), 3)
+		self.assertIsNone(response.data["next"])
+
+	def test_sparse_fields(self):
+		make_order()
+		response = self.client.get("/api/orders/pending/?fields=id,location_lat,location_lng,unknown")
+		self.assertEqual(set(response.data["results"][0]), {"id", "location_lat", "location_lng"})
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class OrderListIndexTests(TestCase):
+	def setUp(self):
+		self.courier = make_courier()
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+		make_order()
+		make_order(courier=self.courier, status=Order.Status.ASSIGNED)
+		make_order(courier=self.courier, status=Order.Status.DELIVERED, delivered_at=timezone.now())
+
+	def plan(self, url):
+		# EXPLAIN the list query the view actually ran
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.client.get(url).status_code, 200)
+		(sql,) = [q["sql"] for q in queries if 'FROM "orders_order"' in q["sql"]]
+		with connection.cursor() as cursor:
+			cursor.execute("EXPLAIN QUERY PLAN " + sql)
+			return " | ".join(row[-1] for row in cursor.fetchall())
+
+	def test_pending_list_uses_status_created_index(self):
+		plan = self.plan("/api/orders/pending/")
+		self.assertIn("order_status_created_idx", plan)
+		self.assertNotIn("TEMP B-TREE", plan)
+
+	def test_active_list_uses_courier_status_prefix(self):
+		# status IN (...) needs a sort either way; the index narrows the rows
+		plan = self.plan("/api/orders/courier/active/")
+		self.assertIn("order_courier_delivered_idx (courier_id=? AND status=?)", plan)
+
+	def test_completed_list_uses_courier_delivered_index(self):
+		plan = self.plan("/api/orders/courier/completed/")
+		self.assertIn("order_courier_delivered_idx", plan)
+		self.assertNotIn("TEMP B-TREE", plan)
+
+
+class TotalWeightColumnTests(TestCase):
+	def setUp(self):
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=1.0)
+		self.pizza = Item.objects.create(name="Pizza", category=Item.Category.PREPARED, weight_per_unit_kg=0.5)
+
+	def test_create_stores_weight(self):
+		response = APIClient().post(
+			"/api/orders/",
+			{
+				"customer_phone": "+212600000009",
+				"location_lat": 33.57,
+				"location_lng": -7.59,
+				"delivery_price_offer": "15.00",
+				"items": [{"item_id": self.apple.id, "quantity": 3}, {"item_id": self.pizza.id, "quantity": 1}],
+			},
+			format="json",
+		)
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(response.data["total_weight_kg"], 3.5)
+		self.assertEqual(Order.objects.get(pk=response.data["id"]).total_weight_kg, 3.5)
+
+	def test_create_queries_do_not_grow_with_basket(self):
+		extra = [Item.objects.create(name=f"Article {i}", weight_per_unit_kg=0.1) for i in range(9)]
+		get_catalog()
+		client = APIClient()
+
+		def post(items):
+			return client.post(
+				"/api/orders/",
+				{
+					"customer_phone": "+212600000009",
+					"location_lat": 33.57,
+					"location_lng": -7.59,
+					"delivery_price_offer": "15.00",
+					"items": [{"item_id": item.id, "quantity": 1} for item in items],
+				},
+				format="json",
+			)
+
+		with CaptureQueriesContext(connection) as one_line:
+			self.assertEqual(post([self.apple]).status_code, 201)
+		with CaptureQueriesContext(connection) as ten_lines:
+			self.assertEqual(post([self.apple] + extra).status_code, 201)
+		self.assertEqual(len(one_line), len(ten_lines))
+		self.assertEqual(OrderItem.objects.count(), 11)
+
+	def test_create_rejects_unknown_items(self):
+		response = APIClient().post(
+			"/api/orders/",
+			{
+				"customer_phone": "+212600000009",
+				"location_lat": 33.57,
+				"location_lng": -7.59,
+				"delivery_price_offer": "15.00",
+				"items": [{"item_id": self.apple.id, "quantity": 1}, {"item_id": 999999, "quantity": 1}],
+			},
+			format="json",
+		)
+		self.assertEqual(response.status_code, 400)
+		self.assertIn("999999", str(response.data["items"]))
+		self.assertFalse(Order.objects.exists())
+
+	def test_line_and_catalog_changes_keep_weight_current(self):
+		order = make_order()
+		line = OrderItem.objects.create(order=order, item=self.apple, quantity=2)
+		OrderItem.objects.create(order=order, item=self.pizza, quantity=2)
+		order.refresh_from_db()
+		self.assertEqual(order.total_weight_kg, 3.0)
+		line.delete()
+		order.refresh_from_db()
+		self.assertEqual(order.total_weight_kg, 1.0)
+		self.pizza.weight_per_unit_kg = 0.75
+		self.pizza.save()
+		order.refresh_from_db()
+		self.assertEqual(order.total_weight_kg, 1.5)
+
+	def test_backfill_command_repairs_and_verifies(self):
+		order = make_order()
+		OrderItem.objects.create(order=order, item=self.apple, quantity=4)
+		Order.objects.filter(pk=order.pk).update(total_weight_kg=0.0)
+		with self.assertRaises(CommandError):
+			call_command("backfill_order_weights", "--verify", stdout=StringIO())
+		call_command("backfill_order_weights", stdout=StringIO())
+		order.refresh_from_db()
+		self.assertEqual(order.total_weight_kg, 4.0)
+		call_command("backfill_order_weights", "--verify", stdout=StringIO())
+
+	def test_pending_list_filters_by_max_weight(self):
+		client = APIClient()
+		client.force_authenticate(make_courier())
+		light, heavy = make_order(), make_order()
+		OrderItem.objects.create(order=light, item=self.pizza, quantity=2)
+		OrderItem.objects.create(order=heavy, item=self.apple, quantity=8)
+		response = client.get("/api/orders/pending/?max_weight_kg=5")
+		self.assertEqual([row["id"] for row in response.data["results"]], [light.id])
+
+
+class CourierOptimizeViewTests(TestCase):
+	def setUp(self):
+		get_plan_cache().backend.clear()
+		get_incremental_planner().clear()
+		self.client = APIClient()
+		self.client.force_authenticate(make_courier())
+
+	def test_reports_solver_and_gap(self):
+		near = make_order(33.575, -7.59, price="20.00")
+		make_order(34.02, -6.84, price="90.00")  # Rabat, out of range
+		response = self.client.post(
+			"/api/orders/courier/optimize/",
+			{"courier": {"lat": 33.5731, "lng": -7.5898}, "capacity_km": 10, "time_budget_ms": 100},
+			format="json",
+		)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["selected_order_ids"], [near.id])
+		self.assertEqual(response.data["solver"], "dp")
+		self.assertEqual(response.data["optimality_gap"], 0.0)
+		self.assertGreater(response.data["route_distance_km"], 0)
+		self.assertEqual(response.data["route_improvement_km"], 0)
+
+	def test_unknown_solver_is_a_bad_request(self):
+		body = {"courier": {"lat": 33.5731, "lng": -7.5898}, "solver": "simplex"}
+		pool = mock.Mock(spec=OptimizerExecutor)
+		with mock.patch.object(executor, "_executor", pool):
+			response = self.client.post("/api/orders/courier/optimize/", body, format="json")
+			self.assertEqual(response.status_code, 400)
+			self.assertIn("simplex", response.data["detail"])
+			job = self.client.post("/api/orders/courier/optimize/jobs/", body, format="json")
+			self.assertEqual(job.status_code, 400)
+		pool.submit.assert_not_called()
+
+	def test_bad_courier_position_is_not_recorded(self):
+		courier = make_courier("pinger@example.com")
+		self.client.force_authenticate(courier)
+		for lat, lng in (("nan", -7.59), (33.57, "inf"), (91, -7.59), ("north", -7.59)):
+			response = self.client.post(
+				"/api/orders/courier/optimize/", {"courier": {"lat": lat, "lng": lng}}, format="json"
+			)
+			self.assertEqual(response.status_code, 400, (lat, lng))
+		self.assertIsNone(positions.store.get(courier.id))
+
+	def test_capacity_and_budget_are_bounded(self):
+		for field, value in (
+			("capacity_km", 0), ("capacity_km", -3), ("capacity_km", 1e6), ("capacity_km", "nan"),
+			("time_budget_ms", "inf"), ("time_budget_ms", 600000), ("time_budget_ms", "soon"),
+		):
+			response = self.client.post(
+				"/api/orders/courier/optimize/", {"courier": {"lat": 33.5731, "lng": -7.5898}, field: value}, format="json"
+			)
+			self.assertEqual(response.status_code, 400, (field, value))
+			self.assertIn(field, response.data["detail"])
+
+	def test_saturated_optimizer_degrades_or_rejects(self):
+		near = make_order(33.575, -7.59, price="20.00")
+		body = {"courier": {"lat": 33.5731, "lng": -7.5898}, "capacity_km": 10}
+		busy = OptimizerExecutor(workers=1, max_queue=0)
+		busy.in_flight = 1
+		with mock.patch.object(executor, "_executor", busy):
+			response = self.client.post("/api/orders/courier/optimize/", body, format="json")
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.data["degraded"], "saturated")
+			self.assertEqual(response.data["selected_order_ids"], [near.id])
+			busy.on_saturated = "reject"
+			# the degraded plan was not cached
+			response = self.client.post("/api/orders/courier/optimize/", body, format="json")
+		self.assertEqual(response.status_code, 503)
+		self.assertEqual(response["Retry-After"], "1")
+
+	def test_pickup_delivery_mode_batches_a_restaurant(self):
+		pizza = Item.objects.create(name="Pizza", category=Item.Category.PREPARED, weight_per_unit_kg=0.5)
+		orders = []
+		for lat in (33.575, 33.57, 33.565):
+			order = make_order(lat, -7.59, restaurant_name="Chez Ali", restaurant_lat=33.574, restaurant_lng=-7.588)
+			OrderItem.objects.create(order=order, item=pizza, quantity=2)
+			orders.append(order)
+		response = self.client.post(
+			"/api/orders/courier/optimize/",
+			{"courier": {"lat": 33.5731, "lng": -7.5898}, "capacity_km": 10, "mode": "pickup_delivery"},
+			format="json",
+		)
+		self.assertEqual(response.status_code, 200)
+		stops = response.data["stops"]
+		self.assertEqual(stops[0]["type"], "pickup")
+		self.assertEqual(sorted(stops[0]["order_ids"]), sorted(o.id for o in orders))
+		self.assertEqual(stops[0]["load_kg"], 3.0)
+		self.assertEqual([s["type"] for s in stops[1:]], ["dropoff"] * 3)
+		self.assertEqual(response.data["total_weight_kg"], 3.0)
+
+
+class OptimizeJobTests(TestCase):
+	body = {"courier": {"lat": 33.5731, "lng": -7.5898}, "capacity_km": 10}
+
+	def setUp(self):
+		get_plan_cache().backend.clear()
+		get_incremental_planner().clear()
+		self.courier = make_courier()
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+
+	def test_job_is_accepted_then_polled(self):
+		near = make_order(33.575, -7.59)
+		with mock.patch.object(jobs, "_job_store", jobs.OptimizeJobStore(threads=0)):
+			response = self.client.post("/api/orders/courier/optimize/jobs/", self.body, format="json")
+			self.assertEqual(response.status_code, 202)
+			self.assertFalse(response.data["deduplicated"])
+			self.assertEqual(response["Location"], response.data["url"])
+			polled = self.client.get(response.data["url"])
+			self.assertEqual(polled.status_code, 200)
+			self.assertEqual(polled.data["status"], "done")
+			self.assertEqual(polled.data["result"]["selected_order_ids"], [near.id])
+			self.assertFalse(polled.data["result"]["cached"])
+			# the plan landed in the shared cache
+			again = self.client.post("/api/orders/courier/optimize/", self.body, format="json")
+			self.assertTrue(again.data["cached"])
+
+			other = APIClient()
+			other.force_authenticate(make_courier("other@example.com"))
+			self.assertEqual(other.get(response.data["url"]).status_code, 404)
+		self.assertEqual(self.client.get("/api/orders/courier/optimize/jobs/unknown/").status_code, 404)
+
+	def test_identical_requests_share_one_job(self):
+		release = threading.Event()
+		runs = []
+
+		def slow_plan(params):
+			runs.append(params)
+			release.wait(5)
+			return {"selected_order_ids": []}
+
+		store = jobs.OptimizeJobStore(threads=1)
+		other = make_courier("other@example.com")
+		params = jobs.OptimizeParams((33.5731, -7.5898), 10.0, 0.0, 100.0, None, "dropoff")
+		finished = []
+		jobs.optimize_job_finished.connect(lambda sender, job, **kw: finished.append(job), weak=False, dispatch_uid="test-jobs")
+		self.addCleanup(jobs.optimize_job_finished.disconnect, dispatch_uid="test-jobs")
+		with mock.patch.object(jobs, "build_plan", slow_plan):
+			first, joined_first = store.submit(self.courier.id, params)
+			second, joined_second = store.submit(other.id, params)
+			release.set()
+			store._pool.shutdown(wait=True)
+		self.assertEqual((joined_first, joined_second), (False, True))
+		self.assertIs(first, second)
+		self.assertEqual(len(runs), 1)
+		self.assertEqual(first.status, "done")
+		self.assertEqual(finished, [first])
+		self.assertEqual(first.courier_ids, {self.courier.id, other.id})
+
+	def test_full_queue_is_a_503(self):
+		store = jobs.OptimizeJobStore(threads=0, max_pending=0)
+		with mock.patch.object(jobs, "_job_store", store):
+			response = self.client.post("/api/orders/courier/optimize/jobs/", self.body, format="json")
+		self.assertEqual(response.status_code, 503)
+
+
+class AcceptOrderTests(TestCase):
+	def setUp(self):
+		self.courier = make_courier(capacity_kg=5)
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+		self.order = make_order(total_weight_kg=2.0)
+
+	def accept(self, order):
+		return self.client.post(f"/api/orders/{order.id}/accept/")
+
+	def test_accept_uses_constant_queries(self):
+		with self.assertNumQueries(6):  # savepoint, lock, aggregate, update, release, reload
+			response = self.accept(self.order)
+		self.assertEqual(response.status_code, 200)
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.courier_id, self.courier.id)
+		self.assertEqual(self.order.status, Order.Status.ASSIGNED)
+
+	def test_already_taken_is_a_conflict(self):
+		Order.objects.filter(pk=self.order.pk).update(courier=make_courier("other@example.com"), status=Order.Status.ASSIGNED)
+		response = self.accept(self.order)
+		self.assertEqual(response.status_code, 409)
+		self.assertEqual(response.data["code"], "conflict")
+
+	def test_missing_order(self):
+		self.assertEqual(self.client.post("/api/orders/999999/accept/").status_code, 404)
+
+	def test_capacity_counts_active_orders(self):
+		make_order(total_weight_kg=4.0, courier=self.courier, status=Order.Status.PICKED_UP)
+		make_order(total_weight_kg=4.0, courier=self.courier, status=Order.Status.DELIVERED)
+		response = self.accept(self.order)
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.data["code"], "over_capacity")
+		self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.Status.PENDING)
+
+
+class AcceptOrderRaceTests(TransactionTestCase):
+	def test_many_couriers_one_winner(self):
+		order = make_order(total_weight_kg=1.0)
+		couriers = [User.objects.create(username=f"c{i}@example.com", role=User.Roles.COURIER) for i in range(12)]
+		barrier = threading.Barrier(len(couriers))
+		codes = []
+
+		def hammer(courier):
+			client = APIClient()
+			client.force_authenticate(courier)
+			barrier.wait()
+			try:
+				codes.append(client.post(f"/api/orders/{order.id}/accept/").status_code)
+			finally:
+				close_old_connections()
+
+		threads = [threading.Thread(target=hammer, args=(c,)) for c in couriers]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		self.assertEqual(codes.count(200), 1)
+		self.assertEqual(codes.count(409), len(couriers) - 1)
+		order.refresh_from_db()
+		self.assertIn(order.courier_id, {c.id for c in couriers})
+
+
+class OptimizeCacheTests(TestCase):
+	body = {"courier": {"lat": 33.5731, "lng": -7.5898}, "capacity_km": 10}
+
+	def setUp(self):
+		get_plan_cache().backend.clear()
+		get_incremental_planner().clear()
+		self.courier = make_courier()
+		self.client = APIClient()
+		self.client.force_authenticate(self.courier)
+		self.first = make_order(33.575, -7.59, price="30.00")
+		self.second = make_order(33.576, -7.591, price="20.00")
+
+	def optimize(self, **extra):
+		return self.client.post("/api/orders/courier/optimize/", {**self.body, **extra}, format="json")
+
+	def test_repeat_request_nearby_is_served_from_cache(self):
+		first = self.optimize()
+		self.assertFalse(first.data["cached"])
+		# a few metres away snaps to the same cell
+		second = self.optimize(courier={"lat": 33.5732, "lng": -7.5897})
+		self.assertTrue(second.data["cached"])
+		self.assertEqual(second.data["selected_order_ids"], first.data["selected_order_ids"])
+		self.assertFalse(self.optimize(capacity_km=8).data["cached"])
+
+	def test_accepting_an_order_invalidates_plans(self):
+		self.assertEqual(len(self.optimize().data["selected_order_ids"]), 2)
+		other = APIClient()
+		other.force_authenticate(make_courier("other@example.com"))
+		with self.captureOnCommitCallbacks(execute=True):
+			other.post(f"/api/orders/{self.first.id}/accept/")
+		response = self.optimize()
+		self.assertFalse(response.data["cached"])
+		self.assertEqual(response.data["selected_order_ids"], [self.second.id])
+
+	def test_new_order_patches_the_previous_plan(self):
+		nearby = [make_order(33.574 + i * 0.0005, -7.59) for i in range(6)]
+		self.assertEqual(self.optimize().data["solver"], "dp")
+		with self.captureOnCommitCallbacks(execute=True):
+			created = self.client.post(
+				"/api/orders/",
+				{"customer_phone": "+212600000003", "location_lat": 33.574, "location_lng": -7.5895,
+					"delivery_price_offer": "15.00", "items": []},
+				format="json",
+			)
+		response = self.optimize()
+		self.assertFalse(response.data["cached"])
+		self.assertEqual(response.data["solver"], "incremental")
+		expected = [self.first.id, self.second.id, created.data["id"]] + [o.id for o in nearby]
+		self.assertEqual(sorted(response.data["selected_order_ids"]), sorted(expected))
+		self.assertEqual(response.data["metrics"]["dp_table_cells"], 0)
+
+	def test_plan_with_a_taken_order_is_never_served(self):
+		self.optimize()
+		# status change that bypasses the order events (no version bump)
+		Order.objects.filter(pk=self.first.pk).update(status=Order.Status.ASSIGNED)
+		hits = get_plan_cache().hits
+		response = self.optimize()
+		self.assertFalse(response.data["cached"])
+		self.assertEqual(response.data["selected_order_ids"], [self.second.id])
+		self.assertEqual(get_plan_cache().hits, hits)
+
+
+class OrderBulkCreateTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.client.force_authenticate(make_courier("partner@example.com"))
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=1.0)
+		self.pizza = Item.objects.create(name="Pizza", category=Item.Category.PREPARED, weight_per_unit_kg=0.5)
+
+	def order(self, i, items=None, **extra):
+		return {
+			"customer_phone": f"+2126{i:08d}",
+			"location_lat": 33.57,
+			"location_lng": -7.59,
+			"delivery_price_offer": "15.00",
+			"items": items if items is not None else [{"item_id": self.apple.id, "quantity": 2}, {"item_id": self.pizza.id, "quantity": 1}],
+			**extra,
+		}
+
+	def post(self, orders):
+		return self.client.post("/api/orders/bulk/", orders, format="json")
+
+	def test_query_count_does_not_grow_with_batch(self):
+		get_catalog()  # item ids then come from the cached snapshot
+		# savepoint, order insert, line insert, release
+		with self.assertNumQueries(4):
+			small = self.post([self.order(i) for i in range(2)])
+		with self.assertNumQueries(4):
+			large = self.post([self.order(i) for i in range(40)])
+		self.assertEqual(small.status_code, 201)
+		self.assertEqual(large.data["created"], 40)
+		order = Order.objects.get(pk=large.data["results"][0]["id"])
+		self.assertEqual(order.total_weight_kg, 2.5)
+		self.assertEqual(order.location_cell, cell_key(33.57, -7.59))
+		self.assertEqual(order.items.count(), 2)
+
+	def test_partial_failure_reports_each_order(self):
+		response = self.post({
+			"orders": [
+				self.order(0),
+				self.order(1, items=[{"item_id": 999999, "quantity": 1}]),
+				self.order(2, location_lat="north"),
+			]
+		})
+		self.assertEqual(response.status_code, 207)
+		self.assertEqual(response.data["created"], 1)
+		first, unknown, invalid = response.data["results"]
+		self.assertTrue(Order.objects.filter(pk=first["id"]).exists())
+		self.assertIn("items", unknown["errors"])
+		self.assertIn("location_lat", invalid["errors"])
+		self.assertEqual(Order.objects.count(), 1)
+
+	def test_rejects_empty_and_oversized_batches(self):
+		self.assertEqual(self.post([]).status_code, 400)
+		self.assertEqual(self.post([self.order(i) for i in range(501)]).status_code, 400)
+		self.assertEqual(APIClient().post("/api/orders/bulk/", [self.order(0)], format="json").status_code, 401)
+
+
+class CatalogRaceTests(TransactionTestCase):
+	# the foreign key is only checked when the insert commits
+	def setUp(self):
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=1.0)
+		self.gone = Item.objects.create(name="Pizza", category=Item.Category.PREPARED, weight_per_unit_kg=0.5)
+		get_catalog()
+		# deleted by another process: no signal here, and the snapshot is still trusted
+		with connection.cursor() as cursor:
+			cursor.execute("DELETE FROM catalog_item WHERE id = %s", [self.gone.id])
+
+	def order(self):
+		return {
+			"customer_phone": "+212600000009",
+			"location_lat": 33.57,
+			"location_lng": -7.59,
+			"delivery_price_offer": "15.00",
+			"items": [{"item_id": self.apple.id, "quantity": 1}, {"item_id": self.gone.id, "quantity": 1}],
+		}
+
+	def test_item_deleted_since_snapshot_is_a_bad_request(self):
+		response = APIClient().post("/api/orders/", self.order(), format="json")
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(Order.objects.exists())
+		# the snapshot was expired: the retry is told which item is unknown
+		response = APIClient().post("/api/orders/", self.order(), format="json")
+		self.assertIn(str(self.gone.id), str(response.data["items"]))
+
+	def test_bulk_item_deleted_since_snapshot_is_a_bad_request(self):
+		client = APIClient()
+		client.force_authenticate(make_courier("partner@example.com"))
+		response = client.post("/api/orders/bulk/", [self.order()], format="json")
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(Order.objects.exists())
+
+
+@override_settings(ROOT_URLCONF=async_reads_urls)
+class AsyncReadViewTests(TestCase):
+	def setUp(self):
+		self.courier = make_courier()
+		self.token = str(AccessToken.for_user(self.courier))
+		self.apple = Item.objects.create(name="Pomme", category=Item.Category.FRUIT, weight_per_unit_kg=1.0)
+		self.pending = [make_order(price="12.50") for _ in range(3)]
+		self.active = make_order(courier=self.courier, status=Order.Status.ASSIGNED)
+		OrderItem.objects.create(order=self.active, item=self.apple, quantity=2)
+
+	def auth(self, token=None):
+		return {"Authorization": f"Bearer {token or self.token}"}
+
+	async def test_matches_the_drf_views(self):
+		factory = APIRequestFactory()
+		for url, sync_view in (
+			("/api/orders/pending/?page_size=2", PendingOrdersListView),
+			("/api/orders/courier/active/", CourierActiveOrdersView),
+		):
+			response = await self.async_client.get(url, headers=self.auth())
+			request = factory.get(url)
+			force_authenticate(request, self.courier)
+			expected = await sync_to_async(lambda: sync_view.as_view()(request).render())()
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.content, expected.content)
+
+	async def test_detail(self):
+		response = await self.async_client.get(f"/api/orders/{self.active.id}/", headers=self.auth())
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json()["items"][0]["name"], "Pomme")
+		missing = await self.async_client.get("/api/orders/999999/", headers=self.auth())
+		self.assertEqual((missing.status_code, missing.json()), (404, {"detail": "No Order matches the given query."}))
+
+	async def test_authentication_errors(self):
+		anonymous = await self.async_client.get("/api/orders/pending/")
+		self.assertEqual(anonymous.status_code, 401)
+		self.assertEqual(anonymous["WWW-Authenticate"], 'Bearer realm="api"')
+		garbage = await self.async_client.get("/api/orders/pending/", headers=self.auth("not-a-jwt"))
+		self.assertEqual((garbage.status_code, garbage.json()["code"]), (401, "token_not_valid"))
+		customer = await sync_to_async(User.objects.create)(username="client@example.com")
+		response = await self.async_client.get(
+			"/api/orders/pending/", headers=self.auth(str(AccessToken.for_user(customer)))
+		)
+		self.assertEqual(response.json()["results"], [])
+
+	async def test_invalid_filter(self):
+		response = await self.async_client.get("/api/orders/pending/?max_weight_kg=heavy", headers=self.auth())
+		self.assertEqual((response.status_code, response.json()), (400, {"max_weight_kg": "Must be a number."}))
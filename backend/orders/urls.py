@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.urls import path
+
+from .async_views import AsyncCourierActiveOrdersView, AsyncOrderDetailView, AsyncPendingOrdersListView
 from .views import (
     AcceptOrderView,
     CourierActiveOrdersView,
@@ -7,18 +10,32 @@ from .views import (
     CourierDeleteCompletedByDateView,
     CourierDeleteCompletedOneView,
     CourierCancelOrderView,
+    CourierOptimizeJobDetailView,
+    CourierOptimizeJobView,
     CourierOptimizeView,
+    OrderBulkCreateView,
     OrderCreateView,
     OrderDetailView,
     PendingOrdersListView,
     UpdateOrderStatusView,
 )
 
+# courier polling endpoints: async views under ASGI, the DRF ones otherwise
+if settings.ORDERS_ASYNC_READS:
+    pending_view = AsyncPendingOrdersListView.as_view()
+    active_view = AsyncCourierActiveOrdersView.as_view()
+    detail_view = AsyncOrderDetailView.as_view()
+else:
+    pending_view = PendingOrdersListView.as_view()
+    active_view = CourierActiveOrdersView.as_view()
+    detail_view = OrderDetailView.as_view()
+
 urlpatterns = [
     path("", OrderCreateView.as_view(), name="order-create"),
-    path("<int:pk>/", OrderDetailView.as_view(), name="order-detail"),
-    path("pending/", PendingOrdersListView.as_view(), name="orders-pending"),
-    path("courier/active/", CourierActiveOrdersView.as_view(), name="orders-active"),
+    path("bulk/", OrderBulkCreateView.as_view(), name="order-bulk-create"),
+    path("<int:pk>/", detail_view, name="order-detail"),
+    path("pending/", pending_view, name="orders-pending"),
+    path("courier/active/", active_view, name="orders-active"),
     path("courier/completed/", CourierCompletedOrdersView.as_view(), name="orders-completed"),
     path("courier/completed/delete/all/", CourierDeleteCompletedAllView.as_view(), name="orders-completed-delete-all"),
     path("courier/completed/delete/<int:pk>/", CourierDeleteCompletedOneView.as_view(), name="orders-completed-delete-one"),
@@ -27,4 +44,6 @@ urlpatterns = [
     path("<int:pk>/cancel/", CourierCancelOrderView.as_view(), name="order-cancel"),
     path("<int:pk>/status/", UpdateOrderStatusView.as_view(), name="order-status"),
     path("courier/optimize/", CourierOptimizeView.as_view(), name="courier-optimize"),
+    path("courier/optimize/jobs/", CourierOptimizeJobView.as_view(), name="courier-optimize-jobs"),
+    path("courier/optimize/jobs/<str:job_id>/", CourierOptimizeJobDetailView.as_view(), name="courier-optimize-job"),
 ]
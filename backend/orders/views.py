@@ -1,13 +1,24 @@
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from datetime import datetime
 
+from catalog.cache import expire_catalog, get_catalog
+
+from .jobs import JobQueueFull, get_job_store
 from .models import Order
-from .serializers import OrderListSerializer, OrderSerializer, OrderDetailSerializer
-from logistics.optimizer import order_distance_km, knapsack_max_profit, nearest_neighbor_route
+from .optimize import build_plan, cached_plan, incremental_plan, optimize_params
+from .pagination import DeliveredOrderCursorPagination, OrderCursorPagination
+from .serializers import CATALOG_CHANGED, OrderBulkSerializer, OrderListSerializer, OrderSerializer, OrderDetailSerializer
+from .services import AcceptError, accept_order, bulk_create_orders
+from .signals import send_order_event
+from logistics.cache import get_plan_cache
+from logistics.executor import OptimizerBusy
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -32,47 +43,118 @@ class OrderCreateView(generics.CreateAPIView):
 		headers = self.get_success_headers(serializer.data)
 		return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+	def perform_create(self, serializer):
+		order = serializer.save()
+		send_order_event("created", order)
+
+
+class OrderBulkCreateView(APIView):
+	# partner integrations: many orders per request, two INSERTs per batch
+	permission_classes = [permissions.IsAuthenticated]
+	max_orders = 500
+
+	def post(self, request):
+		payload = request.data
+		if isinstance(payload, dict):
+			payload = payload.get("orders")
+		if not isinstance(payload, list) or not payload:
+			return Response({"detail": "Expected a non-empty list of orders."}, status=status.HTTP_400_BAD_REQUEST)
+		if len(payload) > self.max_orders:
+			return Response(
+				{"detail": f"At most {self.max_orders} orders per request."}, status=status.HTTP_400_BAD_REQUEST
+			)
+		results = [None] * len(payload)
+		valid = []
+		# one serializer instance for the batch: its fields are built once
+		serializer = OrderBulkSerializer()
+		for index, raw in enumerate(payload):
+			try:
+				valid.append((index, serializer.run_validation(raw)))
+			except ValidationError as exc:
+				results[index] = {"index": index, "errors": exc.detail}
+		# item ids checked against the cached catalog: no Item query at all
+		weights = get_catalog().weights
+		ready = []
+		for index, data in valid:
+			unknown = sorted({line["item_id"] for line in data["items"]} - weights.keys())
+			if unknown:
+				results[index] = {"index": index, "errors": {"items": [f"Unknown item_id {i}." for i in unknown]}}
+			else:
+				ready.append((index, data))
+		try:
+			created = bulk_create_orders([data for _, data in ready], weights) if ready else []
+		except IntegrityError:
+			expire_catalog()
+			return Response({"detail": CATALOG_CHANGED}, status=status.HTTP_400_BAD_REQUEST)
+		for (index, _), order in zip(ready, created):
+			results[index] = {"index": index, "id": order.id, "total_weight_kg": order.total_weight_kg}
+		if len(created) == len(payload):
+			code = status.HTTP_201_CREATED
+		elif created:
+			code = status.HTTP_207_MULTI_STATUS
+		else:
+			code = status.HTTP_400_BAD_REQUEST
+		return Response(
+			{"created": len(created), "failed": len(payload) - len(created), "results": results}, status=code
+		)
+
+
+def is_courier(user) -> bool:
+	return getattr(user, "role", None) == "COURIER"
+
+
+def pending_orders(request):
+	# shared by the sync and async pending lists
+	if not is_courier(request.user):
+		return Order.objects.none()
+	qs = Order.objects.filter(status=Order.Status.PENDING)
+	# ?max_weight_kg= keeps only orders the courier can carry (indexed column)
+	max_weight = request.query_params.get("max_weight_kg")
+	if max_weight:
+		try:
+			qs = qs.filter(total_weight_kg__lte=float(max_weight))
+		except ValueError:
+			raise ValidationError({"max_weight_kg": "Must be a number."})
+	return qs
+
+
+def active_orders(request):
+	if not is_courier(request.user):
+		return Order.objects.none()
+	return Order.objects.filter(
+		courier=request.user,
+		status__in=[Order.Status.ASSIGNED, Order.Status.PICKED_UP],
+	)
+
 
 class PendingOrdersListView(generics.ListAPIView):
 	serializer_class = OrderListSerializer
+	pagination_class = OrderCursorPagination
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get_queryset(self):
-		user = self.request.user
-		if not hasattr(user, "role") or user.role != "COURIER":
-			return Order.objects.none()
-		return Order.objects.filter(status=Order.Status.PENDING).order_by("-created_at")
+		return pending_orders(self.request)
 
 
 class CourierActiveOrdersView(generics.ListAPIView):
 	serializer_class = OrderListSerializer
+	pagination_class = OrderCursorPagination
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get_queryset(self):
-		user = self.request.user
-		if not hasattr(user, "role") or user.role != "COURIER":
-			return Order.objects.none()
-		return (
-			Order.objects.filter(
-				courier=user,
-				status__in=[Order.Status.ASSIGNED, Order.Status.PICKED_UP],
-			)
-			.order_by("-created_at")
-		)
+		return active_orders(self.request)
 
 
 class CourierCompletedOrdersView(generics.ListAPIView):
 	serializer_class = OrderListSerializer
+	pagination_class = DeliveredOrderCursorPagination
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get_queryset(self):
 		user = self.request.user
 		if not hasattr(user, "role") or user.role != "COURIER":
 			return Order.objects.none()
-		return (
-			Order.objects.filter(courier=user, status=Order.Status.DELIVERED)
-			.order_by("-delivered_at", "-created_at")
-		)
+		return Order.objects.filter(courier=user, status=Order.Status.DELIVERED)
 
 
 class CourierDeleteCompletedAllView(APIView):
@@ -131,38 +213,21 @@ class CourierDeleteCompletedByDateView(APIView):
 
 class AcceptOrderView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
+	error_statuses = {
+		AcceptError.NOT_FOUND: status.HTTP_404_NOT_FOUND,
+		AcceptError.CONFLICT: status.HTTP_409_CONFLICT,
+		AcceptError.OVER_CAPACITY: status.HTTP_400_BAD_REQUEST,
+	}
 
 	def post(self, request, pk: int):
 		user = request.user
-		order = get_object_or_404(Order, pk=pk)
-		if order.status != Order.Status.PENDING:
-			return Response({"detail": "Order not pending."}, status=status.HTTP_400_BAD_REQUEST)
 		if not hasattr(user, "role") or user.role != "COURIER":
 			return Response({"detail": "Only couriers can accept orders."}, status=status.HTTP_403_FORBIDDEN)
-		order_weight = order.estimated_weight_kg()
-		if order_weight > user.capacity_kg:
-			return Response(
-				{"detail": "Le poids de la commande dépasse votre capacité maximale."},
-				status=status.HTTP_400_BAD_REQUEST,
-			)
-		active_orders = Order.objects.filter(
-			courier=user,
-			status__in=[Order.Status.ASSIGNED, Order.Status.PICKED_UP],
-		)
-		current_weight = sum(o.estimated_weight_kg() for o in active_orders)
-		if current_weight + order_weight > user.capacity_kg:
-			return Response(
-				{
-					"detail": (
-						"Accepter cette commande dépasserait votre capacité totale autorisée."
-					)
-				},
-				status=status.HTTP_400_BAD_REQUEST,
-			)
-		order.courier = user
-		order.status = Order.Status.ASSIGNED
-		order.delivered_at = None
-		order.save(update_fields=["courier", "status", "delivered_at"])
+		try:
+			order = accept_order(user, pk)
+		except AcceptError as exc:
+			return Response({"detail": exc.detail, "code": exc.code}, status=self.error_statuses[exc.code])
+		send_order_event("accepted", order)
 		return Response(OrderListSerializer(order).data)
 
 
@@ -186,6 +251,8 @@ class UpdateOrderStatusView(APIView):
 		else:
 			order.delivered_at = None
 		order.save(update_fields=["status", "delivered_at"])
+		if status_value == Order.Status.DELIVERED:
+			send_order_event("delivered", order)
 		return Response(OrderListSerializer(order).data)
 
 
@@ -205,11 +272,12 @@ class CourierCancelOrderView(APIView):
 		order.status = Order.Status.PENDING
 		order.delivered_at = None
 		order.save(update_fields=["courier", "status", "delivered_at"])
+		send_order_event("cancelled", order)
 		return Response(OrderListSerializer(order).data)
 
 
 class OrderDetailView(generics.RetrieveAPIView):
-		queryset = Order.objects.all()
+		queryset = Order.objects.prefetch_related("items__item")
 		serializer_class = OrderDetailSerializer
 		permission_classes = [permissions.IsAuthenticated]
 
@@ -219,43 +287,61 @@ class CourierOptimizeView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
 
 	def post(self, request, *args, **kwargs):
-		# Expect body: { "courier": {"lat": float, "lng": float}, "capacity_km": float }
-		# Uses current user's pending orders as candidates
-		data = request.data or {}
-		courier_lat = data.get("courier", {}).get("lat")
-		courier_lng = data.get("courier", {}).get("lng")
-		capacity_km = float(data.get("capacity_km", 10.0))
-		if courier_lat is None or courier_lng is None:
-			return Response({"detail": "courier.lat and courier.lng are required"}, status=status.HTTP_400_BAD_REQUEST)
-
-		courier_pos = (float(courier_lat), float(courier_lng))
-
-		# Candidate orders: pending and nearby/available; here we use all pending
-		candidates = Order.objects.filter(status=Order.Status.PENDING)
-		items = []
-		points = []
-		for o in candidates:
-			customer = (o.location_lat, o.location_lng)
-			restaurant = (o.restaurant_lat, o.restaurant_lng) if o.restaurant_lat is not None and o.restaurant_lng is not None else None
-			dist_km = order_distance_km(courier_pos, customer, restaurant)
-			profit = float(o.delivery_price_offer)
-			items.append({"id": o.id, "profit": profit, "distance_km": dist_km, "customer": customer})
-			points.append(customer)
-
-		selected = knapsack_max_profit(items, capacity_km)
-		# Build route via nearest neighbor from courier to customers of selected orders
-		selected_points = [item["customer"] for item in selected]
-		route_order_indices = nearest_neighbor_route(courier_pos, selected_points) if selected_points else []
-		ordered_ids = [selected[idx]["id"] for idx in route_order_indices] if route_order_indices else [i["id"] for i in selected]
-
-		total_profit = sum(i["profit"] for i in selected)
-		total_distance = sum(i["distance_km"] for i in selected)
-
-		return Response({
-			"selected_order_ids": ordered_ids,
-			"total_profit": total_profit,
-			"total_distance_km": total_distance,
-			"capacity_km": capacity_km,
-			"count": len(selected),
-		})
+		# body: see orders.optimize.optimize_params; candidates are the pending orders
+		params = optimize_params(request)
+		cache = get_plan_cache()
+		cache_key = params.cache_key(cache)
+		cached = cached_plan(cache, cache_key)
+		if cached is not None:
+			return Response({**cached, "cached": True})
+		try:
+			# patch the courier's previous plan when few orders changed since
+			payload = incremental_plan(params, request.user.id) or build_plan(params, courier_id=request.user.id)
+		except ValueError as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		except OptimizerBusy:
+			return optimizer_busy_response()
+		if not payload.get("degraded"):
+			# a fallback plan is only for this caller; the next one may get the real one
+			cache.set(cache_key, payload)
+		return Response({**payload, "cached": False})
+
+
+def optimizer_busy_response():
+	return Response(
+		{"detail": "Optimizer saturated, retry shortly."},
+		status=status.HTTP_503_SERVICE_UNAVAILABLE,
+		headers={"Retry-After": "1"},
+	)
+
+
+class CourierOptimizeJobView(APIView):
+	"""Same body as CourierOptimizeView, answered with 202 and a job id; the
+	plan is then read from CourierOptimizeJobDetailView or pushed to the
+	courier's socket as {"type": "optimize.result", "job": {...}}."""
+
+	permission_classes = [permissions.IsAuthenticated]
+
+	def post(self, request, *args, **kwargs):
+		params = optimize_params(request)
+		try:
+			job, joined = get_job_store().submit(request.user.id, params)
+		except JobQueueFull:
+			return optimizer_busy_response()
+		url = reverse("courier-optimize-job", kwargs={"job_id": job.id}, request=request)
+		return Response(
+			{**job.as_dict(), "deduplicated": joined, "url": url},
+			status=status.HTTP_202_ACCEPTED,
+			headers={"Location": url},
+		)
+
+
+class CourierOptimizeJobDetailView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
 
+	def get(self, request, job_id, *args, **kwargs):
+		job = get_job_store().get(job_id)
+		# jobs are only visible to the couriers who asked for them
+		if job is None or request.user.id not in job.courier_ids:
+			return Response({"detail": "Job not found or expired."}, status=status.HTTP_404_NOT_FOUND)
+		return Response(job.as_dict())
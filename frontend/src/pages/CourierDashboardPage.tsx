@@ -1,5 +1,5 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { useEffect, useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import {
   Alert,
   Avatar,
@@ -46,6 +46,12 @@ interface Order {
   location_lng: number
 }
 
+interface Page<T> {
+  next: string | null
+  previous: string | null
+  results: T[]
+}
+
 interface OrderItemDetail {
   item_id: number
   name: string
@@ -58,6 +64,14 @@ interface OrderDetail extends Order {
 }
 
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000/api'
+const WS_BASE = import.meta.env.VITE_WS_BASE || API_BASE.replace(/^http/, 'ws').replace(/\/api\/?$/, '')
+
+interface OrderEvent {
+  type: 'snapshot' | 'watching' | 'error' | 'order.created' | 'order.accepted' | 'order.cancelled' | 'order.delivered'
+  order?: Order
+  pending?: Order[]
+  active?: Order[]
+}
 
 interface Props {
   token: string | null
@@ -82,6 +96,13 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
   const [optCapacityKm, setOptCapacityKm] = useState<number>(10)
   const [optSuggested, setOptSuggested] = useState<number[] | null>(null)
   const [details, setDetails] = useState<Record<number, OrderDetail | null>>({})
+  const [liveConnected, setLiveConnected] = useState(false)
+  // pending list pages loaded so far; refetches reload that many, following `next`
+  const [pendingPages, setPendingPages] = useState(1)
+  const [pendingNext, setPendingNext] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const socketRef = useRef<WebSocket | null>(null)
+  const myPosRef = useRef<{ lat: number; lng: number } | null>(null)
 
   const toggleExpanded = (id: number) => {
     setExpanded((prev) => {
@@ -110,13 +131,19 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
       if (!token) {
         return []
       }
-      const response = await axios.get(`${API_BASE}/orders/pending/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      })
-      return response.data
+      const headers = { Authorization: `Bearer ${token}` }
+      let response = await axios.get<Page<Order>>(`${API_BASE}/orders/pending/`, { headers })
+      const results = [...response.data.results]
+      for (let page = 1; page < pendingPages && response.data.next; page++) {
+        response = await axios.get<Page<Order>>(response.data.next, { headers })
+        results.push(...response.data.results)
+      }
+      setPendingNext(response.data.next)
+      return results
     },
     enabled: !!token && availability && user?.role === 'COURIER',
-    refetchInterval: 8000,
+    // the socket pushes changes; polling is only a fallback while it is down
+    refetchInterval: liveConnected ? 60000 : 8000,
   })
 
   const { data: activeOrders, isFetching: isFetchingActive } = useQuery<Order[]>({
@@ -125,15 +152,75 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
       if (!token) {
         return []
       }
-      const response = await axios.get(`${API_BASE}/orders/courier/active/`, {
+      const response = await axios.get<Page<Order>>(`${API_BASE}/orders/courier/active/`, {
         headers: { Authorization: `Bearer ${token}` },
       })
-      return response.data
+      return response.data.results
     },
     enabled: !!token && user?.role === 'COURIER',
-    refetchInterval: 8000,
+    refetchInterval: liveConnected ? 60000 : 8000,
   })
 
+  useEffect(() => {
+    if (!token || user?.role !== 'COURIER') return
+    const socket = new WebSocket(`${WS_BASE}/ws/courier/orders/?token=${encodeURIComponent(token)}`)
+    socketRef.current = socket
+    socket.onopen = () => {
+      setLiveConnected(true)
+      // with a position the server only forwards orders around the courier
+      if (myPosRef.current) socket.send(JSON.stringify({ type: 'position', ...myPosRef.current }))
+    }
+    socket.onclose = () => setLiveConnected(false)
+    socket.onmessage = (message) => {
+      const event: OrderEvent = JSON.parse(message.data)
+      if (event.type === 'snapshot') {
+        qc.setQueryData(['pendingOrders', token], event.pending)
+        qc.setQueryData(['activeOrders', token], event.active)
+        // a first page again; the `next` link comes from the REST fetches
+        setPendingPages(1)
+        return
+      }
+      const order = event.order
+      if (!order || !event.type.startsWith('order.')) return
+      const without = (list?: Order[]) => (list || []).filter((o) => o.id !== order.id)
+      if (event.type === 'order.created' || event.type === 'order.cancelled') {
+        qc.setQueryData<Order[]>(['pendingOrders', token], (list) => [order, ...without(list)])
+      } else {
+        qc.setQueryData<Order[]>(['pendingOrders', token], without)
+      }
+    }
+    return () => {
+      socketRef.current = null
+      socket.close()
+    }
+  }, [token, user?.role, qc])
+
+  useEffect(() => {
+    myPosRef.current = myPos
+    const socket = socketRef.current
+    if (myPos && socket?.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'position', ...myPos }))
+    }
+  }, [myPos])
+
+  const loadMorePending = async () => {
+    if (!token || !pendingNext) return
+    setLoadingMore(true)
+    try {
+      const response = await axios.get<Page<Order>>(pendingNext, {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      qc.setQueryData<Order[]>(['pendingOrders', token], (list) => {
+        const seen = new Set((list || []).map((o) => o.id))
+        return [...(list || []), ...response.data.results.filter((o) => !seen.has(o.id))]
+      })
+      setPendingNext(response.data.next)
+      setPendingPages((n) => n + 1)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const acceptMutation = useMutation({
     mutationFn: async (id: number) => {
       if (!token) {
@@ -157,6 +244,9 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
         ? error.response?.data?.detail || 'Échec de l’acceptation de la commande.'
         : 'Échec de l’acceptation de la commande.'
       setAcceptError(message)
+      if (axios.isAxiosError(error) && error.response?.status === 409) {
+        qc.invalidateQueries({ queryKey: ['pendingOrders', token] })
+      }
     },
   })
 
@@ -219,10 +309,10 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
       if (!token) {
         return []
       }
-      const response = await axios.get(`${API_BASE}/orders/courier/completed/`, {
+      const response = await axios.get<Page<Order>>(`${API_BASE}/orders/courier/completed/`, {
         headers: { Authorization: `Bearer ${token}` },
       })
-      return response.data
+      return response.data.results
     },
     enabled: !!token && user?.role === 'COURIER',
     refetchInterval: 12000,
@@ -588,6 +678,11 @@ export default function CourierDashboardPage({ token, user, onLogout }: Props) {
                   })}
                 </List>
               )}
+              {!!orders?.length && pendingNext && (
+                <Button variant="outlined" onClick={loadMorePending} disabled={loadingMore}>
+                  {loadingMore ? 'Chargement…' : 'Afficher plus de commandes'}
+                </Button>
+              )}
             </Box>
             <Divider light sx={{ borderColor: 'rgba(148, 163, 184, 0.35)' }}>
               <Chip label="Commandes acceptées" color="primary" variant="outlined" />